@@ -6,11 +6,14 @@ API 路由端点（v2 - AI驱动架构）
 - 所有游戏逻辑由AI处理
 - 前端纯展示层
 """
+import json
 import uuid
 import time
+from datetime import datetime
 from functools import wraps
-from typing import Literal
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, status, Depends
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from app.api.schemas import (
@@ -22,13 +25,21 @@ from app.api.schemas import (
     ChoiceSubmitResponse,
     ErrorResponse,
     CompanyProfile,
+    HistoryMessage,
+    HistoryPageResponse,
     ActionFeedback,
     filter_player_state_for_frontend,
 )
+from app.core.config import settings
+from app.core.game_engine import resolve_turn
 from app.services.session_service import SessionService
 from app.services.context_service import ContextService
 from app.services.ai_service_v2 import AIServiceV2
-from app.repositories.database import get_db_session
+from app.services.speculation_service import SpeculativeTurnService
+from app.services.world_pool import InitialWorldPool
+from app.repositories.database import get_db_session, async_session_maker
+from app.repositories.message_repo import MessageCursor
+from app.repositories.unit_of_work import UnitOfWork
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -78,6 +89,16 @@ async def get_ai_service() -> AIServiceV2:
     return AIServiceV2()
 
 
+async def get_speculative_service() -> SpeculativeTurnService:
+    """获取 SpeculativeTurnService 实例"""
+    return SpeculativeTurnService()
+
+
+async def get_world_pool() -> InitialWorldPool:
+    """获取 InitialWorldPool 实例"""
+    return InitialWorldPool()
+
+
 # ========== API 端点 ==========
 
 
@@ -93,19 +114,24 @@ async def start_game(
     request: GameStartRequest,
     session_service: SessionService = Depends(get_session_service),
     ai_service: AIServiceV2 = Depends(get_ai_service),
+    speculator: SpeculativeTurnService = Depends(get_speculative_service),
+    world_pool: InitialWorldPool = Depends(get_world_pool),
 ) -> GameStartResponse:
     """
     开始新游戏（AI驱动模式）
 
     流程：
-    1. 创建新会话（生成seed）
-    2. 调用AI生成初始剧情和选项
-    3. 返回AI生成的内容
+    1. 从预热池取出世界（命中时沿用其seed）
+    2. 创建新会话（生成seed）
+    3. 未命中时调用AI生成初始剧情和选项
+    4. 返回AI生成的内容
 
     Args:
         request: 游戏开始请求
         session_service: 会话服务
         ai_service: AI服务
+        speculator: 投机预生成服务
+        world_pool: 初始世界预热池
 
     Returns:
         游戏开始响应（包含AI生成的初始内容）
@@ -114,23 +140,30 @@ async def start_game(
         HTTPException 500: 服务器内部错误
     """
     try:
-        # 1. 创建会话
+        # 1. 优先取用预热世界（取用后自动触发补充）
+        pooled = world_pool.take(request.difficulty, request.player_name)
+
+        # 2. 创建会话
         session_info = await session_service.create_game(
             player_name=request.player_name,
-            difficulty=request.difficulty
+            difficulty=request.difficulty,
+            seed=pooled[0] if pooled else None
         )
 
         session_id = session_info["session_id"]
         seed = session_info["seed"]
 
-        # 2. 调用AI生成初始内容
-        logger.info(f"🤖 调用AI生成初始内容 - Session: {session_id}")
+        if pooled:
+            ai_response = pooled[1]
+        else:
+            # 3. 调用AI生成初始内容
+            logger.info(f"🤖 调用AI生成初始内容 - Session: {session_id}")
 
-        ai_response = await ai_service.generate_initial_turn(
-            player_name=request.player_name,
-            difficulty=request.difficulty,
-            seed=seed
-        )
+            ai_response = await ai_service.generate_initial_turn(
+                player_name=request.player_name,
+                difficulty=request.difficulty,
+                seed=seed
+            )
 
         # 3. 记录初始消息（安全获取story，降级到story_context）
         context_service = ContextService(
@@ -144,8 +177,24 @@ async def start_game(
             content=story_content
         )
 
+        # 记录开局状态（AI不可用时本地生成器从这里推进）
+        await session_service.record_key_event(
+            session_id=session_id,
+            event_type="game_start",
+            event_data={
+                "state_snapshot": ai_response.get("player_state", {}),
+                "ai_response": ai_response
+            }
+        )
+
+        # 会话、开场消息、开局事件一次提交（预生成会读取已提交的上下文）
+        await UnitOfWork(session_service.db).commit()
+
         logger.success(f"✅ 新游戏已创建 - Session: {session_id}")
 
+        # 玩家阅读开场时预生成各选项的下一回合
+        speculator.schedule(session_id, ai_response, seed, request.difficulty)
+
         # 解析游戏元数据
         game_meta = None
         if ai_response.get("game_meta"):
@@ -210,24 +259,25 @@ async def start_game(
 async def submit_action(
     request: ChoiceSubmitRequest,
     session_service: SessionService = Depends(get_session_service),
-    context_service: ContextService = Depends(get_context_service),
     ai_service: AIServiceV2 = Depends(get_ai_service),
+    speculator: SpeculativeTurnService = Depends(get_speculative_service),
 ) -> ChoiceSubmitResponse:
     """
     提交行动（AI驱动模式）
 
     流程：
-    1. 获取会话上下文（messages + summaries）
-    2. 调用AI处理玩家行动
+    0. 同一选项的重复提交合并为一次处理（使用独立的数据库会话），共享结果
+    1. 命中投机预生成结果时直接使用
+    2. 否则获取会话上下文（messages + summaries）并调用AI处理玩家行动
     3. AI生成新剧情、选项和状态更新
     4. 保存消息和关键事件
-    5. 返回AI生成的内容
+    5. 为新选项调度投机预生成，返回AI生成的内容
 
     Args:
         request: 行动提交请求
-        session_service: 会话服务
-        context_service: 上下文服务
+        session_service: 会话服务（验证会话）
         ai_service: AI服务
+        speculator: 投机预生成服务
 
     Returns:
         包含AI生成新内容的响应
@@ -246,124 +296,494 @@ async def submit_action(
             )
 
         if session["status"] != "active":
-            return ChoiceSubmitResponse(
-                success=False,
-                player_state={},
-                feedback=ActionFeedback(
-                    success="游戏已结束",
-                    flavor=[]
-                ),
-                triggered_events=[],
-                game_over=True,
-                game_over_reason="游戏已结束",
-                npc_reaction=None,
-                current_magical_element=None
+            return _build_game_finished_response()
+
+        # 2-7. 同一会话对同一选项的并发提交（如双击）只处理一次
+        ai_response = await ai_service.coalesce(
+            f"act:{request.session_id}:{request.choice_id}",
+            lambda: _process_action(
+                ai_service=ai_service,
+                speculator=speculator,
+                session_id=request.session_id,
+                choice_id=request.choice_id,
+                seed=session["seed"],
+                difficulty=(session["metadata"] or {}).get("difficulty", "normal"),
             )
+        )
 
-        # 2. 记录玩家行动
-        await context_service.add_message(
-            session_id=request.session_id,
-            role="user",
-            content=request.choice_id  # 或完整的行动描述
+        return _build_choice_submit_response(ai_response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ 提交行动失败: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"提交行动失败: {str(e)}",
         )
 
-        # 3. 获取上下文
-        context = await context_service.get_context_for_ai(request.session_id)
 
-        # 4. 调用AI生成新内容
-        logger.info(f"🤖 调用AI处理行动 - Session: {request.session_id}, Choice: {request.choice_id}")
+@router.post(
+    "/act/stream",
+    summary="提交行动（流式）",
+    description="以 Server-Sent Events 逐字推送AI生成的剧情，最后推送选项和玩家状态",
+)
+async def submit_action_stream(
+    request: ChoiceSubmitRequest,
+    session_service: SessionService = Depends(get_session_service),
+    context_service: ContextService = Depends(get_context_service),
+    ai_service: AIServiceV2 = Depends(get_ai_service),
+    speculator: SpeculativeTurnService = Depends(get_speculative_service),
+) -> StreamingResponse:
+    """
+    提交行动（SSE流式模式）
 
-        ai_response = await ai_service.generate_next_turn(
-            context=context,
-            user_action=request.choice_id,
-            seed=session["seed"]
-        )
+    事件序列：
+    - story: 剧情增量文本 {"delta": "..."}
+    - choice: 单个选项生成完毕（模型仍在输出时） {"choice": {...}}
+    - choices: 新选项列表 {"choices": [...]}
+    - player_state: 更新后的玩家状态 {"player_state": {...}}
+    - done: 完整的 ChoiceSubmitResponse
+    - error: 生成失败 {"detail": "..."}
 
-        # 5. 记录AI响应（安全获取story，降级到story_context）
-        story_content = ai_response.get("story") or ai_response.get("story_context", "")
-        await context_service.add_message(
-            session_id=request.session_id,
-            role="assistant",
-            content=story_content
+    流结束后再写入AI消息和关键事件（与 /act 相同的持久化逻辑）。
+    命中投机预生成时剧情一次性推送。
+
+    Args:
+        request: 行动提交请求
+        session_service: 会话服务
+        context_service: 上下文服务
+        ai_service: AI服务
+        speculator: 投机预生成服务
+
+    Returns:
+        text/event-stream 响应
+
+    Raises:
+        HTTPException 404: 会话不存在
+    """
+    session = await session_service.get_session(request.session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"会话 {request.session_id} 不存在",
         )
 
-        # 6. 记录关键事件
-        await session_service.record_key_event(
-            session_id=request.session_id,
-            event_type="action_choice",
-            event_data={
-                "choice_id": request.choice_id,
-                "state_snapshot": ai_response.get("player_state", {}),
-                "ai_response": ai_response
-            }
+    if session["status"] != "active":
+        async def finished_events():
+            yield _sse_event("done", _build_game_finished_response().model_dump())
+
+        return StreamingResponse(finished_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+    # 在开始推流前获取上下文；本回合的写入在推流结束后一次提交
+    action_at = datetime.utcnow()
+    seed = session["seed"]
+    speculative_response = await speculator.take(request.session_id, request.choice_id)
+    context = None
+    previous_turn = None
+    resolution = None
+    difficulty = (session["metadata"] or {}).get("difficulty", "normal")
+    if speculative_response is None:
+        context = await context_service.get_context_for_ai(request.session_id)
+        context.append({"role": "user", "content": request.choice_id})
+        # 状态由服务端结算，AI只负责叙述
+        previous_turn = await session_service.get_last_turn(request.session_id)
+        resolution = resolve_turn(previous_turn, request.choice_id, seed, difficulty)
+
+    async def speculative_events():
+        yield "story", speculative_response.get("story_context") or speculative_response.get("story", "")
+        yield "result", speculative_response
+
+    async def turn_events():
+        start_time = time.time()
+        logger.info(f"🤖 流式处理行动 - Session: {request.session_id}, Choice: {request.choice_id}")
+        try:
+            ai_response = None
+            if speculative_response is not None:
+                events = speculative_events()
+            else:
+                events = ai_service.stream_next_turn(
+                    context=context,
+                    user_action=request.choice_id,
+                    seed=seed,
+                    resolution=resolution,
+                    previous_turn=previous_turn
+                )
+            story_sent = False
+            try:
+                async for kind, payload in events:
+                    if kind == "story":
+                        story_sent = True
+                        yield _sse_event("story", {"delta": payload})
+                    elif kind == "choice":
+                        # 选项完整后立即推送，客户端可提前渲染
+                        if isinstance(payload, dict) and all(k in payload for k in ("id", "text", "effects")):
+                            yield _sse_event("choice", {"choice": payload})
+                    elif kind == "result":
+                        ai_response = payload
+            except Exception as e:
+                # 尚未推送剧情时改由本地生成器出回合，已推送则只能报错
+                if story_sent or speculative_response is not None or not settings.FALLBACK_TURN_ENABLED:
+                    raise
+                logger.warning(f"⚠️ 流式生成失败，本地生成回合: {e}")
+                ai_response = ai_service.fallback_engine.generate_next_turn(
+                    previous_turn, request.choice_id, seed, difficulty,
+                    reason="error", resolution=resolution
+                )
+                yield _sse_event("story", {"delta": ai_response["story_context"]})
+
+            response = _build_choice_submit_response(ai_response)
+            yield _sse_event("choices", {"choices": ai_response.get("choices", [])})
+            yield _sse_event("player_state", {"player_state": response.player_state})
+
+            # 依赖注入的数据库会话在推流期间可能已关闭，使用独立会话持久化
+            async with async_session_maker() as db:
+                await _persist_turn_result(
+                    session_service=SessionService(db),
+                    context_service=ContextService(db, ai_service),
+                    session_id=request.session_id,
+                    choice_id=request.choice_id,
+                    ai_response=ai_response,
+                    action_at=action_at,
+                )
+                await UnitOfWork(db).commit()
+
+            _schedule_speculation(speculator, request.session_id, ai_response, seed, difficulty)
+
+            yield _sse_event("done", response.model_dump())
+            logger.info(f"⏱️ API[提交行动(流式)] 耗时: {time.time() - start_time:.3f}秒")
+
+        except Exception as e:
+            logger.error(f"❌ 流式提交行动失败 (耗时{time.time() - start_time:.3f}秒): {e}")
+            yield _sse_event("error", {"detail": f"提交行动失败: {str(e)}"})
+
+    return StreamingResponse(turn_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get(
+    "/metrics",
+    summary="运行指标",
+    description="AI响应缓存、LLM调度、预热池、投机预生成等性能组件的运行指标",
+)
+async def get_metrics(
+    ai_service: AIServiceV2 = Depends(get_ai_service),
+    world_pool: InitialWorldPool = Depends(get_world_pool),
+    speculator: SpeculativeTurnService = Depends(get_speculative_service),
+):
+    """
+    获取运行指标
+
+    Args:
+        ai_service: AI服务
+        world_pool: 初始世界预热池
+        speculator: 投机预生成服务
+
+    Returns:
+        各组件的统计信息
+    """
+    return {
+        "ai_cache": AIServiceV2.get_cache_stats(),
+        "coalescing": ai_service.get_coalescing_stats(),
+        "llm_scheduler": ai_service.scheduler.get_stats(),
+        "hedging": ai_service.hedger.get_stats(),
+        "providers": ai_service.router.get_stats(),
+        "circuit_breaker": ai_service.breaker.get_stats(),
+        "fallback_turns": ai_service.get_fallback_stats(),
+        "partial_repairs": ai_service.get_partial_repair_stats(),
+        "world_pool": world_pool.get_stats(),
+        "speculation": speculator.get_stats(),
+    }
+
+
+# ========== 回合处理辅助函数 ==========
+
+# SSE响应头：禁止缓存和反向代理缓冲，保证逐字推送
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """
+    格式化一条 Server-Sent Event
+
+    Args:
+        event: 事件名
+        data: 事件数据（JSON序列化）
+
+    Returns:
+        SSE 文本帧
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _build_game_finished_response() -> ChoiceSubmitResponse:
+    """构建会话已结束时的响应"""
+    return ChoiceSubmitResponse(
+        success=False,
+        player_state={},
+        feedback=ActionFeedback(
+            success="游戏已结束",
+            flavor=[]
+        ),
+        triggered_events=[],
+        game_over=True,
+        game_over_reason="游戏已结束",
+        npc_reaction=None,
+        current_magical_element=None
+    )
+
+
+async def _process_action(
+    ai_service: AIServiceV2,
+    speculator: SpeculativeTurnService,
+    session_id: str,
+    choice_id: str,
+    seed: int,
+    difficulty: str = "normal",
+) -> dict:
+    """
+    处理一次玩家行动（同一选项的并发提交共享这一个任务）
+
+    任务在发起请求的客户端断开后仍会继续（SingleFlight 保护），此时请求作用域的数据库会话
+    已关闭或回滚，因此使用独立的会话和工作单元。
+
+    Args:
+        ai_service: AI服务
+        speculator: 投机预生成服务
+        session_id: 会话ID
+        choice_id: 玩家选择的选项ID
+        seed: 会话随机种子
+        difficulty: 游戏难度
+
+    Returns:
+        本回合AI内容
+    """
+    async with async_session_maker() as db:
+        return await _run_turn(
+            session_service=SessionService(db),
+            context_service=ContextService(db, ai_service),
+            ai_service=ai_service,
+            speculator=speculator,
+            session_id=session_id,
+            choice_id=choice_id,
+            seed=seed,
+            difficulty=difficulty,
         )
 
-        # 7. 检查游戏结束
-        is_game_over = ai_response.get("is_game_over", False)
-        if is_game_over:
-            await session_service.end_session(
-                session_id=request.session_id,
-                reason=ai_response.get("game_over_reason", "游戏结束"),
-                is_victory=ai_response.get("is_victory", False)
-            )
 
-        logger.success(f"✅ 行动处理完成 - Session: {request.session_id}")
+async def _run_turn(
+    session_service: SessionService,
+    context_service: ContextService,
+    ai_service: AIServiceV2,
+    speculator: SpeculativeTurnService,
+    session_id: str,
+    choice_id: str,
+    seed: int,
+    difficulty: str = "normal",
+) -> dict:
+    """
+    生成回合、持久化并调度预生成
 
-        # 解析更新后的NPC完整档案列表
-        updated_npcs = []
-        if ai_response.get("updated_npcs"):
-            from app.api.schemas import NPCProfile
-            for npc_data in ai_response["updated_npcs"]:
-                updated_npcs.append(NPCProfile(**npc_data))
-
-        # 解析NPC反应
-        npc_reaction = None
-        if ai_response.get("npc_reactions"):
-            from app.api.schemas import NPCReaction
-            reactions_data = ai_response["npc_reactions"]
-            npc_reaction = NPCReaction(
-                boss=reactions_data.get("boss"),
-                colleagues=reactions_data.get("colleagues"),
-                specific_npcs=reactions_data.get("specific_npcs", {})
-            )
+    先完成所有读取（上下文、上一回合），本回合的写入（玩家行动、AI剧情、关键事件、
+    当前状态、统计）只加入工作单元，回合结束时一次提交，生成期间不持有数据库写锁。
+    提交后再调度预生成，预生成读取的上下文已包含本回合。
+    AI失败、超时或排队过长时由本地生成器出回合。
 
-        # 解析魔幻元素
-        # 解析魔幻元素
-        current_magical_element = None
-        element_data = ai_response.get("active_magical_element") or ai_response.get("current_magical_element")
-        if element_data:
-            from app.api.schemas import MagicalElement
-            current_magical_element = MagicalElement(**element_data)
+    Args:
+        session_service: 会话服务
+        context_service: 上下文服务
+        ai_service: AI服务
+        speculator: 投机预生成服务
+        session_id: 会话ID
+        choice_id: 玩家选择的选项ID
+        seed: 会话随机种子
+        difficulty: 游戏难度
 
-        # 过滤玩家状态，移除隐藏字段（suspicion和progress）
-        filtered_player_state = filter_player_state_for_frontend(
-            ai_response.get("player_state", {})
+    Returns:
+        本回合AI内容
+    """
+    action_at = datetime.utcnow()
+    turn_start = time.monotonic()
+
+    # 优先使用投机预生成的结果（分支仍在生成时只短暂等待）
+    ai_response = await speculator.take(session_id, choice_id)
+
+    if ai_response is None:
+        # 获取上下文（附上本回合的玩家行动，与预生成的上下文形状一致）和上一回合
+        context = await context_service.get_context_for_ai(session_id)
+        context.append({"role": "user", "content": choice_id})
+        previous_turn = await session_service.get_last_turn(session_id)
+
+        logger.info(f"🤖 调用AI处理行动 - Session: {session_id}, Choice: {choice_id}")
+
+        ai_response = await ai_service.generate_next_turn_with_fallback(
+            context=context,
+            user_action=choice_id,
+            seed=seed,
+            previous_turn=previous_turn,
+            choice_id=choice_id,
+            difficulty=difficulty,
+            # 回合时限包含等待预生成分支的时间
+            deadline=settings.LLM_TURN_DEADLINE - (time.monotonic() - turn_start),
         )
 
-        return ChoiceSubmitResponse(
-            success=True,
-            player_state=filtered_player_state,
-            feedback=ActionFeedback(
-                success=ai_response.get("story_context", ai_response.get("story", "行动完成")),
-                flavor=ai_response.get("flavor_texts", [])
-            ),
-            triggered_events=ai_response.get("triggered_events", []),
-            game_over=is_game_over,
-            game_over_reason=ai_response.get("game_over_reason") if is_game_over else None,
-            updated_npcs=updated_npcs,
-            npc_reaction=npc_reaction,
-            current_magical_element=current_magical_element
+    # 记录玩家行动、AI响应、关键事件并检查游戏结束，一次提交
+    await _persist_turn_result(
+        session_service=session_service,
+        context_service=context_service,
+        session_id=session_id,
+        choice_id=choice_id,
+        ai_response=ai_response,
+        action_at=action_at,
+    )
+    await UnitOfWork(session_service.db).commit()
+
+    logger.success(f"✅ 行动处理完成 - Session: {session_id}")
+
+    _schedule_speculation(speculator, session_id, ai_response, seed, difficulty)
+    return ai_response
+
+
+async def _persist_turn_result(
+    session_service: SessionService,
+    context_service: ContextService,
+    session_id: str,
+    choice_id: str,
+    ai_response: dict,
+    action_at: datetime,
+) -> None:
+    """
+    持久化一个回合（加入工作单元，由调用方一次提交）
+
+    记录玩家行动消息、AI响应消息、关键事件，并在游戏结束时关闭会话
+
+    Args:
+        session_service: 会话服务
+        context_service: 上下文服务
+        session_id: 会话ID
+        choice_id: 玩家选择的选项ID
+        ai_response: AI生成的回合内容
+        action_at: 玩家提交行动的时间（玩家行动消息的创建时间）
+    """
+    # 记录玩家行动
+    await context_service.add_message(
+        session_id=session_id,
+        role="user",
+        content=choice_id,  # 或完整的行动描述
+        created_at=action_at
+    )
+
+    # 记录AI响应（安全获取story，降级到story_context）
+    story_content = ai_response.get("story") or ai_response.get("story_context", "")
+    await context_service.add_message(
+        session_id=session_id,
+        role="assistant",
+        content=story_content
+    )
+
+    # 记录关键事件
+    await session_service.record_key_event(
+        session_id=session_id,
+        event_type="action_choice",
+        event_data={
+            "choice_id": choice_id,
+            "state_snapshot": ai_response.get("player_state", {}),
+            "ai_response": ai_response
+        }
+    )
+
+    # 检查游戏结束
+    if ai_response.get("is_game_over", False):
+        await session_service.end_session(
+            session_id=session_id,
+            reason=ai_response.get("game_over_reason", "游戏结束"),
+            is_victory=ai_response.get("is_victory", False)
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ 提交行动失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"提交行动失败: {str(e)}",
+
+def _schedule_speculation(
+    speculator: SpeculativeTurnService,
+    session_id: str,
+    ai_response: dict,
+    seed: int,
+    difficulty: str = "normal",
+) -> None:
+    """
+    回合持久化后为新选项调度投机预生成（游戏结束则释放会话的预生成资源）
+
+    Args:
+        speculator: 投机预生成服务
+        session_id: 会话ID
+        ai_response: 本回合AI内容
+        seed: 会话随机种子
+        difficulty: 游戏难度
+    """
+    if ai_response.get("is_game_over", False):
+        speculator.end_session(session_id)
+    else:
+        speculator.schedule(session_id, ai_response, seed, difficulty)
+
+
+def _build_choice_submit_response(ai_response: dict) -> ChoiceSubmitResponse:
+    """
+    将AI回合内容转换为 ChoiceSubmitResponse
+
+    Args:
+        ai_response: AI生成的回合内容
+
+    Returns:
+        提交行动响应
+    """
+    is_game_over = ai_response.get("is_game_over", False)
+
+    # 解析更新后的NPC完整档案列表
+    updated_npcs = []
+    if ai_response.get("updated_npcs"):
+        from app.api.schemas import NPCProfile
+        for npc_data in ai_response["updated_npcs"]:
+            updated_npcs.append(NPCProfile(**npc_data))
+
+    # 解析NPC反应
+    npc_reaction = None
+    if ai_response.get("npc_reactions"):
+        from app.api.schemas import NPCReaction
+        reactions_data = ai_response["npc_reactions"]
+        npc_reaction = NPCReaction(
+            boss=reactions_data.get("boss"),
+            colleagues=reactions_data.get("colleagues"),
+            specific_npcs=reactions_data.get("specific_npcs", {})
         )
 
+    # 解析魔幻元素
+    current_magical_element = None
+    element_data = ai_response.get("active_magical_element") or ai_response.get("current_magical_element")
+    if element_data:
+        from app.api.schemas import MagicalElement
+        current_magical_element = MagicalElement(**element_data)
+
+    # 过滤玩家状态，移除隐藏字段（suspicion和progress）
+    filtered_player_state = filter_player_state_for_frontend(
+        ai_response.get("player_state", {})
+    )
+
+    return ChoiceSubmitResponse(
+        success=True,
+        player_state=filtered_player_state,
+        feedback=ActionFeedback(
+            success=ai_response.get("story_context", ai_response.get("story", "行动完成")),
+            flavor=ai_response.get("flavor_texts", [])
+        ),
+        triggered_events=ai_response.get("triggered_events", []),
+        game_over=is_game_over,
+        game_over_reason=ai_response.get("game_over_reason") if is_game_over else None,
+        updated_npcs=updated_npcs,
+        npc_reaction=npc_reaction,
+        current_magical_element=current_magical_element
+    )
+
 
 @router.get(
     "/state",
@@ -385,7 +805,7 @@ async def get_state(
         context_service: 上下文服务
 
     Returns:
-        会话状态和最近消息
+        会话信息、当前游戏状态、最近消息和统计
 
     Raises:
         HTTPException 404: 会话不存在
@@ -399,6 +819,9 @@ async def get_state(
                 detail=f"会话 {session_id} 不存在",
             )
 
+        # 获取当前游戏状态
+        current_state = await _get_current_state(session_service, session_id)
+
         # 获取最近消息
         messages = await context_service.get_messages(session_id, limit=10)
 
@@ -407,6 +830,7 @@ async def get_state(
 
         return {
             "session": session,
+            "current_state": current_state,
             "recent_messages": [
                 {
                     "role": msg.role,
@@ -428,6 +852,130 @@ async def get_state(
         )
 
 
+@router.get(
+    "/history",
+    response_model=HistoryPageResponse,
+    summary="获取历史消息",
+    description="按游标分页获取会话历史消息，从最新一页往前翻",
+)
+@log_api_time("获取历史")
+async def get_history(
+    session_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_PAGE_MAX, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    session_service: SessionService = Depends(get_session_service),
+    context_service: ContextService = Depends(get_context_service),
+) -> HistoryPageResponse:
+    """
+    获取历史消息（keyset分页，每页的查询成本与会话长度无关）
+
+    Args:
+        session_id: 会话ID
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor（为空时返回最新一页）
+        session_service: 会话服务
+        context_service: 上下文服务
+
+    Returns:
+        本页消息和更早一页的游标
+
+    Raises:
+        HTTPException 400: 游标无效
+        HTTPException 404: 会话不存在
+    """
+    try:
+        before = MessageCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not await session_service.get_session(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"会话 {session_id} 不存在",
+        )
+
+    rows, next_cursor = await context_service.get_history_page(session_id, limit, before=before)
+    return HistoryPageResponse(
+        session_id=session_id,
+        messages=[_history_message(row) for row in rows],
+        next_cursor=next_cursor.encode() if next_cursor else None,
+    )
+
+
+@router.get(
+    "/history/export",
+    summary="导出历史消息",
+    description="以 NDJSON（每行一条消息）按时间顺序流式导出会话的全部历史消息",
+)
+async def export_history(
+    session_id: str,
+    session_service: SessionService = Depends(get_session_service),
+    ai_service: AIServiceV2 = Depends(get_ai_service),
+) -> StreamingResponse:
+    """
+    导出历史消息（NDJSON流）
+
+    分批keyset读取，内存占用与会话长度无关。
+
+    Args:
+        session_id: 会话ID
+        session_service: 会话服务
+        ai_service: AI服务
+
+    Returns:
+        application/x-ndjson 响应
+
+    Raises:
+        HTTPException 404: 会话不存在
+    """
+    if not await session_service.get_session(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"会话 {session_id} 不存在",
+        )
+
+    async def lines():
+        # 依赖注入的数据库会话在推流期间可能已关闭，使用独立会话读取
+        async with async_session_maker() as db:
+            context_service = ContextService(db, ai_service)
+            async for row in context_service.iter_history(session_id, settings.HISTORY_EXPORT_BATCH):
+                yield json.dumps(_history_message(row).model_dump(), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{session_id}.ndjson"'},
+    )
+
+
+async def _get_current_state(session_service: SessionService, session_id: str) -> Optional[dict]:
+    """
+    当前游戏状态（主键查询，玩家状态移除隐藏字段）
+
+    Args:
+        session_service: 会话服务
+        session_id: 会话ID
+
+    Returns:
+        当前状态，没有回合记录时返回None
+    """
+    current_state = await session_service.get_current_state(session_id)
+    if current_state is None:
+        return None
+    current_state["player_state"] = filter_player_state_for_frontend(current_state["player_state"])
+    return current_state
+
+
+def _history_message(row) -> HistoryMessage:
+    """消息行转换为响应模型"""
+    return HistoryMessage(
+        id=row.id,
+        role=row.role,
+        content=row.content,
+        created_at=row.created_at.isoformat(),
+    )
+
+
 @router.post(
     "/resume",
     summary="恢复会话",
@@ -435,6 +983,7 @@ async def get_state(
 )
 async def resume_session(
     request: ChoiceSubmitRequest,  # 复用请求结构
+    session_service: SessionService = Depends(get_session_service),
     context_service: ContextService = Depends(get_context_service),
 ):
     """
@@ -442,22 +991,26 @@ async def resume_session(
 
     Args:
         request: 包含session_id的请求
+        session_service: 会话服务
         context_service: 上下文服务
 
     Returns:
-        重建的上下文
+        重建的上下文（摘要 + 最近 RESUME_MESSAGE_LIMIT 条消息，更早的消息通过 /history 获取）
 
     Raises:
         HTTPException 404: 会话不存在
     """
     try:
         # 重建上下文
-        context = await context_service.rebuild_context(request.session_id)
+        context = await context_service.rebuild_context(
+            request.session_id, limit=settings.RESUME_MESSAGE_LIMIT
+        )
 
         logger.info(f"✅ 会话恢复完成 - Session: {request.session_id}")
 
         return {
             "session_id": request.session_id,
+            "current_state": await _get_current_state(session_service, request.session_id),
             "context": context,
             "message_count": len(context)
         }
@@ -286,6 +286,21 @@ class ChoiceSubmitResponse(BaseModel):
     )
 
 
+class HistoryMessage(BaseModel):
+    """历史消息"""
+    id: str = Field(..., description="消息ID")
+    role: str = Field(..., description="消息角色（system, user, assistant）")
+    content: str = Field(..., description="消息内容")
+    created_at: str = Field(..., description="创建时间（ISO格式）")
+
+
+class HistoryPageResponse(BaseModel):
+    """历史消息分页响应"""
+    session_id: str = Field(..., description="会话唯一标识")
+    messages: List[HistoryMessage] = Field(default_factory=list, description="本页消息（按时间排序）")
+    next_cursor: Optional[str] = Field(None, description="更早一页的游标（没有更早的消息时为空）")
+
+
 class ErrorResponse(BaseModel):
     """错误响应"""
     error: str = Field(..., description="错误消息")
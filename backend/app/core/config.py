@@ -13,6 +13,80 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_BASE_URL: str = ""  # 自定义 API 地址
     OPENAI_MODEL: str = "gemini-2.0-flash-lite"  # 默认模型
+    # 多供应商/多Key路由（JSON列表，配置后优先于上面三项）
+    # 例：[{"name": "a", "api_key": "sk-...", "base_url": "...", "model": "...", "weight": 2}]
+    OPENAI_PROVIDERS: str = ""
+
+    # AI响应缓存配置
+    AI_CACHE_MAX_ENTRIES: int = 100
+    AI_CACHE_MAX_BYTES: int = 8 * 1024 * 1024  # 8MB
+    AI_CACHE_TTL: int = 3600  # 1小时
+    AI_CACHE_BACKEND: str = "memory"  # memory | sqlite | redis（多 worker 时用后两者共享）
+    AI_CACHE_SQLITE_PATH: str = "./ai_cache.db"
+    AI_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # LLM调用准入控制（全局并发上限，按优先级排队）
+    LLM_MAX_CONCURRENCY: int = 8
+
+    # LLM请求对冲（超过自适应阈值仍未返回时发起备用请求，先返回者胜出）
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 0.9  # 对冲阈值取该任务最近延迟的分位数
+    HEDGE_MAX_RATE: float = 0.1  # 最近调用中允许对冲的最大比例
+    HEDGE_MIN_DELAY: float = 2.0  # 对冲阈值下限（秒）
+    HEDGE_MIN_SAMPLES: int = 20  # 样本不足时不对冲
+
+    # LLM熔断器（供应商故障时直接降级，不再等待超时）
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_WINDOW: int = 20  # 统计最近多少次调用
+    CIRCUIT_MIN_CALLS: int = 10  # 窗口内至少多少次调用才判断
+    CIRCUIT_FAILURE_RATE: float = 0.5  # 失败率达到该值时熔断
+    CIRCUIT_SLOW_CALL_SECONDS: float = 15.0  # 超过该耗时视为慢调用
+    CIRCUIT_SLOW_CALL_RATE: float = 0.8  # 慢调用率达到该值时熔断
+    CIRCUIT_OPEN_SECONDS: float = 30.0  # 熔断持续时间，之后放行探测请求
+    CIRCUIT_HALF_OPEN_PROBES: int = 1  # 半开状态同时放行的探测请求数
+
+    # 回合紧凑输出格式（短字段名、数组形式的选项效果、NPC按id增量更新，减少补全token）
+    AI_COMPACT_TURNS: bool = True
+
+    # 结构化输出约束（json_schema | json_object | off），端点不支持时自动逐级降级
+    AI_STRUCTURED_OUTPUT: str = "json_schema"
+
+    # 初始回合验证失败时只重生成无效片段（NPC/选项/公司字段/剧情），超过该片段数时整体降级，0表示关闭
+    AI_PARTIAL_REPAIR_MAX_FRAGMENTS: int = 4
+
+    # 上下文打包（按token预算选取：最近回合 > 世界状态 > 最近摘要 > 关键事件 > 更早消息）
+    CONTEXT_TOKEN_BUDGET: int = 3000  # 上下文token预算（不含系统提示词和本回合指令）
+    CONTEXT_RECENT_TURNS: int = 3  # 必选的最近已存回合数（不含本回合的玩家行动，它在打包后追加）
+    CONTEXT_HISTORY_WINDOW: int = 60  # 最多读取的最近消息数
+    CONTEXT_KEY_EVENTS: int = 8  # 关键事件条数
+
+    # 分层摘要（在用摘要总token数超过预算时，把较早的摘要合并成上一级摘要）
+    SUMMARY_TOKEN_BUDGET: int = 800  # 在用摘要的token预算
+    SUMMARY_KEY_EVENTS: int = 6  # 每个摘要【关键事件】最多保留的条数
+
+    # 历史消息分页（/history 按 (created_at, id) 游标分页，/resume 只返回最近的消息）
+    HISTORY_PAGE_SIZE: int = 20  # 默认每页条数
+    HISTORY_PAGE_MAX: int = 100  # 每页最大条数
+    HISTORY_EXPORT_BATCH: int = 200  # NDJSON导出每批读取的条数
+    RESUME_MESSAGE_LIMIT: int = 50  # /resume 返回的最大消息数
+
+    # 回合本地降级（AI失败、超时或排队过长时由本地生成器出回合）
+    FALLBACK_TURN_ENABLED: bool = True
+    LLM_TURN_DEADLINE: float = 25.0  # 回合生成的总时限（秒，含排队）
+    LLM_SHED_QUEUE_DEPTH: int = 0  # 交互请求排队数达到该值时直接本地生成，0表示不限
+
+    # 投机预生成配置（玩家阅读时为每个选项预先生成下一回合）
+    SPECULATIVE_ENABLED: bool = False
+    SPECULATIVE_MAX_CONCURRENCY: int = 4  # 全局同时进行的预生成数量
+    SPECULATIVE_SESSION_BUDGET: int = 30  # 单个会话累计可预生成的回合数
+    SPECULATIVE_TTL: int = 300  # 预生成结果保留时间（秒）
+    SPECULATIVE_TAKE_WAIT: float = 2.0  # 选中的分支仍在生成时最多等待的时间（秒），超时改为实时生成
+
+    # 初始世界预热池（/start 直接取用预生成的世界）
+    WORLD_POOL_ENABLED: bool = False
+    WORLD_POOL_SIZE: int = 2  # 每个难度保持的预生成世界数量
+    WORLD_POOL_REFILL_CONCURRENCY: int = 1  # 同时补充的世界数量
+    WORLD_POOL_MAX_AGE: int = 1800  # 世界最长保留时间（秒），过期丢弃
 
     # 数据库配置
     DATABASE_URL: str = "sqlite+aiosqlite:///./game.db"
@@ -0,0 +1,66 @@
+"""
+游戏规则常量
+
+服务端结算玩家状态时使用的数值规则：初始状态、时间推进、难度倍率、阈值和随机事件
+"""
+from typing import Any, Dict, List
+
+
+# 初始玩家状态
+INITIAL_PLAYER_STATE: Dict[str, Any] = {
+    "chill": 50,
+    "energy": 100,
+    "connection": 0,
+    "blackmail": 0,
+    "progress": 0,
+    "suspicion": 0,
+    "salary": 5000,
+    "reputation": 0,
+    "level": 0,
+    "day": 1,
+    "week": 1,
+    "turn": 0,
+}
+
+# 核心属性（取值范围 0-100，由选项效果直接修改）
+CORE_STATS = ("energy", "chill", "progress", "suspicion", "connection", "blackmail")
+
+# 属性中文名（行动反馈用）
+STAT_LABELS: Dict[str, str] = {
+    "energy": "精力",
+    "chill": "摸鱼值",
+    "progress": "工作进度",
+    "suspicion": "怀疑度",
+    "connection": "人脉",
+    "blackmail": "黑料",
+}
+
+# 时间推进：每天回合 0-7，第7回合结束后进入下一天
+LAST_TURN_OF_DAY = 7
+DAYS_PER_WEEK = 5
+MAX_DAYS = 30
+
+# 难度设置：消耗类效果倍率、30天期满时要求的工作进度
+DIFFICULTY_SETTINGS: Dict[str, Dict[str, float]] = {
+    "easy": {"energy_cost": 0.5, "suspicion_gain": 0.5, "required_progress": 50},
+    "normal": {"energy_cost": 1.0, "suspicion_gain": 1.0, "required_progress": 70},
+    "hard": {"energy_cost": 1.5, "suspicion_gain": 1.5, "required_progress": 85},
+}
+
+# 阈值提醒
+SUSPICION_WARNING = 80
+ENERGY_WARNING = 20
+CHILL_KING_THRESHOLD = 80
+
+# 每回合触发随机事件的概率
+RANDOM_EVENT_PROBABILITY = 0.2
+
+# 随机事件（效果由服务端结算，剧情由AI叙述）
+RANDOM_EVENTS: List[Dict[str, Any]] = [
+    {"id": "free_afternoon_tea", "type": "positive", "message": "行政突然发了下午茶", "effects": {"energy": 5, "chill": 3}},
+    {"id": "boss_business_trip", "type": "positive", "message": "老板出差了，办公室气氛轻松不少", "effects": {"chill": 5, "suspicion": -5}},
+    {"id": "surprise_meeting", "type": "negative", "message": "临时被拉进一个两小时的会议", "effects": {"energy": -8, "chill": -5}},
+    {"id": "hr_patrol", "type": "negative", "message": "HR在工位间来回巡视", "effects": {"suspicion": 5}},
+    {"id": "gossip_overheard", "type": "neutral", "message": "在茶水间无意听到一段八卦", "effects": {"blackmail": 4}},
+    {"id": "network_outage", "type": "random", "message": "公司网络故障，全员被迫休息", "effects": {"chill": 6, "progress": -3}},
+]
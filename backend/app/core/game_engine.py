@@ -0,0 +1,357 @@
+"""
+游戏状态引擎 - 服务端结算玩家状态
+
+选项在下发时已经带有明确的 effects，因此状态变化由服务端确定性计算：
+1. 应用选项效果（按难度调整消耗）并限制属性范围
+2. 推进回合/天数/周数，下班后恢复精力
+3. 检查阈值提醒和随机事件
+4. 判定游戏结束（开除、过劳、晋升、摸鱼王、试用期期满）
+
+AI只负责根据结算结果叙述剧情和生成新选项，不再回传 player_state。
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.api.schemas import AIChoice, PlayerState, TriggeredEvent
+from app.core.constants import (
+    CHILL_KING_THRESHOLD,
+    CORE_STATS,
+    DAYS_PER_WEEK,
+    DIFFICULTY_SETTINGS,
+    ENERGY_WARNING,
+    INITIAL_PLAYER_STATE,
+    LAST_TURN_OF_DAY,
+    MAX_DAYS,
+    RANDOM_EVENT_PROBABILITY,
+    RANDOM_EVENTS,
+    STAT_LABELS,
+    SUSPICION_WARNING,
+)
+from app.prompts.fallback_library import FALLBACK_ENDINGS
+
+
+# 玩家可见的属性（行动反馈中只展示这些）
+VISIBLE_STATS = ("energy", "chill", "connection", "blackmail")
+
+
+@dataclass
+class TurnResolution:
+    """一个回合的服务端结算结果"""
+
+    choice: Dict[str, Any]
+    player_state: Dict[str, Any]
+    feedback: str
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    is_game_over: bool = False
+    is_victory: bool = False
+    game_over_reason: Optional[str] = None
+
+    def apply(self, result: dict) -> dict:
+        """
+        用结算结果覆盖回合内容中的状态字段
+
+        AI生成的事件只保留叙述，其效果不计入状态。
+
+        Args:
+            result: AI或本地生成的回合内容（原地修改）
+
+        Returns:
+            修改后的回合内容
+        """
+        narrated_events = [
+            {**event, "effects": {}}
+            for event in result.get("triggered_events") or []
+            if isinstance(event, dict)
+        ]
+        result["player_state"] = dict(self.player_state)
+        result["triggered_events"] = [dict(event) for event in self.events] + narrated_events
+        result["is_game_over"] = self.is_game_over
+        if self.is_game_over:
+            result["is_victory"] = self.is_victory
+            result["game_over_reason"] = self.game_over_reason
+            result["choices"] = []
+        else:
+            result.pop("is_victory", None)
+            result.pop("game_over_reason", None)
+        return result
+
+
+class GameEngine:
+    """
+    游戏状态引擎
+
+    职责：
+    - 根据选项效果计算新状态
+    - 触发阈值和随机事件
+    - 判定游戏结束
+    """
+
+    def __init__(self, seed: Optional[Union[int, str]] = None):
+        """
+        初始化引擎
+
+        Args:
+            seed: 随机种子（相同种子触发相同的随机事件）
+        """
+        self._rng = random.Random(seed)
+
+    def calculate_new_state(
+        self,
+        state: PlayerState,
+        choice: AIChoice,
+        difficulty: str = "normal"
+    ) -> Tuple[PlayerState, str, List[TriggeredEvent]]:
+        """
+        应用选项效果并推进时间
+
+        Args:
+            state: 当前玩家状态
+            choice: 玩家选择的选项
+            difficulty: 难度（easy/normal/hard）
+
+        Returns:
+            (新状态, 行动反馈, 阈值事件列表)
+        """
+        settings = DIFFICULTY_SETTINGS.get(difficulty, DIFFICULTY_SETTINGS["normal"])
+        data = state.model_dump()
+        changes: Dict[str, float] = {}
+
+        for stat, delta in (choice.effects or {}).items():
+            if stat not in data or not isinstance(delta, (int, float)):
+                continue
+            # 难度只影响消耗类效果
+            if stat == "energy" and delta < 0:
+                delta *= settings["energy_cost"]
+            elif stat == "suspicion" and delta > 0:
+                delta *= settings["suspicion_gain"]
+
+            if stat in CORE_STATS or stat == "reputation":
+                data[stat] = _clamp(data[stat] + delta)
+            elif stat == "salary":
+                data[stat] = max(0, int(data[stat] + delta))
+            else:
+                continue
+            changes[stat] = delta
+
+        data["turn"] += 1
+        if data["turn"] > LAST_TURN_OF_DAY:
+            # 下班：进入下一天，精力恢复
+            data["turn"] = 0
+            data["day"] += 1
+            data["energy"] = 100
+        data["week"] = (data["day"] - 1) // DAYS_PER_WEEK + 1
+
+        new_state = PlayerState(**data)
+        return new_state, self._build_feedback(changes), self._check_threshold_events(new_state)
+
+    def check_game_over(self, state: PlayerState, difficulty: str = "normal") -> Tuple[bool, Optional[str]]:
+        """
+        判定游戏是否结束
+
+        Args:
+            state: 玩家状态
+            difficulty: 难度（决定试用期期满时的进度要求）
+
+        Returns:
+            (是否结束, 结束原因)
+        """
+        ending = self._check_ending(state, difficulty)
+        if ending is None:
+            return False, None
+        return True, ending[1]
+
+    def resolve(self, state: dict, choice: dict, difficulty: str = "normal") -> TurnResolution:
+        """
+        结算一个回合：应用选项、触发事件、判定结局
+
+        Args:
+            state: 上一回合的玩家状态字典（AI生成，可能不规范）
+            choice: 玩家选择的选项字典
+            difficulty: 难度
+
+        Returns:
+            回合结算结果
+        """
+        effects = {
+            stat: int(round(value))
+            for stat, value in (choice.get("effects") or {}).items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        ai_choice = AIChoice.model_construct(
+            id=str(choice.get("id", "")),
+            text=str(choice.get("text", ""))[:100],
+            category=choice.get("category"),
+            effects=effects,
+        )
+
+        new_state, feedback, events = self.calculate_new_state(_to_player_state(state), ai_choice, difficulty)
+
+        # 随机事件的效果同样由服务端结算
+        random_events = self._trigger_random_events()
+        for event in random_events:
+            new_state = self._apply_event(new_state, event)
+        events.extend(random_events)
+
+        ending = self._check_ending(new_state, difficulty)
+        return TurnResolution(
+            choice={"id": ai_choice.id, "text": ai_choice.text, "category": ai_choice.category, "effects": effects},
+            player_state={**(state or {}), **_state_to_dict(new_state)},
+            feedback=feedback,
+            events=[event.model_dump(exclude_none=True) for event in events],
+            is_game_over=ending is not None,
+            is_victory=bool(ending and ending[0]),
+            game_over_reason=ending[1] if ending else None,
+        )
+
+    def _trigger_random_events(self) -> List[TriggeredEvent]:
+        """按概率抽取随机事件"""
+        if self._rng.random() >= RANDOM_EVENT_PROBABILITY:
+            return []
+        return [TriggeredEvent(**self._rng.choice(RANDOM_EVENTS))]
+
+    @staticmethod
+    def _apply_event(state: PlayerState, event: TriggeredEvent) -> PlayerState:
+        """应用事件效果（不推进时间、不受难度影响）"""
+        data = state.model_dump()
+        for stat, delta in event.effects.items():
+            if stat in CORE_STATS:
+                data[stat] = _clamp(data[stat] + delta)
+        return PlayerState(**data)
+
+    @staticmethod
+    def _check_threshold_events(state: PlayerState) -> List[TriggeredEvent]:
+        """属性越过阈值时的提醒事件"""
+        events = []
+        if state.suspicion >= SUSPICION_WARNING:
+            events.append(TriggeredEvent(
+                id="suspicion_warning", type="threshold", message="HR最近频繁出现在你附近，再这样下去就要被裁员了"
+            ))
+        if 0 < state.energy < ENERGY_WARNING:
+            events.append(TriggeredEvent(
+                id="energy_warning", type="threshold", message="你眼前发黑，再不休息恐怕要撑不住了"
+            ))
+        if state.chill >= CHILL_KING_THRESHOLD:
+            events.append(TriggeredEvent(
+                id="chill_king_chance", type="threshold", message="你的摸鱼技术已小有名气，摸鱼王的称号近在眼前"
+            ))
+        return events
+
+    @staticmethod
+    def _check_ending(state: PlayerState, difficulty: str) -> Optional[Tuple[bool, str]]:
+        """判定结局，返回 (是否胜利, 结局描述)，未结束时返回None"""
+        basic = FALLBACK_ENDINGS["basic"]
+
+        if state.suspicion >= 100:
+            return False, f"怀疑度爆表，你被公司开除了。{basic['被裁员']['description']}"
+        if state.energy <= 0:
+            return False, f"精力耗尽，过劳倒下。{basic['过劳死']['description'].format(day=state.day)}"
+        if state.progress >= 100 and state.connection >= 90 and state.suspicion < 20:
+            return True, f"成功晋升！{basic['成功晋升']['description']}"
+        if state.chill >= 100 and state.connection >= 80 and state.blackmail >= 50:
+            return True, f"成功成为摸鱼王！{basic['摸鱼王']['description']}"
+
+        if state.day >= MAX_DAYS:
+            settings = DIFFICULTY_SETTINGS.get(difficulty, DIFFICULTY_SETTINGS["normal"])
+            if state.progress >= settings["required_progress"]:
+                return True, f"恭喜！你成功熬过了{MAX_DAYS}天试用期，顺利转正。"
+            return False, (
+                f"{MAX_DAYS}天试用期结束，工作进度未达到{settings['required_progress']:.0f}%的要求，"
+                f"你被老板开了。"
+            )
+
+        return None
+
+    @staticmethod
+    def _build_feedback(changes: Dict[str, float]) -> str:
+        """可见属性变化的文字反馈"""
+        parts = [
+            f"{STAT_LABELS[stat]}{delta:+.0f}"
+            for stat, delta in changes.items()
+            if stat in VISIBLE_STATS and round(delta)
+        ]
+        return "，".join(parts) if parts else "状态没有明显变化"
+
+
+def find_choice(turn: Optional[dict], choice_id: str) -> Optional[dict]:
+    """
+    在回合内容中查找选项
+
+    Args:
+        turn: 回合内容（包含 choices）
+        choice_id: 选项ID
+
+    Returns:
+        选项字典，找不到时返回None
+    """
+    for choice in (turn or {}).get("choices") or []:
+        if isinstance(choice, dict) and choice.get("id") == choice_id:
+            return choice
+    return None
+
+
+def resolve_turn(
+    previous_turn: Optional[dict],
+    choice_id: str,
+    seed: int,
+    difficulty: str = "normal"
+) -> Optional[TurnResolution]:
+    """
+    结算玩家在上一回合做出的选择
+
+    随机源由会话种子、天数、回合和选项决定，同一选择（包括投机预生成）结算结果一致。
+
+    Args:
+        previous_turn: 上一回合内容（包含 player_state 和 choices）
+        choice_id: 玩家选择的选项ID
+        seed: 会话随机种子
+        difficulty: 难度
+
+    Returns:
+        结算结果；找不到上一回合或该选项时返回None
+    """
+    choice = find_choice(previous_turn, choice_id)
+    if choice is None:
+        return None
+    state = previous_turn.get("player_state") or {}
+    engine = GameEngine(seed=f"{seed}:{state.get('day', 1)}:{state.get('turn', 0)}:{choice_id}")
+    return engine.resolve(state, choice, difficulty)
+
+
+def _clamp(value: float) -> float:
+    """限制在 0-100"""
+    return max(0.0, min(100.0, value))
+
+
+def _to_player_state(state: Optional[dict]) -> PlayerState:
+    """把AI生成的状态字典转换为 PlayerState（越界值截断，非法字段回退初始值）"""
+    data = dict(INITIAL_PLAYER_STATE)
+    for key, value in (state or {}).items():
+        if key not in PlayerState.model_fields:
+            continue
+        if key in INITIAL_PLAYER_STATE and key != "level":
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if key in CORE_STATS or key == "reputation":
+                value = _clamp(value)
+            elif key in ("day", "week"):
+                value = max(1, int(value))
+            else:
+                value = max(0, int(value))
+        data[key] = value
+
+    try:
+        return PlayerState(**data)
+    except ValidationError:
+        return PlayerState(**{k: v for k, v in data.items() if k in INITIAL_PLAYER_STATE and k != "level"})
+
+
+def _state_to_dict(state: PlayerState) -> Dict[str, Any]:
+    """PlayerState 转为字典（整数值的属性去掉小数）"""
+    data = state.model_dump(mode="json", exclude_none=True)
+    for key, value in data.items():
+        if isinstance(value, float) and value.is_integer():
+            data[key] = int(value)
+    return data
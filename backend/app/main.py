@@ -10,6 +10,8 @@ import logging
 
 from app.api.endpoints import router
 from app.repositories.database import init_database, close_database
+from app.services.ai_service_v2 import AIServiceV2
+from app.services.world_pool import InitialWorldPool
 
 # 配置日志
 logging.basicConfig(
@@ -27,9 +29,15 @@ async def lifespan(app: FastAPI):
     # 初始化数据库
     await init_database()
 
+    # 启动初始世界预热池（未启用时不做任何事）
+    world_pool = InitialWorldPool()
+    world_pool.start()
+
     yield
 
-    # 关闭数据库连接
+    # 停止预热池，关闭缓存后端和数据库连接
+    await world_pool.stop()
+    await AIServiceV2.close_cache()
     await close_database()
     logger.info("👋 职场摸鱼大作战 API 服务已停止")
 
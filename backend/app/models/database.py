@@ -6,6 +6,8 @@ AI驱动游戏 - 数据库模型 v2.0
 - 消息历史（messages）
 - 上下文摘要（summaries）
 - 关键事件（key_events）
+- 会话统计（session_stats）
+- 当前游戏状态（session_states）
 """
 from datetime import datetime
 from typing import Optional
@@ -55,6 +57,8 @@ class Session(Base):
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
     summaries = relationship("Summary", back_populates="session", cascade="all, delete-orphan")
     key_events = relationship("KeyEvent", back_populates="session", cascade="all, delete-orphan")
+    stats = relationship("SessionStats", back_populates="session", uselist=False, cascade="all, delete-orphan")
+    state = relationship("SessionState", back_populates="session", uselist=False, cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Session(id={self.id}, status={self.status}, created_at={self.created_at})>"
@@ -93,7 +97,8 @@ class Message(Base):
 
     # 索引
     __table_args__ = (
-        Index("idx_session_messages", "session_id", "created_at"),
+        # id 作为最后一列与游标排序 (created_at, id) 一致，窗口查询不需要临时排序
+        Index("idx_session_messages", "session_id", "created_at", "id"),
     )
 
     def __repr__(self):
@@ -123,7 +128,17 @@ class Summary(Base):
     message_count = Column(Integer, nullable=False)  # 被摘要的消息数量
 
     # 摘要类型
-    summary_type = Column(String(20), nullable=False, default="auto")  # auto, manual
+    summary_type = Column(String(20), nullable=False, default="auto")  # auto, manual, merged
+
+    # 层级：0 为消息摘要，n+1 为合并若干 n 级摘要得到的摘要
+    level = Column(Integer, nullable=False, default=0, server_default="0")
+    # 被合并进的上级摘要ID（为空表示仍在使用）
+    merged_into = Column(String(36), nullable=True)
+
+    # 覆盖范围水位线：最后一条被摘要消息的 (创建时间, id)，按 (created_at, id) 游标比较，
+    # 同一时间戳的消息不会被跳过（之后的消息才需要放进上下文）
+    covers_until = Column(DateTime, nullable=True)
+    covers_until_id = Column(String(36), nullable=True)
 
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -137,7 +152,10 @@ class Summary(Base):
     )
 
     def __repr__(self):
-        return f"<Summary(id={self.id}, session_id={self.session_id}, message_count={self.message_count})>"
+        return (
+            f"<Summary(id={self.id}, session_id={self.session_id}, "
+            f"level={self.level}, message_count={self.message_count})>"
+        )
 
 
 # ============================================================================
@@ -201,6 +219,79 @@ class KeyEvent(Base):
         return f"<KeyEvent(id={self.id}, event_type={self.event_type}, session_id={self.session_id})>"
 
 
+# ============================================================================
+# 会话统计
+# ============================================================================
+
+class SessionStats(Base):
+    """
+    会话统计表（反规范化计数）
+
+    与消息、事件、摘要的写入在同一事务中增量更新，
+    读取统计只需一次主键查询，不再扫描整个消息历史。
+    """
+    __tablename__ = "session_stats"
+
+    session_id = Column(String(36), ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True)
+
+    # 计数
+    message_count = Column(Integer, nullable=False, default=0)  # 消息数
+    token_total = Column(Integer, nullable=False, default=0)  # 消息token总数
+    summarized_token_total = Column(Integer, nullable=False, default=0)  # 已被摘要覆盖的消息token数
+    turn_count = Column(Integer, nullable=False, default=0)  # 行动回合数
+
+    # 最近活动时间
+    last_activity = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # 关联关系
+    session = relationship("Session", back_populates="stats")
+
+    def __repr__(self):
+        return (
+            f"<SessionStats(session_id={self.session_id}, messages={self.message_count}, "
+            f"tokens={self.token_total}, turns={self.turn_count})>"
+        )
+
+
+# ============================================================================
+# 当前游戏状态
+# ============================================================================
+
+class SessionState(Base):
+    """
+    当前游戏状态表（每个会话一行）
+
+    每次开局和行动时与关键事件在同一事务中覆盖写入，
+    读取当前状态只需一次主键查询，不再扫描事件的 JSON 快照。
+    """
+    __tablename__ = "session_states"
+
+    session_id = Column(String(36), ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True)
+
+    # 玩家状态
+    player_state = Column(JSON, nullable=False)  # 最新的玩家状态
+    day = Column(Integer, nullable=False, default=1)  # 当前天数
+    turn = Column(Integer, nullable=False, default=0)  # 当天回合
+
+    # 世界状态
+    company_info = Column(JSON, nullable=True)  # 公司信息（开局生成）
+    npcs = Column(JSON, nullable=True)  # 当前NPC名册（合并历次 updated_npcs）
+    magical_element = Column(JSON, nullable=True)  # 本回合的魔幻元素
+    recent_actions = Column(JSON, nullable=True)  # 最近几次行动 [{"choice_id": ..., "choice_text": ...}]
+
+    # 最近一个回合的AI内容（下一回合结算和本地降级生成的输入）
+    last_turn = Column(JSON, nullable=False)
+
+    # 时间戳
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # 关联关系
+    session = relationship("Session", back_populates="state")
+
+    def __repr__(self):
+        return f"<SessionState(session_id={self.session_id}, day={self.day}, turn={self.turn})>"
+
+
 # ============================================================================
 # 辅助函数
 # ============================================================================
@@ -491,6 +491,235 @@ FALLBACK_ENDINGS: Dict[str, Dict[str, Dict[str, str]]] = {
 }
 
 
+# ========== 本地回合文案素材库 ==========
+
+# 通用选项模板（按类别，{npc} 替换为NPC姓名）
+FALLBACK_CHOICE_TEMPLATES: Dict[str, List[Dict[str, Any]]] = {
+    "work": [
+        {"text": "埋头赶进度，把今天的任务清掉", "effects": {"energy": -12, "progress": 12, "suspicion": -5, "chill": -5}},
+        {"text": "主动在群里汇报工作成果", "effects": {"energy": -6, "progress": 5, "suspicion": -8, "connection": 3}},
+        {"text": "认真开完这场冗长的会议", "effects": {"energy": -10, "progress": 6, "suspicion": -4, "chill": -3}},
+    ],
+    "slack": [
+        {"text": "假装看文档，实则刷手机", "effects": {"energy": 5, "chill": 12, "suspicion": 6}},
+        {"text": "带薪如厕，顺便冥想十分钟", "effects": {"energy": 8, "chill": 10, "suspicion": 4, "progress": -2}},
+        {"text": "去茶水间慢慢泡一杯咖啡", "effects": {"energy": 6, "chill": 8, "suspicion": 3, "connection": 2}},
+    ],
+    "social": [
+        {"text": "和{npc}聊聊最近的八卦", "effects": {"energy": -4, "chill": 5, "connection": 10, "blackmail": 3}},
+        {"text": "帮{npc}解决一个小麻烦", "effects": {"energy": -8, "connection": 12, "progress": 2}},
+        {"text": "约{npc}中午一起吃饭", "effects": {"energy": 2, "chill": 4, "connection": 8}},
+    ],
+    "scheme": [
+        {"text": "悄悄记下{npc}的摸鱼证据", "effects": {"energy": -3, "blackmail": 12, "connection": -4, "suspicion": 2}},
+        {"text": "把锅甩给隔壁组", "effects": {"suspicion": -10, "connection": -8, "blackmail": 4}},
+    ],
+    "rest": [
+        {"text": "找个没人的会议室补个觉", "effects": {"energy": 25, "chill": 6, "suspicion": 8}},
+    ],
+    "cover": [
+        {"text": "加班到最后一个走，刷存在感", "effects": {"energy": -15, "suspicion": -15, "progress": 5}},
+    ],
+}
+
+# 通用剧情结果（按类别）
+FALLBACK_OUTCOME_LINES: Dict[str, List[str]] = {
+    "work": [
+        "你打开电脑，手指在键盘上飞舞，待办列表终于短了一截。",
+        "一番苦战之后，工作总算有了看得见的进展，只是肩膀开始发酸。",
+        "你硬着头皮把事情推进了一大步，连自己都有点意外。",
+    ],
+    "slack": [
+        "时间在指尖悄悄溜走，你感觉自己重新活了过来。",
+        "没人注意到你的小动作，这种偷来的惬意格外珍贵。",
+        "你把摸鱼的艺术发挥得淋漓尽致，心情舒畅了不少。",
+    ],
+    "social": [
+        "几句闲聊下来，你和{npc}的关系明显近了一步。",
+        "{npc}笑着拍了拍你的肩膀，看来这次交流很成功。",
+        "你从{npc}那里听到不少内幕，办公室的人际版图清晰了些。",
+    ],
+    "scheme": [
+        "你不动声色地收好了证据，说不定哪天就能派上用场。",
+        "这一手玩得很漂亮，但你隐约感觉有人在背后盯着你。",
+    ],
+    "rest": [
+        "短暂的休息让你恢复了元气，只是醒来时发现有人在看你。",
+    ],
+    "cover": [
+        "办公室的灯只剩你这一盏，明天老板大概会对你刮目相看。",
+    ],
+}
+
+# 通用老板反应（按类别）
+FALLBACK_BOSS_REACTIONS: Dict[str, List[str]] = {
+    "work": ["老板路过时点了点头，难得露出满意的表情。", "老板在群里点名表扬了你。"],
+    "slack": ["老板的目光从你工位扫过，似乎停顿了一秒。", "老板今天忙着开会，暂时没顾上你。"],
+    "social": ["老板看到你们聊得热络，若有所思。", "老板没说什么，只是多看了你一眼。"],
+    "scheme": ["老板似乎听到了些风声，但没有表态。"],
+    "rest": ["老板的助理好像往这边看了一眼。"],
+    "cover": ["老板走之前看到你还在加班，拍了拍你的椅背。"],
+}
+
+# 公司专属文案（键与 FALLBACK_COMPANIES 一致，缺少的类别使用通用文案）
+FALLBACK_COMPANY_TURN_LINES: Dict[str, Dict[str, Dict[str, List[Any]]]] = {
+    "tech_big": {
+        "choices": {
+            "work": [
+                {"text": "连夜写完OKR复盘，把数据做得漂漂亮亮", "effects": {"energy": -12, "progress": 10, "suspicion": -8, "chill": -4}},
+            ],
+            "slack": [
+                {"text": "去零食区囤货，顺便刷会儿内部八卦", "effects": {"energy": 6, "chill": 10, "suspicion": 5, "connection": 2}},
+            ],
+        },
+        "outcomes": {
+            "work": ["你把需求拆成十几个子任务，飞书上的进度条终于往前挪了一格。"],
+            "slack": ["你躲进人体工学椅里刷了半小时内网热帖，没人发现你的工位一直在“思考中”。"],
+        },
+        "boss_reactions": {
+            "work": ["老板在周会上说你的数据“很有颗粒度”。"],
+            "slack": ["老板在群里@全体：“最近有些同学的OKR进度需要对齐一下。”"],
+        },
+    },
+    "state_owned": {
+        "choices": {
+            "work": [
+                {"text": "把报告改成领导喜欢的格式，再去盖个章", "effects": {"energy": -8, "progress": 6, "suspicion": -8, "connection": 2}},
+            ],
+            "slack": [
+                {"text": "下午三点准时泡茶看报", "effects": {"energy": 8, "chill": 10, "suspicion": 2}},
+            ],
+        },
+        "outcomes": {
+            "work": ["文件在三个科室之间转了一圈，终于盖上了最后一个章。"],
+            "slack": ["茶叶在杯中慢慢舒展，整层楼都沉浸在下午三点的宁静里。"],
+        },
+        "boss_reactions": {
+            "work": ["处长端着保温杯点了点头：“小同志很踏实。”"],
+            "slack": ["处长路过时只说了一句：“年轻人还是要多学习。”"],
+        },
+    },
+    "startup_chaos": {
+        "choices": {
+            "work": [
+                {"text": "按老板今天的新想法重做一遍方案", "effects": {"energy": -14, "progress": 8, "suspicion": -6, "chill": -6}},
+            ],
+            "slack": [
+                {"text": "撸一会儿公司的吉祥物猫", "effects": {"energy": 6, "chill": 12, "suspicion": 4}},
+            ],
+        },
+        "outcomes": {
+            "work": ["你刚改完方案，白板上的计划又变了，不过总算有一部分能用。"],
+            "slack": ["吉祥物猫在你腿上睡着了，你心安理得地陪它坐了半小时。"],
+        },
+        "boss_reactions": {
+            "work": ["老板激动地说：“等我们上市，期权少不了你的！”"],
+            "slack": ["老板正忙着给投资人画饼，没空管你。"],
+        },
+    },
+    "xianxia_fantasy": {
+        "choices": {
+            "work": [
+                {"text": "闭关修炼新功法，争取今日渡劫上线", "effects": {"energy": -14, "progress": 12, "suspicion": -6, "chill": -5}},
+            ],
+            "slack": [
+                {"text": "服下一枚咖啡丹药，在洞府里打坐", "effects": {"energy": 10, "chill": 10, "suspicion": 4}},
+            ],
+        },
+        "outcomes": {
+            "work": ["一番运功之后，你的功法又精进了一层，只是心魔隐隐作祟。"],
+            "slack": ["你在洞府中吐纳调息，灵气（其实是空调风）让你神清气爽。"],
+        },
+        "boss_reactions": {
+            "work": ["掌门微微颔首：“此子根骨不错。”"],
+            "slack": ["掌门神识扫过整座修炼塔，在你的洞府前停留了一瞬。"],
+        },
+    },
+    "cyberpunk": {
+        "choices": {
+            "work": [
+                {"text": "接入神经连接，直接把需求写进数据流", "effects": {"energy": -12, "progress": 12, "suspicion": -5, "chill": -5}},
+            ],
+            "slack": [
+                {"text": "用记忆芯片删掉刚才那场会议", "effects": {"energy": 6, "chill": 12, "suspicion": 6}},
+            ],
+        },
+        "outcomes": {
+            "work": ["数据流在你的视网膜上飞速滚动，任务队列被清空了一截。"],
+            "slack": ["你把监控画面循环播放了十分钟，在霓虹灯下偷得片刻自由。"],
+        },
+        "boss_reactions": {
+            "work": ["AI老板在你的视野角落弹出一行字：“效率达标。”"],
+            "slack": ["AI老板的监控指示灯闪了两下，又恢复了平静。"],
+        },
+    },
+    "cozy_small": {
+        "choices": {
+            "work": [
+                {"text": "和大家一起把周五的小项目收个尾", "effects": {"energy": -8, "progress": 8, "connection": 4, "suspicion": -4}},
+            ],
+            "slack": [
+                {"text": "给办公室的绿植浇浇水", "effects": {"energy": 6, "chill": 10, "suspicion": 2, "connection": 2}},
+            ],
+        },
+        "outcomes": {
+            "work": ["猫咪同事趴在键盘边看你干活，项目在轻松的氛围里推进了不少。"],
+            "slack": ["绿植好像开出了一朵小花，办公室里的钢琴正好响起一段舒缓的旋律。"],
+        },
+        "boss_reactions": {
+            "work": ["老板端来一杯热可可：“辛苦啦，别太累。”"],
+            "slack": ["老板笑着说：“适当休息一下也好。”"],
+        },
+    },
+}
+
+# 风格专属文案（键与 FALLBACK_STYLES 一致，与公司专属文案合并使用）
+FALLBACK_STYLE_TURN_LINES: Dict[str, Dict[str, Dict[str, List[Any]]]] = {
+    "internet_buzzwords": {
+        "outcomes": {
+            "work": ["你找到了这件事的抓手，打通了链路，形成了闭环。"],
+            "slack": ["你给自己做了一次深度复盘，结论是：需要先对齐一下自己的精力。"],
+        },
+    },
+    "satire_black": {
+        "outcomes": {
+            "work": ["你又为公司的福报添了一块砖，公司也一如既往地没有感谢你。"],
+            "slack": ["你在奋斗的洪流中偷偷上了岸，感恩公司给了你这片刻的清醒。"],
+        },
+    },
+    "down_to_earth": {
+        "outcomes": {
+            "work": ["搬了一上午的砖，你感觉自己就是一头勤勤恳恳的牛马。"],
+            "slack": ["打工人的快乐就是这么朴实无华：摸鱼成功。"],
+        },
+    },
+    "official_bureaucratic": {
+        "outcomes": {
+            "work": ["你高度重视、扎实推进，各项工作取得了阶段性成果。"],
+            "slack": ["你统筹协调了工作与休息的关系，身心得到了有效调整。"],
+        },
+    },
+    "ancient_xianxia": {
+        "outcomes": {
+            "work": ["你运转周天，将宗门任务一一了结，修为略有精进。"],
+            "slack": ["你暂避俗务，静心调息，道心重归澄明。"],
+        },
+    },
+    "cyberpunk_tech": {
+        "outcomes": {
+            "work": ["你的神经连接超频运转，巨型企业的齿轮又转了一圈。"],
+            "slack": ["你断开了数据流，在虚拟现实的缝隙里找到一点属于自己的低保真时光。"],
+        },
+    },
+    "cozy_warm": {
+        "outcomes": {
+            "work": ["在团队的互相帮助下，你又成长了一点点。"],
+            "slack": ["阳光洒在工位上，你觉得偶尔慢下来也很温暖。"],
+        },
+    },
+}
+
+
 # ========== 辅助函数 ==========
 
 def get_random_company(seed: int) -> Dict[str, Any]:
@@ -613,3 +842,40 @@ def get_all_style_names() -> List[str]:
             weighted_styles.extend([style_name] * 5)
 
     return weighted_styles
+
+
+def get_turn_lines(company: str, style: str) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    获取本地回合使用的文案（公司和风格专属文案优先，缺少的类别使用通用文案）
+
+    Args:
+        company: 公司类型或名称（也可以是 FALLBACK_COMPANIES 的键）
+        style: 风格名称（也可以是 FALLBACK_STYLES 的键）
+
+    Returns:
+        {"choices": {类别: 选项模板}, "outcomes": {类别: 剧情结果}, "boss_reactions": {类别: 老板反应}}
+    """
+    company_key = next(
+        (key for key, info in FALLBACK_COMPANIES.items() if company in (key, info["type"], info["name"])),
+        None
+    )
+    style_key = next(
+        (key for key, info in FALLBACK_STYLES.items() if style in (key, info["name"])),
+        None
+    )
+    specific = [
+        FALLBACK_COMPANY_TURN_LINES.get(company_key, {}),
+        FALLBACK_STYLE_TURN_LINES.get(style_key, {}),
+    ]
+
+    lines = {}
+    for kind, generic in (
+        ("choices", FALLBACK_CHOICE_TEMPLATES),
+        ("outcomes", FALLBACK_OUTCOME_LINES),
+        ("boss_reactions", FALLBACK_BOSS_REACTIONS),
+    ):
+        lines[kind] = {
+            category: [line for source in specific for line in source.get(kind, {}).get(category, [])] or pool
+            for category, pool in generic.items()
+        }
+    return lines
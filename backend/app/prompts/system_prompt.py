@@ -169,3 +169,64 @@ def build_context_prompt(
         prompt += "(游戏刚开始，你刚入职这家公司)\n"
 
     return prompt
+
+
+# 紧凑回合格式说明（字段含义见 app/services/wire_format.py）
+COMPACT_TURN_FORMAT = """**输出格式**：只返回一个紧凑JSON对象，使用以下短字段名，不要使用完整字段名：
+{"s": "剧情文本",
+ "c": [["选项ID", "选项文本(20字内)", "类别", [精力, 摸鱼值, 工作进度, 怀疑度, 人脉, 黑料]]],
+ "n": [{"i": "NPC的id", "a": 好感度变化, "r": "新角色", "p": "新性格"}],
+ "r": {"b": "老板反应", "c": "同事反应", "x": {"NPC的id": "反应"}},
+ "e": [["事件类型", "事件描述"]],
+ "m": ["object|phenomenon|ability", "名称", "描述", "效果"],
+ "f": ["点缀文案"]}
+- c 为3-6个选项，效果数组固定6个整数增量，没有影响写0
+- n 只列出本回合有变化的NPC，只写变化的字段；"i" 和 x 的键使用【当前世界】中NPC的 id；新NPC自拟 id，并需要 "nm" 姓名、"r"、"p"
+- n、r、e、m、f 没有内容时省略"""
+
+# 服务端无法结算时，紧凑格式额外返回的状态字段
+COMPACT_STATE_FORMAT = """- 另外返回 "d": {"e": 精力变化, "ch": 摸鱼值变化, "p": 进度变化, "su": 怀疑度变化, "co": 人脉变化, "b": 黑料变化}，只写有变化的属性"""
+
+
+def build_turn_prompt(user_action: str, resolution=None, compact: bool = False) -> str:
+    """
+    构建后续回合的玩家行动提示词
+
+    有服务端结算结果时，只要求AI叙述剧情和生成新选项，不再回传状态字段。
+
+    Args:
+        user_action: 玩家行动（选项ID）
+        resolution: 服务端结算结果（TurnResolution），None 时由AI自行更新状态
+        compact: 是否要求紧凑格式输出
+
+    Returns:
+        玩家行动提示词
+    """
+    if resolution is None:
+        prompt = f"玩家选择了: {user_action}\n请根据这个选择生成后续剧情和新的选项。"
+        if compact:
+            prompt += f"\n\n{COMPACT_TURN_FORMAT}\n{COMPACT_STATE_FORMAT}"
+        return prompt
+
+    state = resolution.player_state
+    events = "；".join(event.get("message", "") for event in resolution.events) or "无"
+    prompt = f"""玩家选择了: {resolution.choice.get('text') or user_action}
+
+**本回合结算结果**（已由服务器计算，请以此为准）:
+- 行动效果: {resolution.feedback}
+- 精力: {state.get('energy')}，摸鱼值: {state.get('chill')}，人脉: {state.get('connection')}，黑料: {state.get('blackmail')}
+- 怀疑度: {state.get('suspicion')}，工作进度: {state.get('progress')}%
+- 第{state.get('day')}天，第{state.get('week')}周，当天回合 {state.get('turn')}/7
+- 触发事件: {events}
+"""
+    if resolution.is_game_over:
+        prompt += f"""- 游戏结束: {resolution.game_over_reason}
+
+请根据结算结果叙述结局剧情，选项返回空列表。"""
+    else:
+        prompt += """
+请根据结算结果叙述剧情并生成新的选项（每个选项都要有效果）。
+不要返回 player_state、is_game_over、game_over_reason 字段，这些由服务器计算。"""
+    if compact:
+        prompt += f"\n\n{COMPACT_TURN_FORMAT}"
+    return prompt
@@ -3,10 +3,14 @@
 
 提供数据库连接、初始化和会话管理功能
 """
+from sqlalchemy import inspect, text
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.core.config import settings
+from app.core.logging import logger
 from app.models.database import Base
+from app.repositories.unit_of_work import UnitOfWork
 
 
 # 创建异步引擎
@@ -28,14 +32,16 @@ async def get_db_session():
     """
     获取数据库会话（FastAPI依赖注入）
 
-    FastAPI会自动调用这个generator函数并管理session的生命周期
+    FastAPI会自动调用这个generator函数并管理session的生命周期。
+    请求内的写入构成一个工作单元，在这里一次提交（端点已提交时为空操作）。
     """
     async with async_session_maker() as session:
+        unit_of_work = UnitOfWork(session)
         try:
             yield session
-            await session.commit()
+            await unit_of_work.commit()
         except Exception:
-            await session.rollback()
+            await unit_of_work.rollback()
             raise
         finally:
             await session.close()
@@ -45,14 +51,74 @@ async def init_database():
     """
     初始化数据库
 
-    创建所有表（如果不存在）
+    创建所有表（如果不存在），为已有表补充新增的列，并重建列有变化的索引
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_rebuild_changed_indexes)
 
     print("✅ 数据库初始化完成")
 
 
+def _add_missing_columns(sync_conn) -> None:
+    """
+    为已有表补充模型中新增的列（create_all 不会修改已存在的表）
+
+    只处理可空或带 server_default 的列；其他结构变更需要手动迁移。
+
+    Args:
+        sync_conn: 同步数据库连接（run_sync 传入）
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"⚠️ 无法自动添加非空列 {table.name}.{column.name}，需要手动迁移")
+                continue
+
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=sync_conn.dialect)}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += f" DEFAULT {default.text if isinstance(default, TextClause) else repr(str(default))}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            sync_conn.execute(text(ddl))
+            logger.info(f"🛠️ 添加列 {table.name}.{column.name}")
+
+
+def _rebuild_changed_indexes(sync_conn) -> None:
+    """
+    重建列与模型定义不一致的同名索引（create_all 不会修改已存在的索引）
+
+    Args:
+        sync_conn: 同步数据库连接（run_sync 传入）
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"]: index["column_names"] for index in inspector.get_indexes(table.name)}
+
+        for index in table.indexes:
+            columns = [column.name for column in index.columns]
+            if index.name not in existing or existing[index.name] == columns:
+                continue
+            index.drop(sync_conn)
+            index.create(sync_conn)
+            logger.info(f"🛠️ 重建索引 {index.name}: {existing[index.name]} -> {columns}")
+
+
 async def close_database():
     """
     关闭数据库连接
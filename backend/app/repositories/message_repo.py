@@ -1,14 +1,60 @@
 """
 消息数据访问层
 
-负责messages表的CRUD操作
+负责messages表的CRUD操作，以及按 (created_at, id) 游标读取最近的消息窗口和分页
 """
+import base64
 import uuid
-from typing import List, Optional
-from sqlalchemy import select
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Union
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import Message
+from app.repositories.stats_repo import SessionStatsRepository
+
+
+# 构建提示词需要的列（窗口读取不加载完整ORM实体）
+WINDOW_COLUMNS = (Message.id, Message.role, Message.content, Message.tokens, Message.created_at)
+
+
+class MessageCursor(NamedTuple):
+    """
+    消息游标（按 created_at, id 排序，id 区分同一时间戳的消息）
+    """
+    created_at: datetime
+    id: str
+
+    @classmethod
+    def of(cls, message) -> "MessageCursor":
+        """消息（实体或窗口行）对应的游标"""
+        return cls(message.created_at, message.id)
+
+    def encode(self) -> str:
+        """编码为不透明的游标字符串（用于API）"""
+        raw = f"{self.created_at.isoformat()}|{self.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "MessageCursor":
+        """
+        解析游标字符串
+
+        Raises:
+            ValueError: 游标格式错误
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+            created_at, message_id = raw.split("|", 1)
+            return cls(datetime.fromisoformat(created_at), message_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"无效的游标: {token}") from e
+
+
+# 起点：游标，或时间点（例如摘要水位线，只比较 created_at）
+MessageBound = Union[MessageCursor, datetime, None]
 
 
 class MessageRepository:
@@ -22,22 +68,25 @@ class MessageRepository:
             db_session: 数据库会话
         """
         self.db = db_session
+        self.stats_repo = SessionStatsRepository(db_session)
 
     async def create(
         self,
         session_id: str,
         role: str,
         content: str,
-        tokens: Optional[int] = None
+        tokens: Optional[int] = None,
+        created_at: Optional[datetime] = None
     ) -> str:
         """
-        创建消息
+        创建消息（加入当前工作单元，不单独提交）
 
         Args:
             session_id: 会话ID
             role: 消息角色
             content: 消息内容
             tokens: Token数量
+            created_at: 创建时间（默认为当前时间；同一事务写入多条消息时决定顺序）
 
         Returns:
             消息ID
@@ -49,11 +98,12 @@ class MessageRepository:
             session_id=session_id,
             role=role,
             content=content,
-            tokens=tokens
+            tokens=tokens,
+            created_at=created_at or datetime.utcnow()
         )
 
         self.db.add(message)
-        await self.db.commit()
+        self.stats_repo.increment(session_id, messages=1, tokens=tokens or 0)
 
         return message_id
 
@@ -63,25 +113,59 @@ class MessageRepository:
         limit: Optional[int] = None
     ) -> List[Message]:
         """
-        获取会话的所有消息
+        获取会话的消息
 
         Args:
             session_id: 会话ID
-            limit: 最大数量
+            limit: 最大数量（指定时返回最新的 limit 条）
 
         Returns:
-            消息列表
+            消息列表（按时间排序）
         """
-        query = select(Message).where(
-            Message.session_id == session_id
-        ).order_by(Message.created_at)
+        query = select(Message).where(Message.session_id == session_id)
 
         if limit:
-            query = query.limit(limit)
+            query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+            result = await self.db.execute(query)
+            return list(reversed(result.scalars().all()))
 
-        result = await self.db.execute(query)
+        result = await self.db.execute(query.order_by(Message.created_at, Message.id))
         return list(result.scalars().all())
 
+    async def get_window(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        after: MessageBound = None
+    ) -> List[Row]:
+        """
+        读取最近的消息窗口
+
+        按 idx_session_messages 索引倒序读取最新的 limit 条（after 之后），
+        再按时间顺序返回，扫描量只与 limit 有关，与会话长度无关。
+
+        Args:
+            session_id: 会话ID
+            limit: 最大数量（None=after之后的全部）
+            after: 只返回该游标/时间之后的消息
+
+        Returns:
+            消息行（id, role, content, tokens, created_at），按时间排序
+        """
+        query = select(*WINDOW_COLUMNS).where(Message.session_id == session_id)
+        if isinstance(after, MessageCursor):
+            query = query.where(_cursor_key() > tuple_(after.created_at, after.id))
+        elif after is not None:
+            query = query.where(Message.created_at > after)
+
+        if limit:
+            query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+            result = await self.db.execute(query)
+            return list(reversed(result.all()))
+
+        result = await self.db.execute(query.order_by(Message.created_at, Message.id))
+        return list(result.all())
+
     async def count_tokens(self, session_id: str) -> int:
         """
         统计会话的总token数
@@ -92,5 +176,58 @@ class MessageRepository:
         Returns:
             总token数
         """
-        messages = await self.get_by_session(session_id)
-        return sum(m.tokens or 0 for m in messages)
+        stats = await self.stats_repo.get(session_id)
+        return stats.token_total if stats else 0
+
+    async def get_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[MessageCursor] = None
+    ) -> List[Row]:
+        """
+        按游标向前翻页（keyset分页，每页扫描量只与 limit 有关）
+
+        Args:
+            session_id: 会话ID
+            limit: 每页数量
+            before: 返回该游标之前最新的 limit 条（None=最新一页）
+
+        Returns:
+            消息行（id, role, content, tokens, created_at），按时间排序
+        """
+        query = select(*WINDOW_COLUMNS).where(Message.session_id == session_id)
+        if before is not None:
+            query = query.where(_cursor_key() < tuple_(before.created_at, before.id))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+        result = await self.db.execute(query)
+        return list(reversed(result.all()))
+
+    async def get_after(
+        self,
+        session_id: str,
+        limit: int,
+        after: Optional[MessageCursor] = None
+    ) -> List[Row]:
+        """
+        按游标向后读取（按时间顺序导出全部消息时使用）
+
+        Args:
+            session_id: 会话ID
+            limit: 每批数量
+            after: 返回该游标之后最早的 limit 条（None=从第一条开始）
+
+        Returns:
+            消息行（id, role, content, tokens, created_at），按时间排序
+        """
+        query = select(*WINDOW_COLUMNS).where(Message.session_id == session_id)
+        if after is not None:
+            query = query.where(_cursor_key() > tuple_(after.created_at, after.id))
+        query = query.order_by(Message.created_at, Message.id).limit(limit)
+        result = await self.db.execute(query)
+        return list(result.all())
+
+
+def _cursor_key():
+    """游标比较用的 (created_at, id) 行值"""
+    return tuple_(Message.created_at, Message.id)
@@ -9,6 +9,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import Session as SessionModel
+from app.repositories.stats_repo import SessionStatsRepository
 
 
 class SessionRepository:
@@ -25,7 +26,7 @@ class SessionRepository:
 
     async def create(self, seed: int, metadata: Optional[dict] = None) -> str:
         """
-        创建新会话
+        创建新会话（加入当前工作单元，不单独提交）
 
         Args:
             seed: 随机种子
@@ -44,7 +45,7 @@ class SessionRepository:
         )
 
         self.db.add(session)
-        await self.db.commit()
+        SessionStatsRepository(self.db).create(session_id)
 
         return session_id
 
@@ -64,7 +65,7 @@ class SessionRepository:
 
     async def update_status(self, session_id: str, status: str) -> bool:
         """
-        更新会话状态
+        更新会话状态（不单独提交）
 
         Args:
             session_id: 会话ID
@@ -78,12 +79,11 @@ class SessionRepository:
             return False
 
         session.status = status
-        await self.db.commit()
         return True
 
     async def delete(self, session_id: str) -> bool:
         """
-        删除会话
+        删除会话（不单独提交）
 
         Args:
             session_id: 会话ID
@@ -96,5 +96,4 @@ class SessionRepository:
             return False
 
         await self.db.delete(session)
-        await self.db.commit()
         return True
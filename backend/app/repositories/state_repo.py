@@ -0,0 +1,55 @@
+"""
+当前游戏状态数据访问层
+
+负责session_states表的读取和覆盖写入
+"""
+from typing import Any, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import SessionState
+
+
+class SessionStateRepository:
+    """当前游戏状态数据访问类"""
+
+    def __init__(self, db_session: AsyncSession):
+        """
+        初始化仓库
+
+        Args:
+            db_session: 数据库会话
+        """
+        self.db = db_session
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        """
+        获取会话的当前状态（主键查询）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            当前状态，没有记录时返回None
+        """
+        return await self.db.get(SessionState, session_id)
+
+    async def save(self, session_id: str, **fields: Any) -> SessionState:
+        """
+        覆盖写入当前状态（不提交，由调用方随关键事件一起提交）
+
+        Args:
+            session_id: 会话ID
+            **fields: SessionState 的列
+
+        Returns:
+            当前状态
+        """
+        state = await self.get(session_id)
+        if state is None:
+            state = SessionState(session_id=session_id, **fields)
+            self.db.add(state)
+        else:
+            for name, value in fields.items():
+                setattr(state, name, value)
+        return state
@@ -0,0 +1,220 @@
+"""
+会话统计数据访问层
+
+负责session_stats表的增量更新和读取。增量先累计在数据库会话中，
+提交工作单元时（UnitOfWork.commit）每个会话合并为一条 UPDATE。
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import KeyEvent, Message, Session as SessionModel, SessionStats, Summary
+
+
+# 数据库会话 info 中累计增量的键：{session_id: {列名: 增量}}
+_PENDING_KEY = "session_stats_pending"
+
+# 支持 INSERT ... ON CONFLICT DO NOTHING 的方言
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def insert_stats_if_missing(dialect_name: str, values: dict):
+    """
+    构建“统计记录已存在时忽略”的插入语句
+
+    Args:
+        dialect_name: 数据库方言名称（postgresql/sqlite）
+        values: 统计记录的列值
+
+    Returns:
+        INSERT ... ON CONFLICT (session_id) DO NOTHING 语句，其他方言返回None
+    """
+    dialect_insert = _UPSERT_INSERTS.get(dialect_name)
+    if dialect_insert is None:
+        return None
+    return dialect_insert(SessionStats).values(**values).on_conflict_do_nothing(
+        index_elements=[SessionStats.session_id]
+    )
+
+
+class SessionStatsRepository:
+    """会话统计数据访问类"""
+
+    def __init__(self, db_session: AsyncSession):
+        """
+        初始化仓库
+
+        Args:
+            db_session: 数据库会话
+        """
+        self.db = db_session
+
+    def create(self, session_id: str) -> SessionStats:
+        """
+        为新会话添加统计记录（不提交，随会话一起提交）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            统计记录
+        """
+        stats = SessionStats(
+            session_id=session_id,
+            message_count=0,
+            token_total=0,
+            summarized_token_total=0,
+            turn_count=0,
+            last_activity=datetime.utcnow()
+        )
+        self.db.add(stats)
+        return stats
+
+    def increment(
+        self,
+        session_id: str,
+        messages: int = 0,
+        tokens: int = 0,
+        summarized_tokens: int = 0,
+        turns: int = 0
+    ) -> None:
+        """
+        累计计数增量（不访问数据库，提交工作单元时写入）
+
+        Args:
+            session_id: 会话ID
+            messages: 新增消息数
+            tokens: 新增消息token数
+            summarized_tokens: 新增被摘要覆盖的token数
+            turns: 新增回合数
+        """
+        deltas = self.db.info.setdefault(_PENDING_KEY, {}).setdefault(session_id, {
+            "message_count": 0,
+            "token_total": 0,
+            "summarized_token_total": 0,
+            "turn_count": 0,
+        })
+        deltas["message_count"] += messages
+        deltas["token_total"] += tokens
+        deltas["summarized_token_total"] += summarized_tokens
+        deltas["turn_count"] += turns
+
+    async def apply_pending(self) -> None:
+        """
+        把累计的增量写入数据库（每个会话一条 UPDATE，同时刷新最近活动时间，不提交）
+        """
+        pending = self.db.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+
+        await self.db.flush()
+        now = datetime.utcnow()
+        for session_id, deltas in pending.items():
+            result = await self.db.execute(
+                update(SessionStats)
+                .where(SessionStats.session_id == session_id)
+                .values(
+                    **{name: getattr(SessionStats, name) + value for name, value in deltas.items()},
+                    last_activity=now
+                )
+            )
+            if result.rowcount == 0:
+                # 统计表上线前创建的会话：从历史回填（已包含本次写入）
+                await self._backfill(session_id)
+
+    def discard_pending(self) -> None:
+        """丢弃累计的增量（回滚时调用）"""
+        self.db.info.pop(_PENDING_KEY, None)
+
+    async def get(self, session_id: str) -> Optional[SessionStats]:
+        """
+        获取会话统计（主键查询）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            统计记录（包含本事务中尚未写入的增量），会话不存在时返回None
+        """
+        if session_id in self.db.info.get(_PENDING_KEY, {}):
+            await self.apply_pending()
+
+        stats = await self.db.get(SessionStats, session_id)
+        if stats is None:
+            stats = await self._backfill(session_id)
+        return stats
+
+    async def _backfill(self, session_id: str) -> Optional[SessionStats]:
+        """
+        从消息、摘要和事件历史计算统计并写入（每个旧会话只执行一次）
+
+        并发请求可能同时回填同一会话，插入冲突时保留已有记录。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            统计记录，会话不存在时返回None
+        """
+        if await self.db.get(SessionModel, session_id) is None:
+            return None
+        await self.db.flush()
+
+        result = await self.db.execute(
+            select(
+                func.count(Message.id),
+                func.coalesce(func.sum(Message.tokens), 0),
+                func.max(Message.created_at)
+            ).where(Message.session_id == session_id)
+        )
+        message_count, token_total, last_message_at = result.one()
+
+        watermark = (await self.db.execute(
+            select(Summary.covers_until, Summary.covers_until_id)
+            .where(Summary.session_id == session_id, Summary.covers_until.is_not(None))
+            .order_by(Summary.covers_until.desc(), Summary.covers_until_id.desc())
+            .limit(1)
+        )).first()
+        summarized_token_total = 0
+        if watermark is not None:
+            # 按 (created_at, id) 比较，与摘要水位线游标一致；旧摘要只有创建时间
+            if watermark.covers_until_id:
+                covered = tuple_(Message.created_at, Message.id) <= tuple_(
+                    watermark.covers_until, watermark.covers_until_id
+                )
+            else:
+                covered = Message.created_at <= watermark.covers_until
+            summarized_token_total = (await self.db.execute(
+                select(func.coalesce(func.sum(Message.tokens), 0)).where(
+                    and_(Message.session_id == session_id, covered)
+                )
+            )).scalar_one()
+
+        turn_count = (await self.db.execute(
+            select(func.count(KeyEvent.id)).where(
+                and_(KeyEvent.session_id == session_id, KeyEvent.event_type == "action_choice")
+            )
+        )).scalar_one()
+
+        values = {
+            "session_id": session_id,
+            "message_count": message_count,
+            "token_total": int(token_total),
+            "summarized_token_total": int(summarized_token_total),
+            "turn_count": turn_count,
+            "last_activity": last_message_at or datetime.utcnow(),
+        }
+        statement = insert_stats_if_missing(self.db.bind.dialect.name, values)
+        if statement is not None:
+            await self.db.execute(statement)
+        else:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(SessionStats).values(**values))
+            except IntegrityError:
+                pass
+        return await self.db.get(SessionStats, session_id, populate_existing=True)
@@ -0,0 +1,35 @@
+"""
+工作单元
+
+一次请求（或一个后台任务）内的所有写入只加入数据库会话，不在各个仓库/服务中单独提交，
+最后由 UnitOfWork.commit() 一次提交：
+1. 会话统计的累计增量合并为每个会话一条 UPDATE
+2. 所有待写入的消息、事件、状态在同一事务中刷入并提交（SQLite 上一次 fsync）
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.stats_repo import SessionStatsRepository
+
+
+class UnitOfWork:
+    """单事务工作单元"""
+
+    def __init__(self, db_session: AsyncSession):
+        """
+        初始化工作单元
+
+        Args:
+            db_session: 数据库会话
+        """
+        self.db = db_session
+        self.stats_repo = SessionStatsRepository(db_session)
+
+    async def commit(self) -> None:
+        """写入累计的统计增量并提交事务"""
+        await self.stats_repo.apply_pending()
+        await self.db.commit()
+
+    async def rollback(self) -> None:
+        """回滚事务并丢弃累计的统计增量"""
+        self.stats_repo.discard_pending()
+        await self.db.rollback()
@@ -18,17 +18,18 @@ AI 服务 v2.1 - 性能优化版
 - temperature: 0.7（平衡创意和速度）
 - max_tokens: 2048（初始）/ 1024（回合）
 """
-import json
+import asyncio
+import copy
 import random
-import re
 import time
 from functools import wraps
-from typing import Literal, Optional
-from openai import AsyncOpenAI
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal, Optional
 from loguru import logger
 from hashlib import md5
 
 from app.core.config import settings
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.core.game_engine import TurnResolution, resolve_turn
 from app.prompts.fallback_library import (
     get_random_company,
     get_random_npcs,
@@ -36,14 +37,29 @@ from app.prompts.fallback_library import (
     get_style_by_name,
     FALLBACK_STYLES,
 )
-from app.prompts.system_prompt import build_user_prompt
+from app.prompts.system_prompt import build_turn_prompt, build_user_prompt
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.services.content_validator import ContentValidator
+from app.services.fallback_turn_engine import FallbackTurnEngine
+from app.services.cache_backends import create_cache_backend
+from app.services.hedging import RequestHedger
+from app.services.json_repair import repair_json, repair_turn
+from app.services.llm_scheduler import LLMPriority, LLMScheduler
+from app.services.partial_regeneration import (
+    REPAIR_SYSTEM_PROMPT,
+    build_repair_prompt,
+    merge_repair,
+    plan_initial_repair,
+)
+from app.services.provider_router import ProviderRouter
+from app.services.single_flight import SingleFlight
+from app.services.stream_parser import TurnStreamParser, parse_turn_payload
+from app.services.structured_output import build_response_format
+from app.services.wire_format import expand_choice, expand_turn
 
 
-# 简单的内存缓存（生产环境建议用Redis）
-_cache: dict[str, dict] = {}
-_CACHE_MAX_SIZE = 100
-_CACHE_TTL = 3600  # 1小时缓存
+# 响应缓存（后端由 AI_CACHE_BACKEND 决定，sqlite/redis 可在多个 worker 间共享）
+_cache = create_cache_backend()
 
 
 # 性能监控装饰器
@@ -85,7 +101,7 @@ class AIServiceV2:
 
     # 单例实例（性能优化：避免重复创建client）
     _instance: Optional['AIServiceV2'] = None
-    _client: Optional[AsyncOpenAI] = None
+    _router: Optional[ProviderRouter] = None
 
     def __new__(cls):
         """单例模式：全局只创建一个AIService实例"""
@@ -100,28 +116,120 @@ class AIServiceV2:
         if hasattr(self, '_initialized') and self._initialized:
             return
 
-        if not settings.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY 未配置")
-
-        # 全局共享的client实例（性能优化）
-        if AIServiceV2._client is None:
-            AIServiceV2._client = AsyncOpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                base_url=settings.OPENAI_BASE_URL if settings.OPENAI_BASE_URL else None
-            )
+        # 全局共享的供应商路由（多端点/多Key时按延迟、错误率、限流余量选择）
+        if AIServiceV2._router is None:
+            AIServiceV2._router = ProviderRouter.from_settings()
 
-        self.client = AIServiceV2._client
+        self.router = AIServiceV2._router
+        self.client = self.router.endpoints[0].client
 
         # 使用配置中的模型（如果有），否则使用默认
         self.model = getattr(settings, 'OPENAI_MODEL', self.MODEL)
         self.temperature = getattr(settings, 'OPENAI_TEMPERATURE', self.TEMPERATURE)
 
+        # 后续回合使用紧凑输出格式
+        self.compact_turns = settings.AI_COMPACT_TURNS
+
+        # 结构化输出约束级别
+        self.structured_output = settings.AI_STRUCTURED_OUTPUT
+
         # 初始化验证器
         self.validator = ContentValidator()
 
+        # 并发相同请求合并
+        self._flights = SingleFlight()
+
+        # 全局LLM调用准入控制
+        self.scheduler = LLMScheduler()
+
+        # 长尾延迟对冲
+        self.hedger = RequestHedger()
+
+        # 供应商故障熔断
+        self.breaker = CircuitBreaker()
+
+        # 回合本地降级生成器
+        self.fallback_engine = FallbackTurnEngine()
+
+        # 初始回合局部重生成统计
+        self._repair_stats = {"attempts": 0, "repaired": 0, "failed": 0, "fragments": 0}
+
         self._initialized = True
         logger.info(f"🚀 AI服务初始化 - 模型: {self.model}, 温度: {self.temperature}")
 
+    async def coalesce(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        合并相同键的并发调用（single-flight）
+
+        Args:
+            key: 合并键
+            factory: 无参协程工厂，只有第一个到达的请求会执行
+
+        Returns:
+            共享的调用结果（失败时所有等待者收到同一个异常）
+        """
+        return await self._flights.do(key, factory)
+
+    def get_coalescing_stats(self) -> dict:
+        """
+        获取请求合并统计
+
+        Returns:
+            进行中的调用数、合并次数等
+        """
+        return self._flights.get_stats()
+
+    async def _create_completion(
+        self,
+        priority: LLMPriority,
+        task: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """
+        在全局并发上限内调用模型（非流式）
+
+        玩家正在等待的调用（回合、开局）指定 task 时参与请求对冲，
+        后台调用不对冲。熔断器打开时立即抛出 CircuitOpenError。
+
+        Args:
+            priority: 调用优先级
+            task: 任务类型（用于统计延迟和对冲阈值）
+            **kwargs: 透传给 chat.completions.create 的参数
+
+        Returns:
+            模型响应
+        """
+        async def call():
+            # 熔断统计在获得名额之后开始，排队时间不算慢调用
+            async with self.breaker.guard():
+                return await self.router.create(**kwargs)
+
+        def admission():
+            return self.scheduler.slot(priority)
+
+        # 熔断中直接失败，不进入排队
+        self.breaker.check()
+        if task is None or priority > LLMPriority.START:
+            async with admission():
+                return await call()
+        # 对冲计时从获得名额后开始，排队中不对冲
+        return await self.hedger.run(task, call, admission=admission)
+
+    def _response_format(self, kind: str) -> dict:
+        """
+        结构化输出参数（展开到 chat.completions.create 的关键字参数中）
+
+        Args:
+            kind: 响应类型（initial_turn / next_turn）
+
+        Returns:
+            {"response_format": ...}，关闭时为空字典
+        """
+        if kind == "next_turn" and self.compact_turns:
+            kind = "next_turn_compact"
+        response_format = build_response_format(kind, self.structured_output)
+        return {"response_format": response_format} if response_format else {}
+
     @staticmethod
     def _make_cache_key(*args) -> str:
         """生成缓存键"""
@@ -129,19 +237,29 @@ class AIServiceV2:
         return md5(key_str.encode()).hexdigest()
 
     @staticmethod
-    def _get_cache(key: str) -> Optional[dict]:
-        """获取缓存"""
-        return _cache.get(key)
+    async def _get_cache(key: str) -> Optional[dict]:
+        """获取缓存（过期条目或后端故障视为未命中）"""
+        return await _cache.get(key)
+
+    @staticmethod
+    async def _set_cache(key: str, value: dict) -> None:
+        """设置缓存（后端故障时只记录告警）"""
+        await _cache.set(key, value)
+
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """
+        获取响应缓存统计
+
+        Returns:
+            后端名称、命中/未命中计数及后端自身的指标
+        """
+        return _cache.get_stats()
 
     @staticmethod
-    def _set_cache(key: str, value: dict) -> None:
-        """设置缓存（LRU策略）"""
-        global _cache
-        # 超过最大缓存数，删除最早的
-        if len(_cache) >= _CACHE_MAX_SIZE:
-            oldest_key = next(iter(_cache))
-            del _cache[oldest_key]
-        _cache[key] = value
+    async def close_cache() -> None:
+        """关闭缓存后端连接（应用退出时调用）"""
+        await _cache.close()
 
     @log_execution_time("AI生成初始回合")
     async def generate_initial_turn(
@@ -167,13 +285,59 @@ class AIServiceV2:
         Returns:
             AI生成的内容或素材库降级内容
         """
-        # 检查缓存（性能优化）
+        # 相同请求并发到达时只调用一次AI
         cache_key = self._make_cache_key("initial", player_name, difficulty, seed)
-        cached_result = self._get_cache(cache_key)
-        if cached_result:
+        try:
+            result = await self.coalesce(
+                cache_key,
+                lambda: self._cached_initial_turn(cache_key, player_name, difficulty, seed)
+            )
+            # 合并的请求共享同一个对象，返回副本避免互相修改
+            return copy.deepcopy(result)
+
+        except Exception as e:
+            logger.warning(f"⚠️ AI生成初始内容失败，使用素材库降级: {e}")
+            return self._generate_fallback_initial(seed, player_name)
+
+    async def _cached_initial_turn(
+        self,
+        cache_key: str,
+        player_name: str,
+        difficulty: str,
+        seed: int
+    ) -> dict:
+        """先查缓存，未命中时调用AI生成并写入缓存"""
+        cached_result = await self._get_cache(cache_key)
+        if cached_result is not None:
             logger.info(f"💾 命中缓存 - Seed: {seed}")
             return cached_result
 
+        result = await self.request_initial_turn(player_name, difficulty, seed)
+        await self._set_cache(cache_key, result)
+        return result
+
+    async def request_initial_turn(
+        self,
+        player_name: str,
+        difficulty: str,
+        seed: int,
+        priority: LLMPriority = LLMPriority.START
+    ) -> dict:
+        """
+        调用AI生成并验证初始回合（不降级、不缓存）
+
+        Args:
+            player_name: 玩家名称（世界池预生成时为占位符）
+            difficulty: 难度
+            seed: 随机种子
+            priority: 调用优先级（世界池补充使用后台优先级）
+
+        Returns:
+            通过质量验证的AI生成内容
+
+        Raises:
+            ValueError: AI返回空响应、格式错误或内容质量不合格
+        """
         # 设置随机种子（保证同一会话内输出一致）
         random.seed(seed)
         system_prompt = self._get_system_prompt()
@@ -184,57 +348,128 @@ class AIServiceV2:
             is_initial=True
         )
 
-        # 策略1: 尝试AI生成（优化参数）
-        try:
-            api_start = time.time()
-            response = await self.client.chat.completions.create(
+        api_start = time.time()
+        response = await self._create_completion(
+            priority,
+            task="initial_turn",
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=self.temperature,
+            max_tokens=self.MAX_TOKENS_INITIAL,  # 使用优化后的2048
+            timeout=20.0,  # 缩短超时时间（原来60秒太SB）
+            **self._response_format("initial_turn"),
+        )
+        api_time = time.time() - api_start
+        logger.info(f"⚡ API调用耗时: {api_time:.3f}秒")
+
+        content = response.choices[0].message.content
+        if not content:
+            raise ValueError("AI返回了空响应")
+
+        # 解析JSON响应
+        parse_start = time.time()
+        result = self._parse_ai_response(content)
+        parse_time = time.time() - parse_start
+        logger.info(f"🔍 JSON解析耗时: {parse_time:.3f}秒")
+
+        # 验证AI生成的内容质量
+        validate_start = time.time()
+        is_valid, errors = self.validator.validate_initial_response(result)
+        validate_time = time.time() - validate_start
+        logger.info(f"✅ 内容验证耗时: {validate_time:.3f}秒")
+
+        if not is_valid:
+            result = await self._regenerate_invalid_fragments(result, errors, seed, priority)
+
+        logger.success(f"✅ AI生成初始内容成功 - Seed: {seed}")
+        return result
+
+    async def _regenerate_invalid_fragments(
+        self,
+        result: dict,
+        errors: list[str],
+        seed: int,
+        priority: LLMPriority
+    ) -> dict:
+        """
+        初始回合验证失败时只重生成无效片段，合并后重新验证
+
+        Args:
+            result: 验证失败的初始回合
+            errors: 验证错误
+            seed: 随机种子
+            priority: 调用优先级
+
+        Returns:
+            修复后通过验证的初始回合
+
+        Raises:
+            ValueError: 无效片段过多、重生成结果无法解析或修复后仍不合格
+        """
+        max_fragments = settings.AI_PARTIAL_REPAIR_MAX_FRAGMENTS
+        plan = plan_initial_repair(result, seed, max_fragments) if max_fragments > 0 else None
+        if plan is None:
+            raise ValueError(f"AI内容质量不合格: {errors}")
+
+        self._repair_stats["attempts"] += 1
+        self._repair_stats["fragments"] += plan.fragment_count
+        logger.info(
+            f"🧩 局部重生成 - 片段: {plan.fragment_count}, max_tokens: {plan.max_tokens}, "
+            f"本地修复: {plan.local_fixes}"
+        )
+
+        if plan.fragment_count:
+            response = await self._create_completion(
+                priority,
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
+                    {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+                    {"role": "user", "content": build_repair_prompt(result, plan)},
                 ],
                 temperature=self.temperature,
-                max_tokens=self.MAX_TOKENS_INITIAL,  # 使用优化后的2048
-                timeout=20.0,  # 缩短超时时间（原来60秒太SB）
+                max_tokens=plan.max_tokens,
+                timeout=10.0,
+                **({"response_format": {"type": "json_object"}} if self.structured_output != "off" else {}),
             )
-            api_time = time.time() - api_start
-            logger.info(f"⚡ API调用耗时: {api_time:.3f}秒")
-
-            content = response.choices[0].message.content
-            if not content:
-                raise ValueError("AI返回了空响应")
-
-            # 解析JSON响应
-            parse_start = time.time()
-            result = self._parse_ai_response(content)
-            parse_time = time.time() - parse_start
-            logger.info(f"🔍 JSON解析耗时: {parse_time:.3f}秒")
-
-            # 验证AI生成的内容质量
-            validate_start = time.time()
-            is_valid, errors = self.validator.validate_initial_response(result)
-            validate_time = time.time() - validate_start
-            logger.info(f"✅ 内容验证耗时: {validate_time:.3f}秒")
-
-            if is_valid:
-                logger.success(f"✅ AI生成初始内容成功 - Seed: {seed}")
-                # 缓存结果
-                self._set_cache(cache_key, result)
-                return result
-            else:
-                logger.warning(f"⚠️ AI内容质量不合格，使用素材库降级: {errors}")
-                return self._generate_fallback_initial(seed, player_name)
+            try:
+                patch = repair_json(response.choices[0].message.content or "").value
+            except ValueError:
+                patch = None
+            if not isinstance(patch, dict):
+                self._repair_stats["failed"] += 1
+                raise ValueError(f"AI内容质量不合格（局部重生成结果无法解析）: {errors}")
+            merge_repair(result, plan, patch)
+
+        is_valid, errors = self.validator.validate_initial_response(result)
+        if not is_valid:
+            self._repair_stats["failed"] += 1
+            raise ValueError(f"AI内容质量不合格（局部重生成后）: {errors}")
+
+        self._repair_stats["repaired"] += 1
+        logger.success(f"🧩 局部重生成成功 - Seed: {seed}")
+        return result
+
+    def get_partial_repair_stats(self) -> dict:
+        """
+        获取初始回合局部重生成统计
 
-        except Exception as e:
-            logger.warning(f"⚠️ AI调用失败，使用素材库降级: {e}")
-            return self._generate_fallback_initial(seed, player_name)
+        Returns:
+            尝试次数、成功/失败次数和重生成的片段总数
+        """
+        return dict(self._repair_stats)
 
     @log_execution_time("AI生成下一回合")
     async def generate_next_turn(
         self,
         context: list[dict],
         user_action: str,
-        seed: int
+        seed: int,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        resolution: Optional[TurnResolution] = None,
+        previous_turn: Optional[dict] = None
     ) -> dict:
         """
         生成下一回合内容（性能优化版）
@@ -242,35 +477,36 @@ class AIServiceV2:
         性能优化：
         1. 降低max_tokens（1024）
         2. 缩短timeout（20秒）
+        3. 有服务端结算结果时AI只叙述，不回传玩家状态
+        4. 紧凑输出格式（AI_COMPACT_TURNS），服务端还原为完整结构
+        5. 结构化输出约束（AI_STRUCTURED_OUTPUT），减少格式错误
 
         Args:
             context: 对话上下文（messages + summaries）
             user_action: 玩家行动
             seed: 随机种子
+            priority: 调用优先级（投机预生成使用后台优先级）
+            resolution: 服务端结算结果（覆盖AI返回的状态字段）
+            previous_turn: 上一回合内容（还原紧凑格式时提供NPC名册）
 
         Returns:
             AI生成的内容
         """
         # 设置随机种子
         random.seed(seed)
-        system_prompt = self._get_system_prompt()
-
-        # 构建消息列表
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(context)
-        messages.append({
-            "role": "user",
-            "content": f"玩家选择了: {user_action}\n请根据这个选择生成后续剧情和新的选项。"
-        })
+        messages = self._build_turn_messages(context, user_action, resolution)
 
         try:
             api_start = time.time()
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                priority,
+                task="next_turn",
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
                 max_tokens=self.MAX_TOKENS_TURN,  # 使用优化后的1024
                 timeout=20.0,  # 缩短超时时间
+                **self._response_format("next_turn"),
             )
             api_time = time.time() - api_start
             logger.info(f"⚡ API调用耗时: {api_time:.3f}秒")
@@ -280,7 +516,9 @@ class AIServiceV2:
                 raise ValueError("AI返回了空响应")
 
             # 解析JSON响应
-            result = self._parse_ai_response(content)
+            result = expand_turn(self._parse_ai_response(content), previous_turn, seed)
+            if resolution is not None:
+                resolution.apply(result)
 
             logger.success(f"✅ AI生成新回合 - Seed: {seed}")
             return result
@@ -289,6 +527,170 @@ class AIServiceV2:
             logger.error(f"❌ AI调用失败: {e}")
             raise  # 不降级，直接抛出异常
 
+    async def generate_next_turn_with_fallback(
+        self,
+        context: list[dict],
+        user_action: str,
+        seed: int,
+        previous_turn: Optional[dict],
+        choice_id: str,
+        difficulty: str = "normal",
+        deadline: Optional[float] = None
+    ) -> dict:
+        """
+        生成下一回合，AI不可用时由本地生成器兜底
+
+        以下情况直接使用本地生成的回合：
+        1. 交互请求排队数达到 LLM_SHED_QUEUE_DEPTH（负载卸载）
+        2. 熔断器打开
+        3. 超过 LLM_TURN_DEADLINE 仍未返回
+        4. 调用或解析失败
+
+        Args:
+            context: 对话上下文（messages + summaries）
+            user_action: 玩家行动
+            seed: 随机种子
+            previous_turn: 上一回合内容（本地生成时在其基础上推进）
+            choice_id: 玩家选择的选项ID
+            difficulty: 游戏难度
+            deadline: 本次生成的时限（秒，默认 LLM_TURN_DEADLINE；调用方已等待过时传入剩余时间）
+
+        Returns:
+            回合内容（本地生成时带 is_fallback 标记）
+
+        Raises:
+            Exception: 关闭本地降级（FALLBACK_TURN_ENABLED=false）时抛出AI调用错误
+        """
+        # 状态由服务端结算，AI和本地生成器都只负责叙述
+        resolution = resolve_turn(previous_turn, choice_id, seed, difficulty)
+
+        if not settings.FALLBACK_TURN_ENABLED:
+            return await self.generate_next_turn(
+                context, user_action, seed, resolution=resolution, previous_turn=previous_turn
+            )
+
+        def fallback(reason: str) -> dict:
+            return self.fallback_engine.generate_next_turn(
+                previous_turn, choice_id, seed, difficulty, reason=reason, resolution=resolution
+            )
+
+        shed_depth = settings.LLM_SHED_QUEUE_DEPTH
+        if shed_depth > 0 and self.scheduler.queue_depth(LLMPriority.INTERACTIVE) >= shed_depth:
+            logger.warning("🚦 LLM排队过长，本回合本地生成")
+            return fallback("shed")
+        if self.breaker.is_open():
+            return fallback("circuit_open")
+
+        if deadline is None:
+            deadline = settings.LLM_TURN_DEADLINE
+        try:
+            return await asyncio.wait_for(
+                self.generate_next_turn(
+                    context, user_action, seed, resolution=resolution, previous_turn=previous_turn
+                ),
+                timeout=max(0.0, deadline),
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⏰ 回合生成超过 {deadline:.1f}秒，本地生成")
+            return fallback("timeout")
+        except CircuitOpenError:
+            return fallback("circuit_open")
+        except Exception as e:
+            logger.warning(f"⚠️ AI生成回合失败，本地生成: {e}")
+            return fallback("error")
+
+    def get_fallback_stats(self) -> dict:
+        """
+        获取本地降级统计
+
+        Returns:
+            本地生成的回合数及各原因计数
+        """
+        return self.fallback_engine.get_stats()
+
+    async def stream_next_turn(
+        self,
+        context: list[dict],
+        user_action: str,
+        seed: int,
+        resolution: Optional[TurnResolution] = None,
+        previous_turn: Optional[dict] = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        流式生成下一回合内容（SSE推送用）
+
+        以 stream=True 调用模型，用 TurnStreamParser 增量解析：
+        story_context 逐字产出，每个选项和顶层字段完整后立即产出。
+
+        Args:
+            context: 对话上下文（messages + summaries）
+            user_action: 玩家行动
+            seed: 随机种子
+            resolution: 服务端结算结果（覆盖AI返回的状态字段）
+            previous_turn: 上一回合内容（还原紧凑格式时提供NPC名册）
+
+        Yields:
+            ("story", 新增剧情文本)、("choice", 完整选项)、("field", (字段名, 值))，
+            最后是 ("result", 解析后的完整回合字典)
+        """
+        random.seed(seed)
+        messages = self._build_turn_messages(context, user_action, resolution)
+
+        # 流式调用在整个推流期间占用名额（熔断时立即失败，不进入排队）；
+        # 熔断统计从获得名额后开始，按首token耗时判断慢调用
+        self.breaker.check()
+        async with self.scheduler.slot(LLMPriority.INTERACTIVE):
+            async with self.breaker.guard() as call:
+                api_start = time.time()
+                first_token_time: Optional[float] = None
+                stream = await self.router.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.MAX_TOKENS_TURN,
+                    timeout=20.0,
+                    stream=True,
+                    **self._response_format("next_turn"),
+                )
+
+                if self.compact_turns:
+                    parser = TurnStreamParser(story_key="s", item_keys=("c",))
+                else:
+                    parser = TurnStreamParser()
+                buffer = ""
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if first_token_time is None:
+                        call.first_token()
+                        first_token_time = time.time() - api_start
+                        logger.info(f"⚡ 首token耗时: {first_token_time:.3f}秒")
+                    buffer += delta
+
+                    for event in parser.feed(delta):
+                        if event.kind == "story":
+                            yield "story", event.value
+                        elif event.kind == "choice":
+                            yield "choice", expand_choice(event.value)
+                        else:
+                            yield "field", (event.key, event.value)
+
+        logger.info(f"⚡ 流式API调用耗时: {time.time() - api_start:.3f}秒")
+
+        if not buffer:
+            raise ValueError("AI返回了空响应")
+
+        # 增量解析失败（非标准JSON）时回退到完整清洗解析
+        result = parser.result() if parser.is_complete else self._parse_ai_response(buffer)
+        result = expand_turn(result, previous_turn, seed)
+        if resolution is not None:
+            resolution.apply(result)
+        logger.success(f"✅ AI流式生成新回合 - Seed: {seed}")
+        yield "result", result
+
     @log_execution_time("AI生成摘要")
     async def create_summary(self, messages_text: str) -> str:
         """
@@ -308,7 +710,8 @@ class AIServiceV2:
 
 摘要应该简洁但信息完整，用于后续AI重建上下文。"""
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                LLMPriority.SUMMARY,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -340,6 +743,31 @@ class AIServiceV2:
         from app.prompts.system_prompt import SYSTEM_PROMPT
         return SYSTEM_PROMPT
 
+    def _build_turn_messages(
+        self,
+        context: list[dict],
+        user_action: str,
+        resolution: Optional[TurnResolution] = None
+    ) -> list[dict]:
+        """
+        构建回合请求的消息列表
+
+        Args:
+            context: 对话上下文（messages + summaries）
+            user_action: 玩家行动
+            resolution: 服务端结算结果（有则附在玩家行动后）
+
+        Returns:
+            发送给模型的消息列表
+        """
+        messages = [{"role": "system", "content": self._get_system_prompt()}]
+        messages.extend(context)
+        messages.append({
+            "role": "user",
+            "content": build_turn_prompt(user_action, resolution, compact=self.compact_turns)
+        })
+        return messages
+
     def _parse_ai_response(self, content: str) -> dict:
         """
         解析AI响应（提取JSON）
@@ -353,50 +781,21 @@ class AIServiceV2:
         Raises:
             ValueError: JSON解析失败
         """
-        # 提取JSON（可能包含markdown代码块）
-        json_str = self._extract_json(content)
+        # 快速路径：单次扫描解析标准JSON（容忍代码块和数字前的加号）
         try:
-            result = json.loads(json_str)
-            return result
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON解析失败: {e}\n内容: {json_str}")
-            raise ValueError(f"AI响应格式错误: {e}")
-
-    def _extract_json(self, content: str) -> str:
-        """
-        从AI响应中提取JSON字符串
+            return parse_turn_payload(content)
+        except ValueError:
+            pass
 
-        Args:
-            content: AI返回的原始内容
-
-        Returns:
-            纯净的JSON字符串
-        """
-        # 移除markdown代码块标记
-        content = content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-
-        # 修复AI可能产生的非标准JSON语法
-        # 例如1: "progress": +30 -> "progress": 30
-        # 例如2: choice_id: "slack_off" -> choice_id: "slack_off"
-        # 修复裸字符串（没有引号的字符串）
-        content = re.sub(r'^\s*([^:]+)\s*:\s*"?([^"]+)"?$', r'\1: "\2"', content, flags=re.MULTILINE)
-        # 修复数字前的加号（如: "progress": +30）
-        content = re.sub(r':\s*\+(\d+)', r': \1', content)
-        # 修复数字前的减号（如: "progress": -30）
-        content = re.sub(r':\s*\-(\d+)', r': -\1', content)
-        # 修复多余的引号和冒号组合（如: "progress": "value"）
-        content = re.sub(r'"\s*:', '":', content)
-        # 额外清理：移除可能的markdown残留
-        content = re.sub(r'```\w*', '', content)
-
-        return content
+        # 容错修复：截断、末尾逗号、无引号的键等，按回合结构保留有效部分
+        try:
+            repaired = repair_turn(content)
+        except ValueError as e:
+            logger.error(f"❌ JSON解析失败: {e}\n内容: {content}")
+            raise ValueError(f"AI响应格式错误: {e}")
+        if repaired.repaired:
+            logger.warning(f"🩹 AI响应已修复: {', '.join(repaired.repairs)}")
+        return repaired.value
 
     def _generate_fallback_initial(self, seed: int, player_name: str) -> dict:
         """
@@ -446,19 +845,7 @@ class AIServiceV2:
         npcs_list = list(npcs)  # fallback_library已经返回完整NPC对象
 
         # 构建初始玩家状态
-        player_state = {
-            "energy": 100,
-            "chill": 50,
-            "progress": 0,
-            "suspicion": 0,
-            "connection": 0,
-            "blackmail": 0,
-            "salary": 5000,
-            "reputation": 0,
-            "day": 1,
-            "week": 1,
-            "turn": 0
-        }
+        player_state = dict(INITIAL_PLAYER_STATE)
 
         # 构建欢迎剧情
         story_context = f"""欢迎来到{company_info['name']}！
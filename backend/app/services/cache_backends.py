@@ -0,0 +1,381 @@
+"""
+AI结果缓存后端
+
+可插拔的缓存后端，让多个 uvicorn worker 共享昂贵的生成结果：
+1. memory: 进程内 LRU + TTL（默认，单进程）
+2. sqlite: 本机共享文件，同一台机器上的所有 worker 共用
+3. redis: RESP协议，跨机器共享（内置极简客户端，无额外依赖）
+
+所有后端的值都以JSON文本存储，读取返回独立副本。
+后端故障时按未命中处理，不影响游戏流程。
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.response_cache import ResponseCache
+
+
+class CacheBackend(ABC):
+    """缓存后端接口"""
+
+    name: str = "base"
+
+    def __init__(self):
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中返回None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """删除缓存"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """释放连接等资源"""
+
+    def get_stats(self) -> dict:
+        """
+        获取当前进程视角的统计
+
+        Returns:
+            后端名称、命中率及计数
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "backend": self.name,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            **self._stats,
+        }
+
+    def _record(self, value: Optional[Any]) -> Optional[Any]:
+        """记录命中/未命中"""
+        self._stats["hits" if value is not None else "misses"] += 1
+        return value
+
+
+# ============================================================================
+# 进程内后端
+# ============================================================================
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内后端（LRU + TTL + 字节预算）"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        super().__init__()
+        self._cache = ResponseCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, **self._cache.get_stats()}
+
+
+# ============================================================================
+# SQLite 文件后端（同机多 worker 共享）
+# ============================================================================
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    SQLite 文件后端
+
+    WAL 模式允许多进程并发读写；按最近访问时间做LRU淘汰，
+    字节预算在所有进程间共享。数据库操作放到线程池执行，不阻塞事件循环。
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """懒加载连接并建表"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_accessed ON ai_cache (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func, *args):
+        """在线程池中串行执行数据库操作"""
+        async with self._lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE ai_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _set_sync(self, key: str, payload: str, ttl: float) -> None:
+        conn = self._connect()
+        now = time.time()
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now + ttl, now),
+            )
+            conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,))
+
+            # 超出字节预算时按最近访问时间淘汰
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT key, size FROM ai_cache WHERE key != ? ORDER BY accessed_at", (key,)
+                ).fetchall()
+                evict: List[str] = []
+                for old_key, old_size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evict.append(old_key)
+                    total -= old_size
+                conn.executemany("DELETE FROM ai_cache WHERE key = ?", [(k,) for k in evict])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete_sync(self, key: str) -> None:
+        self._connect().execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            payload = await self._run(self._get_sync, key)
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ SQLite缓存读取失败: {e}")
+            payload = None
+        return self._record(json.loads(payload) if payload is not None else None)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        try:
+            await self._run(self._set_sync, key, payload, self.ttl if ttl is None else ttl)
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ SQLite缓存写入失败: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._run(self._delete_sync, key)
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ SQLite缓存删除失败: {e}")
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ============================================================================
+# Redis 协议后端（跨机器共享）
+# ============================================================================
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 协议后端
+
+    内置极简 RESP2 客户端（GET / SET PX / DEL / AUTH / SELECT），
+    兼容 Redis、KeyDB、Valkey 等实现。单连接串行请求，断线自动重连。
+    容量和淘汰交给服务端的 maxmemory-policy（建议 allkeys-lru）。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float, prefix: str = "ai_cache:", timeout: float = 1.0):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_connection(self) -> None:
+        """建立连接并完成认证/选库"""
+        if self._writer is not None and not self._writer.is_closing():
+            return
+
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout
+        )
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", str(self.db))
+
+    async def _send(self, *parts: str) -> Any:
+        """发送一条命令并读取回复"""
+        encoded = [p.encode("utf-8") for p in parts]
+        frame = b"*%d\r\n" % len(encoded) + b"".join(
+            b"$%d\r\n%s\r\n" % (len(p), p) for p in encoded
+        )
+        self._writer.write(frame)
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_reply(), timeout=self.timeout)
+
+    async def _read_reply(self) -> Any:
+        """解析一条 RESP 回复"""
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis连接已关闭")
+        kind, body = line[:1], line[1:-2]
+
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RuntimeError(f"Redis错误: {body.decode('utf-8')}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(body)
+            if count < 0:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise RuntimeError(f"无法识别的Redis回复: {line!r}")
+
+    async def _command(self, *parts: str) -> Any:
+        """执行命令（失败时断开连接，下次重连）"""
+        async with self._lock:
+            try:
+                await self._ensure_connection()
+                return await self._send(*parts)
+            except Exception:
+                await self._disconnect()
+                raise
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = None
+        self._writer = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            payload = await self._command("GET", self.prefix + key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ Redis缓存读取失败: {e}")
+            payload = None
+        return self._record(json.loads(payload) if payload is not None else None)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        try:
+            await self._command("SET", self.prefix + key, payload, "PX", str(max(1, ttl_ms)))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ Redis缓存写入失败: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._command("DEL", self.prefix + key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ Redis缓存删除失败: {e}")
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+
+# ============================================================================
+# 工厂
+# ============================================================================
+
+def create_cache_backend() -> CacheBackend:
+    """
+    根据配置创建缓存后端
+
+    Returns:
+        AI_CACHE_BACKEND 指定的后端（未知值时回退到 memory）
+    """
+    backend = settings.AI_CACHE_BACKEND.lower()
+
+    if backend == "sqlite":
+        return SQLiteCacheBackend(
+            path=settings.AI_CACHE_SQLITE_PATH,
+            max_bytes=settings.AI_CACHE_MAX_BYTES,
+            ttl=settings.AI_CACHE_TTL,
+        )
+    if backend == "redis":
+        return RedisCacheBackend(url=settings.AI_CACHE_REDIS_URL, ttl=settings.AI_CACHE_TTL)
+
+    if backend != "memory":
+        logger.warning(f"⚠️ 未知的缓存后端 {backend}，使用 memory")
+    return MemoryCacheBackend(
+        max_entries=settings.AI_CACHE_MAX_ENTRIES,
+        max_bytes=settings.AI_CACHE_MAX_BYTES,
+        ttl=settings.AI_CACHE_TTL,
+    )
@@ -0,0 +1,248 @@
+"""
+LLM调用熔断器
+
+供应商故障期间避免每个请求都等满超时：
+1. closed: 正常放行，按滑动窗口统计失败率和慢调用率
+2. open: 失败率或慢调用率超过阈值后熔断，调用立即失败（由调用方降级）
+3. half-open: 熔断一段时间后只放行少量探测请求，成功则恢复，失败则重新熔断
+
+调用耗时从获得调度名额之后开始计（排队时间不算慢调用），流式调用按首token耗时计。
+"""
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Deque, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.provider_router import FAILOVER_ERRORS
+
+
+class CircuitState(str, Enum):
+    """熔断器状态"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被拒绝"""
+
+
+class CallTimer:
+    """
+    一次受保护调用的计时
+
+    流式调用收到首token时调用 first_token()，之后的推流时间不计入慢调用判断。
+    """
+
+    def __init__(self):
+        """开始计时"""
+        self.start = time.monotonic()
+        self._first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        """记录首token到达时间（只记录第一次）"""
+        if self._first_token_at is None:
+            self._first_token_at = time.monotonic()
+
+    @property
+    def latency(self) -> float:
+        """调用耗时：有首token时为首token耗时，否则为到目前为止的耗时"""
+        end = self._first_token_at if self._first_token_at is not None else time.monotonic()
+        return end - self.start
+
+
+class CircuitBreaker:
+    """
+    熔断器（单例）
+
+    只有供应商侧的错误（超时、限流、连接失败、5xx等）计为失败；
+    请求本身的错误和取消不影响熔断统计。
+    """
+
+    _instance: Optional['CircuitBreaker'] = None
+
+    def __new__(cls):
+        """单例模式：熔断状态需要跨请求共享"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化熔断器（单例模式，只会初始化一次）"""
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self.enabled = settings.CIRCUIT_BREAKER_ENABLED
+        self.min_calls = settings.CIRCUIT_MIN_CALLS
+        self.failure_rate_threshold = settings.CIRCUIT_FAILURE_RATE
+        self.slow_call_seconds = settings.CIRCUIT_SLOW_CALL_SECONDS
+        self.slow_call_rate_threshold = settings.CIRCUIT_SLOW_CALL_RATE
+        self.open_seconds = settings.CIRCUIT_OPEN_SECONDS
+        self.half_open_probes = max(1, settings.CIRCUIT_HALF_OPEN_PROBES)
+
+        self.state = CircuitState.CLOSED
+        # 最近调用结果：(是否失败, 是否慢调用)
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=max(1, settings.CIRCUIT_WINDOW))
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+        self._stats = {
+            "rejected": 0,
+            "opened": 0,
+        }
+
+        self._initialized = True
+
+    def is_open(self) -> bool:
+        """
+        当前是否处于熔断（不消耗探测名额）
+
+        Returns:
+            open 且尚未到探测时间时返回True
+        """
+        if not self.enabled or self.state != CircuitState.OPEN:
+            return False
+        return time.monotonic() - self._opened_at < self.open_seconds
+
+    def check(self) -> None:
+        """
+        排队前的快速检查：熔断中时立即拒绝，不必先等调度名额（不消耗探测名额）
+
+        Raises:
+            CircuitOpenError: 熔断中
+        """
+        if self.is_open():
+            self._reject()
+
+    def acquire(self) -> None:
+        """
+        申请一次调用
+
+        Raises:
+            CircuitOpenError: 熔断中，或半开状态的探测名额已用完
+        """
+        if not self.enabled:
+            return
+
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self._reject()
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self._reject()
+            self._probes_in_flight += 1
+
+    def record(self, failed: bool, latency: float) -> None:
+        """
+        记录一次调用结果
+
+        Args:
+            failed: 是否为供应商侧失败
+            latency: 调用耗时（秒）
+        """
+        if not self.enabled:
+            return
+
+        slow = latency >= self.slow_call_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._open()
+            else:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        self._window.append((failed, slow))
+        if self.state == CircuitState.CLOSED and self._should_trip():
+            self._open()
+
+    def release(self) -> None:
+        """调用未产生有效结果（被取消或请求本身错误）时归还探测名额"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[CallTimer]:
+        """
+        包裹一次LLM调用：进入时申请，退出时按结果记录
+
+        应在获得调度名额之后进入，排队时间不计入调用耗时。
+
+        Yields:
+            调用计时（流式调用在收到首token时打点）
+
+        Raises:
+            CircuitOpenError: 调用被熔断器拒绝
+        """
+        self.acquire()
+        timer = CallTimer()
+        try:
+            yield timer
+        except FAILOVER_ERRORS:
+            self.record(failed=True, latency=timer.latency)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record(failed=False, latency=timer.latency)
+
+    def _should_trip(self) -> bool:
+        """窗口内样本足够且失败率或慢调用率超过阈值"""
+        total = len(self._window)
+        if total < self.min_calls:
+            return False
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow_calls = sum(1 for _, slow in self._window if slow)
+        return (
+            failures / total >= self.failure_rate_threshold
+            or slow_calls / total >= self.slow_call_rate_threshold
+        )
+
+    def _open(self) -> None:
+        """进入熔断"""
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        """切换状态（恢复时清空统计窗口）"""
+        if state == self.state:
+            return
+        if state == CircuitState.OPEN:
+            logger.warning(f"🔌 LLM熔断器打开 - {self.open_seconds:.0f}秒内直接降级")
+        elif state == CircuitState.HALF_OPEN:
+            logger.info("🔌 LLM熔断器半开 - 放行探测请求")
+        else:
+            logger.success("🔌 LLM熔断器恢复")
+            self._window.clear()
+        self._probes_in_flight = 0
+        self.state = state
+
+    def _reject(self) -> None:
+        """拒绝调用"""
+        self._stats["rejected"] += 1
+        raise CircuitOpenError("LLM供应商熔断中")
+
+    def get_stats(self) -> dict:
+        """
+        获取熔断统计
+
+        Returns:
+            当前状态、窗口内失败率/慢调用率、拒绝次数等
+        """
+        total = len(self._window)
+        return {
+            "enabled": self.enabled,
+            "state": self.state.value,
+            "window_calls": total,
+            "failure_rate": sum(1 for f, _ in self._window if f) / total if total else 0.0,
+            "slow_call_rate": sum(1 for _, s in self._window if s) / total if total else 0.0,
+            **self._stats,
+        }
@@ -16,6 +16,12 @@ class ContentValidator:
     MIN_CHOICES: int = 3
     MAX_CHOICES: int = 6
 
+    # 必填字段
+    REQUIRED_COMPANY_FIELDS: List[str] = ["name", "type", "culture", "atmosphere"]
+    REQUIRED_NPC_FIELDS: List[str] = ["id", "name", "role", "personality"]
+    REQUIRED_CHOICE_FIELDS: List[str] = ["id", "text", "effects"]
+    REQUIRED_STATS: List[str] = ["energy", "chill", "progress", "suspicion", "connection", "blackmail"]
+
     # 禁止词汇列表（政治相关）
     FORBIDDEN_WORDS: List[str] = [
         "政治", "政府", "政党", "选举", "主席", "总统",
@@ -60,8 +66,7 @@ class ContentValidator:
             if not isinstance(company, dict):
                 errors.append("company_info 必须是字典类型")
             else:
-                required_company_fields = ["name", "type", "culture", "atmosphere"]
-                for field in required_company_fields:
+                for field in ContentValidator.REQUIRED_COMPANY_FIELDS:
                     if field not in company or not company[field]:
                         errors.append(f"公司信息不完整: {field}")
 
@@ -89,8 +94,7 @@ class ContentValidator:
                         errors.append(f"NPC #{i+1} 必须是字典类型")
                         continue
 
-                    required_npc_fields = ["id", "name", "role", "personality"]
-                    for field in required_npc_fields:
+                    for field in ContentValidator.REQUIRED_NPC_FIELDS:
                         if field not in npc or not npc[field]:
                             errors.append(f"NPC #{i+1} 缺少字段: {field}")
         else:
@@ -120,8 +124,7 @@ class ContentValidator:
                         errors.append(f"选项 #{i+1} 必须是字典类型")
                         continue
 
-                    required_choice_fields = ["id", "text", "effects"]
-                    for field in required_choice_fields:
+                    for field in ContentValidator.REQUIRED_CHOICE_FIELDS:
                         if field not in choice:
                             errors.append(f"选项 #{i+1} 缺少字段: {field}")
         else:
@@ -133,11 +136,7 @@ class ContentValidator:
             if not isinstance(player_state, dict):
                 errors.append("player_state 必须是字典类型")
             else:
-                required_stats = [
-                    "energy", "chill", "progress", "suspicion",
-                    "connection", "blackmail"
-                ]
-                for stat in required_stats:
+                for stat in ContentValidator.REQUIRED_STATS:
                     if stat not in player_state:
                         errors.append(f"玩家状态缺少: {stat}")
         else:
@@ -261,8 +260,7 @@ class ContentValidator:
                         errors.append(f"选项 #{i+1} 必须是字典类型")
                         continue
 
-                    required_choice_fields = ["id", "text", "effects"]
-                    for field in required_choice_fields:
+                    for field in ContentValidator.REQUIRED_CHOICE_FIELDS:
                         if field not in choice:
                             errors.append(f"选项 #{i+1} 缺少字段: {field}")
         else:
@@ -274,11 +272,7 @@ class ContentValidator:
             if not isinstance(player_state, dict):
                 errors.append("player_state 必须是字典类型")
             else:
-                required_stats = [
-                    "energy", "chill", "progress", "suspicion",
-                    "connection", "blackmail"
-                ]
-                for stat in required_stats:
+                for stat in ContentValidator.REQUIRED_STATS:
                     if stat not in player_state:
                         errors.append(f"玩家状态缺少: {stat}")
         else:
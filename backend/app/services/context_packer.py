@@ -0,0 +1,163 @@
+"""
+上下文打包器
+
+按token预算组装回合请求的上下文，而不是按消息条数截取：
+1. 候选条目按优先级排序：最近回合 > 当前世界/NPC状态 > 最近一次摘要 > 关键事件 > 更早的消息 > 更早的摘要
+2. 同优先级内越新越优先，放不下的条目整体丢弃（必选条目除外），同类更早的条目也不再选取，
+   保证历史连续；一个回合（玩家行动 + AI剧情）是一个条目，不会只保留半个回合
+3. 输出时系统类条目在前，消息按时间顺序在后
+4. 返回包含/丢弃明细，便于观察提示词构成
+
+提示词大小（以及首token耗时）因此与游戏长度无关。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Union
+
+from app.models.database import calculate_tokens
+
+
+# 条目类型及默认优先级（数字越小越优先）
+PRIORITY_RECENT = 0
+PRIORITY_WORLD = 1
+PRIORITY_SUMMARY = 2
+PRIORITY_KEY_EVENTS = 3
+PRIORITY_HISTORY = 4
+PRIORITY_OLD_SUMMARY = 5
+
+# 输出顺序：系统类条目在前，对话消息在后
+_OUTPUT_ORDER = {"world": 0, "summary": 1, "key_events": 2, "message": 3}
+
+
+@dataclass
+class ContextItem:
+    """
+    一个候选上下文条目
+
+    kind: 类型（world / summary / key_events / message）
+    messages: 消息列表（role + content）
+    priority: 优先级（数字越小越优先）
+    position: 时间顺序（越大越新）
+    required: 是否必选（超出预算也保留）
+    """
+    kind: str
+    messages: List[dict]
+    priority: int
+    position: int = 0
+    required: bool = False
+    tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = sum(calculate_tokens(message.get("content") or "") for message in self.messages)
+
+
+@dataclass
+class PackResult:
+    """
+    打包结果
+
+    messages: 发送给模型的上下文消息
+    tokens: 上下文估算token数
+    budget: token预算
+    included / dropped: 按类型统计的条目数
+    dropped_tokens: 丢弃条目的估算token数
+    """
+    messages: List[dict]
+    tokens: int
+    budget: int
+    included: Dict[str, int]
+    dropped: Dict[str, int]
+    dropped_tokens: int
+
+    def report(self) -> dict:
+        """打包明细（日志和指标用）"""
+        return {
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "included": self.included,
+            "dropped": self.dropped,
+            "dropped_tokens": self.dropped_tokens,
+        }
+
+
+class ContextPacker:
+    """
+    按token预算打包上下文
+
+    用法：
+        packer = ContextPacker(budget=3000)
+        packer.add("world", {"role": "system", "content": ...}, PRIORITY_WORLD)
+        packer.add("message", [user_message, assistant_message], PRIORITY_HISTORY, position=3)
+        result = packer.pack()
+    """
+
+    def __init__(self, budget: int):
+        """
+        初始化打包器
+
+        Args:
+            budget: 上下文token预算
+        """
+        self.budget = budget
+        self._items: List[ContextItem] = []
+
+    def add(
+        self,
+        kind: str,
+        messages: Union[dict, List[dict]],
+        priority: int,
+        position: int = 0,
+        required: bool = False
+    ) -> None:
+        """
+        添加候选条目
+
+        Args:
+            kind: 类型（world / summary / key_events / message）
+            messages: 一条消息或一组需要同时保留的消息
+            priority: 优先级（数字越小越优先）
+            position: 时间顺序（越大越新）
+            required: 是否必选
+        """
+        if isinstance(messages, dict):
+            messages = [messages]
+        messages = [message for message in messages if message.get("content")]
+        if not messages:
+            return
+        self._items.append(ContextItem(kind, messages, priority, position, required))
+
+    def pack(self) -> PackResult:
+        """
+        按优先级在预算内选取条目
+
+        Returns:
+            打包结果
+        """
+        ranked = sorted(self._items, key=lambda item: (not item.required, item.priority, -item.position))
+
+        selected: List[ContextItem] = []
+        used = 0
+        dropped: Dict[str, int] = {}
+        dropped_tokens = 0
+        exhausted = set()  # 已有条目放不下的类型（更早的同类条目不再选取）
+        for item in ranked:
+            if item.required or (item.kind not in exhausted and used + item.tokens <= self.budget):
+                selected.append(item)
+                used += item.tokens
+            else:
+                exhausted.add(item.kind)
+                dropped[item.kind] = dropped.get(item.kind, 0) + 1
+                dropped_tokens += item.tokens
+
+        selected.sort(key=lambda item: (_OUTPUT_ORDER.get(item.kind, len(_OUTPUT_ORDER)), item.position))
+        included: Dict[str, int] = {}
+        for item in selected:
+            included[item.kind] = included.get(item.kind, 0) + 1
+
+        return PackResult(
+            messages=[message for item in selected for message in item.messages],
+            tokens=used,
+            budget=self.budget,
+            included=included,
+            dropped=dropped,
+            dropped_tokens=dropped_tokens,
+        )
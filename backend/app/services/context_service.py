@@ -5,21 +5,45 @@
 1. 管理对话历史（messages表）
 2. Token计数和预警
 3. 自动触发摘要（接近token限制时）
-4. 重建会话上下文（messages + summaries）
-5. 混合摘要策略（结构化 + AI摘要）
+4. 按token预算打包AI上下文（ContextPacker）
+5. 重建会话上下文（messages + summaries）
+6. 混合摘要策略（结构化 + AI摘要）
+7. 分层摘要（在用摘要超过预算时合并为上一级摘要）
 """
 import json
 import uuid
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from datetime import datetime
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.constants import CORE_STATS, STAT_LABELS
+from app.core.game_engine import find_choice
 from app.core.logging import logger
-from app.models.database import Message, Summary, KeyEvent, calculate_tokens
+from app.models.database import Summary, KeyEvent, calculate_tokens
+from app.repositories.message_repo import MessageBound, MessageCursor, MessageRepository
+from app.repositories.state_repo import SessionStateRepository
+from app.repositories.stats_repo import SessionStatsRepository
+from app.repositories.unit_of_work import UnitOfWork
 from app.services.ai_service_v2 import AIServiceV2
-
+from app.services.context_packer import (
+    PRIORITY_HISTORY,
+    PRIORITY_KEY_EVENTS,
+    PRIORITY_OLD_SUMMARY,
+    PRIORITY_RECENT,
+    PRIORITY_SUMMARY,
+    PRIORITY_WORLD,
+    ContextPacker,
+    PackResult,
+)
+from app.services.wire_format import npc_roster
+
+
+# 关键事件省略标记
+_OMITTED_PREFIX = "…（"
 
 class ContextService:
     """
@@ -38,6 +62,12 @@ class ContextService:
         """
         self.db = db_session
         self.ai = ai_service
+        self.message_repo = MessageRepository(db_session)
+        self.stats_repo = SessionStatsRepository(db_session)
+        self.state_repo = SessionStateRepository(db_session)
+
+        # 最近一次上下文打包明细
+        self.last_pack: Optional[PackResult] = None
 
     # ========================================================================
     # 消息管理
@@ -48,37 +78,28 @@ class ContextService:
         session_id: str,
         role: str,
         content: str,
-        tokens: Optional[int] = None
+        tokens: Optional[int] = None,
+        created_at: Optional[datetime] = None
     ) -> str:
         """
-        添加消息到历史
+        添加消息到历史（加入当前工作单元，不单独提交）
 
         Args:
             session_id: 会话ID
             role: 消息角色（system, user, assistant）
             content: 消息内容
             tokens: Token数量（可选，自动估算）
+            created_at: 创建时间（可选，默认为当前时间）
 
         Returns:
             消息ID
         """
-        message_id = str(uuid.uuid4())
-
         # 估算token数量
         if tokens is None:
             tokens = calculate_tokens(content)
 
-        # 创建消息记录
-        message = Message(
-            id=message_id,
-            session_id=session_id,
-            role=role,
-            content=content,
-            tokens=tokens,
-        )
-
-        self.db.add(message)
-        await self.db.commit()
+        # 创建消息记录（会话统计随工作单元一起写入）
+        message_id = await self.message_repo.create(session_id, role, content, tokens, created_at)
 
         logger.info(f"✅ 添加消息 - Session: {session_id}, Role: {role}, Tokens: {tokens}")
 
@@ -87,27 +108,24 @@ class ContextService:
     async def get_messages(
         self,
         session_id: str,
-        limit: Optional[int] = None
-    ) -> List[Message]:
+        limit: Optional[int] = None,
+        after: MessageBound = None
+    ) -> List[Row]:
         """
-        获取会话的消息历史
+        获取会话的消息历史（尾部窗口）
+
+        只读取构建提示词需要的列；指定 limit 时按索引倒序取最新的 limit 条，
+        读取成本与会话长度无关。
 
         Args:
             session_id: 会话ID
-            limit: 最大返回数量（None=全部）
+            limit: 最大返回数量（指定时返回最新的 limit 条，None=全部）
+            after: 只返回该游标/时间之后的消息（例如摘要水位线）
 
         Returns:
-            消息列表（按时间排序）
+            消息行（id, role, content, tokens, created_at），按时间排序
         """
-        query = select(Message).where(Message.session_id == session_id).order_by(Message.created_at)
-
-        if limit:
-            query = query.limit(limit)
-
-        result = await self.db.execute(query)
-        messages = result.scalars().all()
-
-        return list(messages)
+        return await self.message_repo.get_window(session_id, limit=limit, after=after)
 
     async def get_context_for_ai(
         self,
@@ -115,95 +133,274 @@ class ContextService:
         token_limit: int = 12000
     ) -> List[dict]:
         """
-        获取用于AI调用的上下文（自动处理摘要）
+        获取用于AI调用的上下文（按token预算打包，自动处理摘要）
+
+        按优先级在 CONTEXT_TOKEN_BUDGET 内选取：最近回合 > 当前世界/NPC状态 >
+        最近一次摘要 > 关键事件 > 更早的消息 > 更早的摘要。打包明细记录在 last_pack。
+        本回合的玩家行动尚未保存，由调用方在返回的列表末尾追加。
 
         Args:
             session_id: 会话ID
-            token_limit: Token限制（默认12000）
+            token_limit: 触发自动摘要的token限制（默认12000）
 
         Returns:
             消息列表（适合传给OpenAI API）
         """
-        # 1. 获取所有摘要
+        # 1. 水位线之后（未摘要）的消息接近限制时触发摘要
+        watermark = await self.get_summary_watermark(session_id)
+        total_tokens = await self._count_unsummarized_tokens(session_id)
+        if total_tokens > token_limit * 0.8:
+            logger.warning(f"⚠️ 上下文接近限制 - Session: {session_id}, Tokens: {total_tokens}")
+            if await self._auto_summarize(session_id, watermark):
+                watermark = await self.get_summary_watermark(session_id)
+
+        # 2. 只读取水位线之后的最近消息（更早的内容由摘要覆盖）
+        recent_messages = await self.get_messages(
+            session_id, settings.CONTEXT_HISTORY_WINDOW, after=watermark
+        )
         summaries = await self.get_summaries(session_id)
+        events = await self._get_recent_turn_events(session_id, settings.CONTEXT_KEY_EVENTS + 1)
+
+        # 3. 按优先级打包
+        packer = ContextPacker(budget=settings.CONTEXT_TOKEN_BUDGET)
+
+        world = await self._format_world_state(session_id, events)
+        if world:
+            packer.add("world", {"role": "system", "content": world}, PRIORITY_WORLD)
+
+        for position, summary in enumerate(summaries):
+            is_latest = position == len(summaries) - 1
+            packer.add(
+                "summary",
+                {"role": "system", "content": f"[历史摘要] {summary.summary_text}"},
+                PRIORITY_SUMMARY if is_latest else PRIORITY_OLD_SUMMARY,
+                position=position,
+            )
 
-        # 2. 获取最近的未摘要消息
-        recent_messages = await self.get_messages(session_id, limit=100)
+        key_events = self._format_key_events(events)
+        if key_events:
+            packer.add("key_events", {"role": "system", "content": key_events}, PRIORITY_KEY_EVENTS)
+
+        turns = self._group_turns(recent_messages)
+        recent_start = len(turns) - settings.CONTEXT_RECENT_TURNS
+        for position, turn in enumerate(turns):
+            is_recent = position >= recent_start
+            packer.add(
+                "message",
+                [{"role": message.role, "content": message.content} for message in turn],
+                PRIORITY_RECENT if is_recent else PRIORITY_HISTORY,
+                position=position,
+                required=is_recent,
+            )
 
-        # 3. 计算当前token数量
-        total_tokens = sum(m.tokens or 0 for m in recent_messages)
+        self.last_pack = packer.pack()
+        logger.info(f"📝 构建上下文 - Session: {session_id}, {self.last_pack.report()}")
 
-        # 4. 如果接近限制，触发摘要
-        if total_tokens > token_limit * 0.8:
-            logger.warning(f"⚠️ 上下文接近限制 - Session: {session_id}, Tokens: {total_tokens}")
-            await self._auto_summarize(session_id)
+        return self.last_pack.messages
 
-            # 重新获取消息
-            recent_messages = await self.get_messages(session_id, limit=50)
+    @staticmethod
+    def _group_turns(messages: List[Row]) -> List[List[Row]]:
+        """
+        把消息按回合分组（每条玩家消息开始一个新回合）
 
-        # 5. 构建上下文（摘要 + 最近消息）
-        context = []
+        Args:
+            messages: 按时间排序的消息
 
-        # 添加摘要
-        for summary in summaries:
-            context.append({
-                "role": "system",
-                "content": f"[历史摘要] {summary.summary_text}"
-            })
+        Returns:
+            回合列表，每个回合是一组消息
+        """
+        turns: List[List[Row]] = []
+        for message in messages:
+            if message.role == "user" or not turns or turns[-1][0].role == "system":
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
 
-        # 添加最近消息
-        for message in recent_messages:
-            context.append({
-                "role": message.role,
-                "content": message.content
-            })
+    async def _get_recent_turn_events(self, session_id: str, limit: int) -> List[KeyEvent]:
+        """
+        获取最近的回合事件（开局和行动）
 
-        logger.info(f"📝 构建上下文 - Session: {session_id}, Messages: {len(context)}, Tokens: ~{total_tokens}")
+        Args:
+            session_id: 会话ID
+            limit: 最大返回数量
 
-        return context
+        Returns:
+            事件列表（按时间排序）
+        """
+        query = select(KeyEvent).where(
+            and_(
+                KeyEvent.session_id == session_id,
+                KeyEvent.event_type.in_(("game_start", "action_choice"))
+            )
+        ).order_by(KeyEvent.created_at.desc()).limit(limit)
+
+        result = await self.db.execute(query)
+        return list(reversed(result.scalars().all()))
+
+    async def _format_world_state(self, session_id: str, events: List[KeyEvent]) -> str:
+        """
+        当前世界状态：公司、NPC名册、玩家状态
+
+        NPC附带 id，模型在紧凑格式中按 id 更新NPC。优先读取当前游戏状态（主键查询），没有状态记录的旧会话从回合事件中读取。
+
+        Args:
+            session_id: 会话ID
+            events: 最近的回合事件（最后一个为当前回合）
+
+        Returns:
+            世界状态文本，没有回合记录时为空字符串
+        """
+        current = await self.state_repo.get(session_id)
+        if current is not None:
+            company, roster, state = current.company_info, current.npcs or [], current.player_state
+        elif events:
+            start = next((e for e in events if e.event_type == "game_start"), None)
+            if start is None:
+                result = await self.db.execute(
+                    select(KeyEvent).where(
+                        and_(KeyEvent.session_id == session_id, KeyEvent.event_type == "game_start")
+                    ).limit(1)
+                )
+                start = result.scalar_one_or_none()
+
+            turn = (events[-1].event_data or {}).get("ai_response") or {}
+            company = ((start.event_data or {}).get("ai_response") or {}).get("company_info") if start else None
+            roster, state = npc_roster(turn), turn.get("player_state")
+        else:
+            return ""
+
+        lines = ["【当前世界】"]
+        if isinstance(company, dict):
+            lines.append(
+                f"公司：{company.get('name', '')}（{company.get('type', '')}）"
+                f"｜文化：{company.get('culture', '')}｜氛围：{company.get('atmosphere', '')}"
+            )
+        npcs = [
+            f"{npc.get('name')}（id: {npc.get('id', '')}，{npc.get('role', '')}，{npc.get('personality', '')}，"
+            f"好感{npc.get('attitude_toward_player', 50)}）"
+            for npc in roster if npc.get("name")
+        ]
+        if npcs:
+            lines.append(f"NPC：{'；'.join(npcs)}")
+        if isinstance(state, dict):
+            stats = "，".join(f"{STAT_LABELS[stat]}{state.get(stat, 0)}" for stat in CORE_STATS)
+            lines.append(f"玩家：第{state.get('day', 1)}天第{state.get('turn', 0)}回合，{stats}")
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+    @staticmethod
+    def _format_key_events(events: List[KeyEvent]) -> str:
+        """
+        关键事件：最近几次选择及触发的事件
+
+        Args:
+            events: 最近的回合事件（按时间排序）
+
+        Returns:
+            关键事件文本，没有行动记录时为空字符串
+        """
+        lines = []
+        for previous, event in zip(events, events[1:]):
+            data = event.event_data or {}
+            turn = data.get("ai_response") or {}
+            choice = find_choice((previous.event_data or {}).get("ai_response"), data.get("choice_id"))
+            state = turn.get("player_state") or {}
+            choice_text = (choice or {}).get("text") or data.get("choice_id")
+            line = f"- 第{state.get('day', '?')}天第{state.get('turn', '?')}回合：{choice_text}"
+            messages = [
+                e.get("message") for e in turn.get("triggered_events") or []
+                if isinstance(e, dict) and e.get("message")
+            ]
+            if messages:
+                line += f"（{'；'.join(messages)}）"
+            lines.append(line)
+        return "【关键事件】\n" + "\n".join(lines) if lines else ""
 
     # ========================================================================
     # 摘要管理
     # ========================================================================
 
-    async def get_summaries(self, session_id: str) -> List[Summary]:
+    async def get_summaries(self, session_id: str, include_merged: bool = False) -> List[Summary]:
         """
-        获取会话的所有摘要
+        获取会话的摘要
 
         Args:
             session_id: 会话ID
+            include_merged: 是否包含已被合并进上级摘要的摘要
 
         Returns:
-            摘要列表（按时间排序）
+            摘要列表（按覆盖范围排序）
         """
-        query = select(Summary).where(
-            Summary.session_id == session_id
-        ).order_by(Summary.created_at)
+        query = select(Summary).where(Summary.session_id == session_id)
+        if not include_merged:
+            query = query.where(Summary.merged_into.is_(None))
+        query = query.order_by(func.coalesce(Summary.covers_until, Summary.created_at), Summary.covers_until_id)
 
         result = await self.db.execute(query)
         summaries = result.scalars().all()
 
         return list(summaries)
 
+    async def get_summary_watermark(self, session_id: str) -> MessageBound:
+        """
+        获取摘要水位线（已被摘要覆盖的最后一条消息的游标）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            水位线游标；记录消息id之前的旧摘要只有创建时间；没有摘要时返回None
+        """
+        result = await self.db.execute(
+            select(Summary.covers_until, Summary.covers_until_id)
+            .where(Summary.session_id == session_id, Summary.covers_until.is_not(None))
+            .order_by(Summary.covers_until.desc(), Summary.covers_until_id.desc())
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return MessageCursor(row.covers_until, row.covers_until_id) if row.covers_until_id else row.covers_until
+
+    async def _count_unsummarized_tokens(self, session_id: str) -> int:
+        """
+        统计水位线之后（未摘要）的消息token数（读取会话统计，不扫描消息）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            token总数
+        """
+        stats = await self.stats_repo.get(session_id)
+        if stats is None:
+            return 0
+        return stats.token_total - stats.summarized_token_total
+
     async def create_summary(
         self,
         session_id: str,
-        messages_to_summarize: List[Message]
+        messages_to_summarize: List[Row],
+        previous_watermark: MessageBound = None
     ) -> Summary:
         """
         创建摘要（混合策略：结构化 + AI）
 
         Args:
             session_id: 会话ID
-            messages_to_summarize: 需要摘要的消息列表
+            messages_to_summarize: 需要摘要的消息列表（按时间排序）
+            previous_watermark: 上一个摘要的水位线（只提取此后的关键事件）
 
         Returns:
-            创建的摘要对象
+            创建的摘要对象（covers_until/covers_until_id 为最后一条被摘要消息的游标）
         """
         logger.info(f"🔄 开始摘要 - Session: {session_id}, Messages: {len(messages_to_summarize)}")
+        covers = MessageCursor.of(messages_to_summarize[-1])
+        if isinstance(previous_watermark, MessageCursor):
+            previous_watermark = previous_watermark.created_at
 
         # 1. 提取关键事件（结构化）
-        key_events = await self._extract_key_events(session_id, messages_to_summarize)
+        key_events = await self._extract_key_events(session_id, previous_watermark, covers.created_at)
 
         # 2. 调用AI生成叙事摘要
         messages_text = "\n".join([
@@ -221,68 +418,158 @@ class ContextService:
             session_id=session_id,
             summary_text=combined_summary,
             message_count=len(messages_to_summarize),
-            summary_type="auto"
+            summary_type="auto",
+            covers_until=covers.created_at,
+            covers_until_id=covers.id
         )
 
         self.db.add(summary)
-        await self.db.commit()
+        self.stats_repo.increment(
+            session_id, summarized_tokens=sum(m.tokens or 0 for m in messages_to_summarize)
+        )
+        # 摘要在构建上下文时（回合写入之前）生成，单独提交，避免写锁持续到随后的回合生成
+        await UnitOfWork(self.db).commit()
 
         logger.success(f"✅ 摘要完成 - Session: {session_id}, Messages: {len(messages_to_summarize)}")
 
         return summary
 
-    async def _auto_summarize(self, session_id: str):
+    async def _auto_summarize(self, session_id: str, watermark: MessageBound = None) -> bool:
         """
         自动摘要（当接近token限制时）
 
+        只摘要水位线之后的消息中较早的一半，摘要记录新的水位线，
+        之后构建上下文时不再加载这些消息，同一段历史也不会被重复摘要。
+
         Args:
             session_id: 会话ID
+            watermark: 当前摘要水位线
+
+        Returns:
+            是否生成了新摘要
         """
-        # 获取所有未摘要的消息
-        messages = await self.get_messages(session_id)
+        messages = await self.get_messages(session_id, after=watermark)
 
         if len(messages) < 5:  # 至少5条消息才摘要
-            return
+            return False
 
-        # 摘要前50%的消息
+        # 摘要前50%的未摘要消息
         messages_to_summarize = messages[:len(messages) // 2]
 
-        await self.create_summary(session_id, messages_to_summarize)
+        await self.create_summary(session_id, messages_to_summarize, previous_watermark=watermark)
+        await self._compact_summaries(session_id)
+        return True
+
+    async def _compact_summaries(self, session_id: str) -> int:
+        """
+        分层合并摘要
+
+        在用摘要的总token数超过 SUMMARY_TOKEN_BUDGET 时，把最新摘要之前的较早一半
+        （至少两个）合并成一个上一级摘要，直到回到预算内或最新摘要之前不足两个摘要。
+        最新的摘要保持原样，因此上下文中的摘要数量和大小与游戏长度无关。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            合并次数
+        """
+        summaries = await self.get_summaries(session_id)
+        merges = 0
+        while (
+            len(summaries) > 2
+            and sum(calculate_tokens(s.summary_text) for s in summaries) > settings.SUMMARY_TOKEN_BUDGET
+        ):
+            older = summaries[:-1]
+            group = older[:max(2, len(older) // 2)]
+            parent = await self._merge_summaries(session_id, group)
+            if parent is None:
+                break
+            summaries = [parent] + summaries[len(group):]
+            merges += 1
+        return merges
+
+    async def _merge_summaries(self, session_id: str, group: List[Summary]) -> Optional[Summary]:
+        """
+        把一组摘要合并成上一级摘要（被合并的摘要记录 merged_into，不再进入上下文）
+
+        Args:
+            session_id: 会话ID
+            group: 需要合并的摘要（按覆盖范围排序）
 
-        # 删除已摘要的消息（可选）
-        # for msg in messages_to_summarize:
-        #     await self.db.delete(msg)
-        # await self.db.commit()
+        Returns:
+            上级摘要；AI摘要失败时返回None（下次摘要时重试）
+        """
+        choices: List[str] = []
+        stories: List[str] = []
+        for summary in group:
+            summary_choices, story = self._split_summary(summary.summary_text)
+            choices.extend(summary_choices)
+            stories.append(story)
+
+        try:
+            ai_summary = await self.ai.create_summary("\n\n".join(stories))
+        except Exception as e:
+            logger.warning(f"⚠️ 摘要合并失败，保留原摘要 - Session: {session_id}, Error: {e}")
+            return None
+
+        level = max(summary.level or 0 for summary in group) + 1
+        covers = [
+            (summary.covers_until, summary.covers_until_id or "")
+            for summary in group if summary.covers_until is not None
+        ]
+        covers_until, covers_until_id = max(covers) if covers else (None, None)
+        parent = Summary(
+            id=str(uuid.uuid4()),
+            session_id=session_id,
+            summary_text=self._format_summary([{"choice": choice} for choice in choices], ai_summary),
+            message_count=sum(summary.message_count for summary in group),
+            summary_type="merged",
+            level=level,
+            covers_until=covers_until,
+            covers_until_id=covers_until_id or None
+        )
+        self.db.add(parent)
+        for summary in group:
+            summary.merged_into = parent.id
+        await UnitOfWork(self.db).commit()
+
+        logger.info(f"🗜️ 合并摘要 - Session: {session_id}, Level: {level}, Summaries: {len(group)}")
+        return parent
 
     async def _extract_key_events(
         self,
         session_id: str,
-        messages: List[Message]
+        after: Optional[datetime],
+        until: datetime
     ) -> List[dict]:
         """
-        从消息中提取关键事件
+        提取摘要范围内的关键事件
 
         Args:
             session_id: 会话ID
-            messages: 消息列表
+            after: 范围起点（上一个摘要的水位线，None表示从头开始）
+            until: 范围终点（本次摘要的水位线）
 
         Returns:
             关键事件列表
         """
         # 从key_events表查询
-        query = select(KeyEvent).where(
-            and_(
-                KeyEvent.session_id == session_id,
-                KeyEvent.event_type == "action_choice"
-            )
-        ).order_by(KeyEvent.created_at)
+        conditions = [
+            KeyEvent.session_id == session_id,
+            KeyEvent.event_type == "action_choice",
+            KeyEvent.created_at <= until,
+        ]
+        if after is not None:
+            conditions.append(KeyEvent.created_at > after)
+        query = select(KeyEvent).where(and_(*conditions)).order_by(KeyEvent.created_at)
 
         result = await self.db.execute(query)
         events = result.scalars().all()
 
         return [
             {
-                "choice": e.event_data.get("choice_text"),
+                "choice": e.event_data.get("choice_text") or e.event_data.get("choice_id"),
                 "state": e.event_data.get("state_snapshot")
             }
             for e in events
@@ -301,38 +588,135 @@ class ContextService:
         """
         parts = []
 
-        # 关键事件
-        if key_events:
+        # 关键事件（压缩）
+        choices = self._compress_choices(
+            [str(event.get("choice") or "Unknown") for event in key_events], settings.SUMMARY_KEY_EVENTS
+        )
+        if choices:
             parts.append("【关键事件】")
-            for event in key_events:
-                parts.append(f"- {event.get('choice', 'Unknown')}")
+            parts.extend(f"- {choice}" for choice in choices)
 
         # AI摘要
         parts.append(f"\n【剧情摘要】\n{ai_summary}")
 
         return "\n".join(parts)
 
+    @staticmethod
+    def _compress_choices(choices: List[str], limit: int) -> List[str]:
+        """
+        压缩关键事件：连续重复的选择合并计数，超过条数上限时只保留最近的
+
+        Args:
+            choices: 按时间排序的选择
+            limit: 最多保留的条数
+
+        Returns:
+            压缩后的条目
+        """
+        collapsed: List[List] = []
+        for choice in choices:
+            if collapsed and collapsed[-1][0] == choice:
+                collapsed[-1][1] += 1
+            else:
+                collapsed.append([choice, 1])
+        lines = [choice if count == 1 else f"{choice} ×{count}" for choice, count in collapsed]
+
+        if len(lines) <= limit:
+            return lines
+        kept = lines[-(limit - 1):] if limit > 1 else []
+        return [f"{_OMITTED_PREFIX}此前{len(lines) - len(kept)}条从略）"] + kept
+
+    @staticmethod
+    def _split_summary(summary_text: str) -> Tuple[List[str], str]:
+        """
+        拆分摘要文本（_format_summary 的逆操作）
+
+        Args:
+            summary_text: 摘要文本
+
+        Returns:
+            (关键事件条目, 剧情摘要)
+        """
+        head, separator, story = summary_text.partition("【剧情摘要】")
+        if not separator:
+            return [], summary_text.strip()
+        choices = [
+            line[2:] for line in head.splitlines()
+            if line.startswith("- ") and not line[2:].startswith(_OMITTED_PREFIX)
+        ]
+        return choices, story.strip()
+
+    # ========================================================================
+    # 历史分页
+    # ========================================================================
+
+    async def get_history_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[MessageCursor] = None
+    ) -> Tuple[List[Row], Optional[MessageCursor]]:
+        """
+        获取一页历史消息（从最新往前翻页）
+
+        Args:
+            session_id: 会话ID
+            limit: 每页数量
+            before: 上一页返回的游标（None=最新一页）
+
+        Returns:
+            (消息行按时间排序, 下一页（更早）的游标，没有更早的消息时为None)
+        """
+        rows = await self.message_repo.get_page(session_id, limit + 1, before=before)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[1:]
+        return rows, MessageCursor.of(rows[0])
+
+    async def iter_history(self, session_id: str, batch_size: int) -> AsyncIterator[Row]:
+        """
+        按时间顺序逐条读取全部历史消息（分批keyset读取，用于导出）
+
+        Args:
+            session_id: 会话ID
+            batch_size: 每批读取的条数
+
+        Yields:
+            消息行
+        """
+        cursor: Optional[MessageCursor] = None
+        while True:
+            rows = await self.message_repo.get_after(session_id, batch_size, after=cursor)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            cursor = MessageCursor.of(rows[-1])
+
     # ========================================================================
     # 会话恢复
     # ========================================================================
 
-    async def rebuild_context(self, session_id: str) -> List[dict]:
+    async def rebuild_context(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
         """
         重建会话上下文（从messages和summaries）
 
         Args:
             session_id: 会话ID
+            limit: 最多包含的最近消息数（None=水位线之后的全部，更早的消息通过 /history 分页读取）
 
         Returns:
-            完整的上下文列表
+            上下文列表
         """
         logger.info(f"🔄 重建上下文 - Session: {session_id}")
 
         # 获取摘要
         summaries = await self.get_summaries(session_id)
 
-        # 获取所有消息
-        messages = await self.get_messages(session_id)
+        # 获取水位线之后的消息（更早的消息已被摘要覆盖）
+        messages = await self.get_messages(
+            session_id, limit=limit, after=await self.get_summary_watermark(session_id)
+        )
 
         # 构建上下文
         context = []
@@ -344,7 +728,7 @@ class ContextService:
                 "content": f"[会话摘要] {summary.summary_text}"
             })
 
-        # 添加所有消息
+        # 添加消息
         for message in messages:
             context.append({
                 "role": message.role,
@@ -367,15 +751,27 @@ class ContextService:
             session_id: 会话ID
 
         Returns:
-            Token统计信息
+            Token统计信息（读取会话统计，一次主键查询）
         """
-        messages = await self.get_messages(session_id)
-
-        total_tokens = sum(m.tokens or 0 for m in messages)
+        stats = await self.stats_repo.get(session_id)
+        if stats is None:
+            return {
+                "total_messages": 0,
+                "total_tokens": 0,
+                "avg_tokens_per_message": 0,
+                "estimated_cost_usd": 0.0,
+                "summarized_tokens": 0,
+                "turn_count": 0,
+                "last_activity": None,
+            }
 
+        total_tokens = stats.token_total
         return {
-            "total_messages": len(messages),
+            "total_messages": stats.message_count,
             "total_tokens": total_tokens,
-            "avg_tokens_per_message": total_tokens / len(messages) if messages else 0,
+            "avg_tokens_per_message": total_tokens / stats.message_count if stats.message_count else 0,
             "estimated_cost_usd": total_tokens * 0.00001,  # 粗略估算
+            "summarized_tokens": stats.summarized_token_total,
+            "turn_count": stats.turn_count,
+            "last_activity": stats.last_activity.isoformat(),
         }
@@ -0,0 +1,212 @@
+"""
+本地回合生成器 - AI不可用时的后续回合降级方案
+
+基于素材库（公司、NPC、魔幻元素、回合文案）在本地生成完整回合：
+1. 状态结算（效果、时间推进、结局）交给 GameEngine
+2. 按会话的公司和文案风格选择剧情、NPC反应和新选项，按概率加入魔幻元素
+3. 相同输入产生相同输出（按会话种子+回合确定随机源）
+"""
+import random
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.constants import CORE_STATS
+from app.core.game_engine import GameEngine, TurnResolution, find_choice
+from app.prompts.fallback_library import (
+    FALLBACK_CHOICE_TEMPLATES,
+    FALLBACK_MAGICAL_ELEMENTS,
+    FALLBACK_NPCS,
+    get_turn_lines,
+)
+from app.services.wire_format import npc_roster
+
+
+# 魔幻元素出现概率
+MAGICAL_ELEMENT_PROBABILITY = 0.15
+
+# 找不到玩家所选选项时使用的默认行动
+DEFAULT_CHOICE: Dict[str, Any] = {"text": "按自己的节奏行动", "effects": {"energy": -5}}
+
+
+class FallbackTurnEngine:
+    """
+    本地回合生成器
+
+    职责：
+    - 根据上一回合的状态和选项生成下一回合
+    - 在AI失败、超时或负载过高时保证游戏继续
+    """
+
+    def __init__(self):
+        """初始化生成器"""
+        self._stats = {"turns": 0, "game_overs": 0}
+
+    def generate_next_turn(
+        self,
+        previous_turn: Optional[dict],
+        choice_id: str,
+        seed: int,
+        difficulty: str = "normal",
+        reason: str = "fallback",
+        resolution: Optional[TurnResolution] = None,
+    ) -> dict:
+        """
+        生成下一回合
+
+        Args:
+            previous_turn: 上一回合的内容（包含 player_state、choices、npcs，以及用于选择文案的
+                company_info/game_meta），缺失时从初始状态开始
+            choice_id: 玩家选择的选项ID
+            seed: 会话随机种子
+            difficulty: 难度（easy/normal/hard）
+            reason: 降级原因（仅用于日志和统计）
+            resolution: 已有的服务端结算结果（没有时在这里结算）
+
+        Returns:
+            与AI回合格式一致的回合内容（附带 is_fallback 标记）
+        """
+        previous_turn = previous_turn or {}
+        previous_state = previous_turn.get("player_state") or {}
+        if resolution is None:
+            choice = find_choice(previous_turn, choice_id) or {"id": choice_id, **DEFAULT_CHOICE}
+            engine = GameEngine(seed=f"{seed}:{previous_state.get('day', 1)}:{previous_state.get('turn', 0)}:{choice_id}")
+            resolution = engine.resolve(previous_state, choice, difficulty)
+
+        new_state = resolution.player_state
+        rng = random.Random(f"{seed}:{new_state['day']}:{new_state['turn']}:{choice_id}")
+        category = self._infer_category(resolution.choice, choice_id)
+        npc_names = self._npc_names(previous_turn, seed)
+        lines = self._turn_lines(previous_turn)
+
+        npc = rng.choice(npc_names)
+        story = self._build_story(
+            rng, lines["outcomes"], resolution.choice, category, npc, new_state, previous_state.get("day", 1)
+        )
+        magical_element = self._roll_magical_element(rng)
+
+        result = {
+            "story_context": story,
+            "choices": self._build_choices(rng, lines["choices"], new_state, npc_names),
+            "npc_reactions": {
+                "boss": rng.choice(lines["boss_reactions"][category]),
+                "colleagues": f"{npc}对你的举动议论了几句。",
+                "specific_npcs": {},
+            },
+            "flavor_texts": [resolution.feedback],
+            "is_fallback": True,
+        }
+        roster = npc_roster(previous_turn)
+        if roster:
+            result["npcs"] = roster
+        if magical_element:
+            result["active_magical_element"] = magical_element
+            result["story_context"] += f"\n\n忽然，{magical_element['name']}出现了——{magical_element['description']}。"
+        for event in resolution.events:
+            result["story_context"] += f"\n\n{event.get('message', '')}。"
+        if resolution.is_game_over:
+            result["story_context"] += f"\n\n{resolution.game_over_reason}"
+            self._stats["game_overs"] += 1
+        resolution.apply(result)
+
+        self._stats["turns"] += 1
+        self._stats[reason] = self._stats.get(reason, 0) + 1
+        logger.info(f"📦 本地生成回合 - 原因: {reason}, Day {new_state['day']} Turn {new_state['turn']}")
+        return result
+
+    # ========================================================================
+    # 内容生成
+    # ========================================================================
+
+    @staticmethod
+    def _infer_category(choice: dict, choice_id: str) -> str:
+        """根据选项类别或ID推断类别"""
+        category = choice.get("category")
+        if category in FALLBACK_CHOICE_TEMPLATES:
+            return category
+        for name in FALLBACK_CHOICE_TEMPLATES:
+            if f"_{name}_" in f"_{choice_id}_":
+                return name
+        return "work"
+
+    @staticmethod
+    def _turn_lines(previous_turn: dict) -> Dict[str, Dict[str, List[Any]]]:
+        """按会话的公司类型和文案风格选择回合文案（识别不出时使用通用文案）"""
+        company_info = previous_turn.get("company_info") or {}
+        game_meta = previous_turn.get("game_meta") or {}
+        company = company_info.get("type") or game_meta.get("company_type") or company_info.get("name")
+        style = company_info.get("style") or game_meta.get("style_type")
+        return get_turn_lines(company, style)
+
+    @staticmethod
+    def _npc_names(previous_turn: dict, seed: int) -> List[str]:
+        """NPC名册中的姓名，没有时从素材库按种子挑选"""
+        names = [npc.get("name") for npc in npc_roster(previous_turn) if npc.get("name")]
+        if names:
+            return names
+        colleagues = FALLBACK_NPCS["colleague_types"]
+        rng = random.Random(seed)
+        return [npc["name"] for npc in rng.sample(colleagues, min(3, len(colleagues)))]
+
+    @staticmethod
+    def _build_story(
+        rng: random.Random,
+        outcomes: Dict[str, List[str]],
+        choice: dict,
+        category: str,
+        npc: str,
+        state: dict,
+        previous_day: int,
+    ) -> str:
+        """拼接本回合剧情"""
+        outcome = rng.choice(outcomes[category]).format(npc=npc)
+        story = f"你决定：{choice.get('text', '按自己的节奏行动')}。{outcome}"
+        if state["day"] > previous_day:
+            story += f"\n\n下班铃声响起，漫长的一天终于结束。第{state['day']}天，新的挑战在等着你。"
+        return story
+
+    @staticmethod
+    def _roll_magical_element(rng: random.Random) -> Optional[dict]:
+        """按概率抽取一个魔幻元素"""
+        if rng.random() >= MAGICAL_ELEMENT_PROBABILITY:
+            return None
+        pool = (
+            FALLBACK_MAGICAL_ELEMENTS["objects"]
+            + FALLBACK_MAGICAL_ELEMENTS["phenomena"]
+            + FALLBACK_MAGICAL_ELEMENTS["abilities"]
+        )
+        return dict(rng.choice(pool))
+
+    @staticmethod
+    def _build_choices(
+        rng: random.Random,
+        templates: Dict[str, List[dict]],
+        state: dict,
+        npc_names: List[str],
+    ) -> List[dict]:
+        """生成3-4个新选项（低精力时提供休息，高怀疑时提供补救）"""
+        categories = ["work", "slack", rng.choice(["social", "social", "scheme"])]
+        if state["energy"] < 30:
+            categories.append("rest")
+        elif state["suspicion"] > 70:
+            categories.append("cover")
+
+        choices = []
+        for index, category in enumerate(categories):
+            template = rng.choice(templates[category])
+            choices.append({
+                "id": f"choice_{category}_d{state['day']}t{state['turn']}_{index}",
+                "text": template["text"].format(npc=rng.choice(npc_names)),
+                "category": category,
+                "effects": {stat: template["effects"].get(stat, 0) for stat in CORE_STATS},
+            })
+        return choices
+
+    def get_stats(self) -> dict:
+        """
+        获取本地生成统计
+
+        Returns:
+            生成回合数、按原因的计数和结局数
+        """
+        return dict(self._stats)
@@ -0,0 +1,245 @@
+"""
+LLM请求对冲（hedged requests）
+
+削减供应商偶发慢响应造成的长尾延迟：
+1. 按任务类型记录最近的调用延迟（获得调用名额之后的耗时，不含排队），取分位数（默认p90）作为对冲阈值
+2. 调用获得名额后超过阈值仍未返回时，发起一个相同的备用请求（仍在排队时不对冲）
+3. 先成功返回的结果胜出，另一个立即取消
+4. 对冲比例受上限约束，控制额外成本
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+class LatencyTracker:
+    """按任务类型记录最近调用延迟的滑动窗口"""
+
+    def __init__(self, window: int = 200):
+        """
+        初始化延迟记录器
+
+        Args:
+            window: 每个任务保留的最近样本数
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, task: str, seconds: float) -> None:
+        """
+        记录一次调用延迟
+
+        Args:
+            task: 任务类型
+            seconds: 延迟（秒）
+        """
+        self._samples.setdefault(task, deque(maxlen=self.window)).append(seconds)
+
+    def tasks(self) -> list:
+        """已有样本的任务类型"""
+        return list(self._samples)
+
+    def count(self, task: str) -> int:
+        """任务当前的样本数"""
+        return len(self._samples.get(task, ()))
+
+    def percentile(self, task: str, q: float) -> Optional[float]:
+        """
+        计算延迟分位数（最近邻法）
+
+        Args:
+            task: 任务类型
+            q: 分位数（0-1）
+
+        Returns:
+            分位数延迟，没有样本时返回None
+        """
+        samples = self._samples.get(task)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+        return ordered[index]
+
+
+class RequestHedger:
+    """
+    请求对冲器（单例）
+
+    职责：
+    - 维护各任务的自适应对冲阈值
+    - 超过阈值时发起备用请求，取先返回者
+    - 按滑动窗口限制对冲比例
+    """
+
+    _instance: Optional['RequestHedger'] = None
+
+    def __new__(cls):
+        """单例模式：延迟样本和对冲预算需要跨请求共享"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化对冲器（单例模式，只会初始化一次）"""
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self.enabled = settings.HEDGE_ENABLED
+        self.percentile = settings.HEDGE_PERCENTILE
+        self.max_rate = settings.HEDGE_MAX_RATE
+        self.min_delay = settings.HEDGE_MIN_DELAY
+        self.min_samples = settings.HEDGE_MIN_SAMPLES
+
+        self.latency = LatencyTracker()
+        # 最近调用是否发起了对冲（用于计算对冲比例）
+        self._recent: Deque[bool] = deque(maxlen=200)
+        self._recent_hedged = 0
+
+        self._stats = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "budget_denied": 0,
+        }
+
+        self._initialized = True
+
+    def threshold(self, task: str) -> Optional[float]:
+        """
+        当前任务的对冲阈值
+
+        Args:
+            task: 任务类型
+
+        Returns:
+            阈值（秒），样本不足时返回None（不对冲）
+        """
+        if self.latency.count(task) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(task, self.percentile))
+
+    async def run(
+        self,
+        task: str,
+        factory: Callable[[], Awaitable[Any]],
+        admission: Optional[Callable[[], AsyncContextManager]] = None
+    ) -> Any:
+        """
+        执行调用，超过阈值时发起对冲
+
+        延迟样本和对冲计时都从请求获得调用名额之后开始：排队时间不抬高阈值，
+        主请求仍在排队时也不会对冲（备用请求只会再占一个名额，加剧拥塞）。
+
+        Args:
+            task: 任务类型（分别统计延迟）
+            factory: 无参协程工厂，每次调用发起一个独立请求
+            admission: 无参工厂，返回每个请求执行期间持有的异步上下文（如调度器名额），默认不排队
+
+        Returns:
+            先成功返回的结果
+
+        Raises:
+            Exception: 所有请求均失败时抛出主请求的异常
+        """
+        self._stats["calls"] += 1
+        admission = admission or nullcontext
+
+        async def attempt(admitted: asyncio.Event) -> Tuple[Any, float]:
+            async with admission():
+                admitted.set()
+                start = time.monotonic()
+                result = await factory()
+                return result, time.monotonic() - start
+
+        if not self.enabled:
+            result, latency = await attempt(asyncio.Event())
+            self.latency.record(task, latency)
+            return result
+
+        admitted = asyncio.Event()
+        primary = asyncio.ensure_future(attempt(admitted))
+        hedged = False
+        try:
+            # 主请求排队期间不计时
+            waiter = asyncio.ensure_future(admitted.wait())
+            try:
+                await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+
+            delay = self.threshold(task)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._allow_hedge():
+                result, latency = await primary
+                self.latency.record(task, latency)
+                return result
+
+            hedged = True
+            self._stats["hedged"] += 1
+            logger.info(f"🪁 请求对冲 - Task: {task}, 阈值: {delay:.3f}秒")
+            secondary = asyncio.ensure_future(attempt(asyncio.Event()))
+            (result, latency), winner = await self._first_success(primary, secondary)
+
+            if winner is secondary:
+                self._stats["hedge_wins"] += 1
+            self.latency.record(task, latency)
+            return result
+        finally:
+            self._record_call(hedged)
+            if not primary.done():
+                primary.cancel()
+
+    async def _first_success(self, *tasks: asyncio.Future) -> Any:
+        """等待第一个成功的请求并取消其余请求；全部失败时抛出第一个请求的异常"""
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and not task.cancelled() and task.exception() is None:
+                        return task.result(), task
+            # 全部失败
+            return tasks[0].result(), tasks[0]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _allow_hedge(self) -> bool:
+        """对冲比例未超过上限时允许对冲"""
+        window = max(len(self._recent), self.min_samples)
+        if (self._recent_hedged + 1) / (window + 1) > self.max_rate:
+            self._stats["budget_denied"] += 1
+            return False
+        return True
+
+    def _record_call(self, hedged: bool) -> None:
+        """记录调用是否对冲（滑动窗口）"""
+        if len(self._recent) == self._recent.maxlen and self._recent[0]:
+            self._recent_hedged -= 1
+        self._recent.append(hedged)
+        if hedged:
+            self._recent_hedged += 1
+
+    def get_stats(self) -> dict:
+        """
+        获取对冲统计
+
+        Returns:
+            各任务当前阈值、对冲次数、备用请求胜出次数等
+        """
+        thresholds = {task: self.threshold(task) for task in self.latency.tasks()}
+        return {
+            "enabled": self.enabled,
+            "max_rate": self.max_rate,
+            "recent_rate": self._recent_hedged / len(self._recent) if self._recent else 0.0,
+            "thresholds": thresholds,
+            **self._stats,
+        }
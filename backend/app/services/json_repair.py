@@ -0,0 +1,493 @@
+"""
+容错JSON修复
+
+AI回合响应不是合法JSON时，用一次容错的递归下降解析代替正则清洗：
+1. 代码块标记、前后多余文字、注释
+2. 末尾逗号、缺失的逗号/冒号、无引号的键、单引号字符串
+3. 数字前的加号（+30）、Python字面量（True/None）、裸字符串
+4. 字符串内未转义的引号和换行
+5. max_tokens 截断：自动闭合未结束的字符串和容器，丢弃不完整的键值
+
+修复后按回合响应结构逐项校验（repair_turn），只丢弃无效的选项/NPC/事件，
+保留其余内容。每一处修复都记录在 RepairResult.repairs 中。
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.api.schemas import AIChoice, MagicalElement, NPCProfile, NPCReaction, TriggeredEvent
+
+
+# 按元素校验的数组字段
+SCHEMA_ITEMS: Dict[str, Type[BaseModel]] = {
+    "choices": AIChoice,
+    "npcs": NPCProfile,
+    "updated_npcs": NPCProfile,
+    "triggered_events": TriggeredEvent,
+}
+
+# 整体校验的对象字段（无效时丢弃该字段）
+SCHEMA_OBJECTS: Dict[str, Type[BaseModel]] = {
+    "active_magical_element": MagicalElement,
+    "current_magical_element": MagicalElement,
+    "npc_reactions": NPCReaction,
+}
+
+# 最大嵌套深度（防御异常输入）
+MAX_DEPTH = 64
+
+_NUMBER_PATTERN = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None}
+_PYTHON_LITERALS = {"True": True, "False": False, "None": None}
+
+# 值结束的分隔符
+_VALUE_END = ",}]\n"
+_WHITESPACE = re.compile(r'[ \t\r\n\ufeff]*')
+_WORD_PATTERN = re.compile(r'[^,}\]\n]*')
+
+# 字符串内需要逐个处理的字符
+_STRING_SPECIAL = {quote: re.compile(f'[{quote}\\\\\n\r\t]') for quote in "\"'"}
+
+# 缺失值（截断或无法识别），所在的键值/元素被丢弃
+_MISSING = object()
+
+
+@dataclass
+class RepairResult:
+    """
+    修复结果
+
+    value: 修复后的值
+    repairs: 修复记录（按出现顺序去重，例如 trailing_comma、truncated、dropped:choices[3]）
+    truncated: 内容是否被截断
+    partial: 因截断被强制闭合的容器（id），结构校验时视为不完整
+    """
+    value: Any
+    repairs: List[str] = field(default_factory=list)
+    truncated: bool = False
+    partial: Set[int] = field(default_factory=set, repr=False)
+
+    @property
+    def repaired(self) -> bool:
+        """是否做过任何修复"""
+        return bool(self.repairs)
+
+
+class _RepairParser:
+    """容错的递归下降JSON解析器"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.repairs: List[str] = []
+        self.truncated = False
+        # 因截断被强制闭合的容器（id），校验时丢弃
+        self.partial: Set[int] = set()
+
+    def note(self, repair: str) -> None:
+        """记录一处修复"""
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def eof(self) -> bool:
+        """是否已到结尾"""
+        return self.pos >= len(self.text)
+
+    def mark_truncated(self) -> None:
+        """记录截断"""
+        self.truncated = True
+        self.note("truncated")
+
+    def parse(self) -> Any:
+        """解析根值"""
+        starts = [i for i in (self.text.find("{"), self.text.find("[")) if i >= 0]
+        if not starts:
+            raise ValueError("内容中没有JSON对象")
+        self.pos = min(starts)
+        prefix = self.text[:self.pos]
+        if "```" in prefix:
+            self.note("code_fence")
+            prefix = prefix.replace("```json", "").replace("```", "")
+        if prefix.strip():
+            self.note("leading_text")
+
+        value = self.value(0)
+        if value is _MISSING:
+            raise ValueError("内容中没有可解析的JSON值")
+
+        rest = self.text[self.pos:]
+        if "```" in rest:
+            self.note("code_fence")
+            rest = rest.replace("```", "")
+        if rest.strip():
+            self.note("trailing_text")
+        return value
+
+    def skip_whitespace(self) -> None:
+        """跳过空白和注释"""
+        text = self.text
+        while True:
+            self.pos = _WHITESPACE.match(text, self.pos).end()
+            if text.startswith("//", self.pos):
+                end = text.find("\n", self.pos)
+                self.pos = len(text) if end < 0 else end + 1
+                self.note("comment")
+            elif text.startswith("/*", self.pos):
+                end = text.find("*/", self.pos + 2)
+                self.pos = len(text) if end < 0 else end + 2
+                self.note("comment")
+            else:
+                return
+
+    def value(self, depth: int) -> Any:
+        """解析一个值"""
+        if depth > MAX_DEPTH:
+            raise ValueError("JSON嵌套过深")
+        self.skip_whitespace()
+        if self.eof():
+            self.mark_truncated()
+            return _MISSING
+
+        char = self.text[self.pos]
+        if char == "{":
+            return self.object(depth)
+        if char == "[":
+            return self.array(depth)
+        if char in "\"'":
+            return self.string(char)
+        if char in "+-.0123456789":
+            return self.number()
+        return self.word()
+
+    def object(self, depth: int) -> dict:
+        """解析对象"""
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        while True:
+            self.skip_whitespace()
+            if self.eof():
+                self.mark_truncated()
+                self.partial.add(id(result))
+                return result
+
+            char = self.text[self.pos]
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == "]":
+                # 括号不匹配：当作对象结束
+                self.note("mismatched_bracket")
+                self.pos += 1
+                return result
+            if char == ",":
+                self.note("extra_comma")
+                self.pos += 1
+                continue
+
+            key = self.key()
+            self.skip_whitespace()
+            if self.eof():
+                self.mark_truncated()
+                self.partial.add(id(result))
+                return result
+            if self.text[self.pos] == ":":
+                self.pos += 1
+            else:
+                self.note("missing_colon")
+
+            value = self.value(depth + 1)
+            if value is not _MISSING:
+                result[key] = value
+            if self.truncated and self.eof():
+                self.partial.add(id(result))
+                return result
+            self.separator()
+
+    def array(self, depth: int) -> list:
+        """解析数组"""
+        self.pos += 1
+        result: List[Any] = []
+        while True:
+            self.skip_whitespace()
+            if self.eof():
+                self.mark_truncated()
+                self.partial.add(id(result))
+                return result
+
+            char = self.text[self.pos]
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == "}":
+                self.note("mismatched_bracket")
+                self.pos += 1
+                return result
+            if char == ",":
+                self.note("extra_comma")
+                self.pos += 1
+                continue
+
+            value = self.value(depth + 1)
+            if value is not _MISSING:
+                result.append(value)
+            if self.truncated and self.eof():
+                self.partial.add(id(result))
+                return result
+            self.separator()
+
+    def separator(self) -> None:
+        """成员之后：逗号、闭合括号或缺失的逗号"""
+        self.skip_whitespace()
+        if self.eof():
+            return
+        char = self.text[self.pos]
+        if char == ",":
+            self.pos += 1
+            self.skip_whitespace()
+            if not self.eof() and self.text[self.pos] in "}]":
+                self.note("trailing_comma")
+        elif char not in "}]":
+            self.note("missing_comma")
+
+    def key(self) -> str:
+        """解析对象的键（允许单引号和无引号）"""
+        char = self.text[self.pos]
+        if char in "\"'":
+            return self.string(char, is_key=True)
+
+        start = self.pos
+        while not self.eof() and self.text[self.pos] not in ":,{}[]\n\"'" and not self.text[self.pos].isspace():
+            self.pos += 1
+        if self.pos == start:
+            # 无法识别的字符，跳过以保证前进
+            self.pos += 1
+            self.note("unexpected_char")
+            return self.text[start]
+        self.note("unquoted_key")
+        return self.text[start:self.pos]
+
+    def string(self, quote: str, is_key: bool = False) -> str:
+        """解析字符串（容忍未转义的引号、换行和非法转义）"""
+        if quote == "'":
+            self.note("single_quote")
+        text = self.text
+        self.pos += 1
+        chars: List[str] = []
+        special = _STRING_SPECIAL[quote]
+        while True:
+            # 普通字符整段复制，只在引号、反斜杠和控制字符处停下
+            match = special.search(text, self.pos)
+            if match is None:
+                chars.append(text[self.pos:])
+                self.pos = len(text)
+                break
+            chars.append(text[self.pos:match.start()])
+            self.pos = match.start()
+
+            char = text[self.pos]
+            if char == quote:
+                if self._closes_string(is_key):
+                    self.pos += 1
+                    return "".join(chars)
+                self.note("unescaped_quote")
+                chars.append(char)
+                self.pos += 1
+            elif char == "\\":
+                chars.append(self._escape())
+            else:
+                self.note("control_char")
+                chars.append(char)
+                self.pos += 1
+
+        self.mark_truncated()
+        return "".join(chars)
+
+    def _closes_string(self, is_key: bool) -> bool:
+        """引号之后是分隔符（或结尾）时才算字符串结束"""
+        index = self.pos + 1
+        text = self.text
+        while index < len(text) and text[index] in " \t\r":
+            index += 1
+        if index >= len(text):
+            return True
+        follow = text[index]
+        if is_key:
+            return follow == ":" or follow in _VALUE_END
+        return follow in _VALUE_END or follow == ":" or text.startswith(("```", "//", "/*"), index)
+
+    def _escape(self) -> str:
+        """解析转义序列（非法转义保留原字符）"""
+        text = self.text
+        if self.pos + 1 >= len(text):
+            self.pos += 1
+            return ""
+        char = text[self.pos + 1]
+        if char in _ESCAPES:
+            self.pos += 2
+            return _ESCAPES[char]
+        if char == "u":
+            digits = text[self.pos + 2:self.pos + 6]
+            if len(digits) == 4 and all(c in "0123456789abcdefABCDEF" for c in digits):
+                self.pos += 6
+                code = int(digits, 16)
+                # 代理对
+                if 0xD800 <= code < 0xDC00 and text.startswith("\\u", self.pos):
+                    low = text[self.pos + 2:self.pos + 6]
+                    if len(low) == 4 and all(c in "0123456789abcdefABCDEF" for c in low):
+                        low_code = int(low, 16)
+                        if 0xDC00 <= low_code < 0xE000:
+                            self.pos += 6
+                            return chr(0x10000 + ((code - 0xD800) << 10) + (low_code - 0xDC00))
+                return chr(code)
+        self.note("invalid_escape")
+        self.pos += 2
+        return char
+
+    def number(self) -> Any:
+        """解析数字（容忍前导加号）；数字后紧跟其他文字时按裸字符串处理"""
+        match = _NUMBER_PATTERN.match(self.text, self.pos)
+        if match is None:
+            return self.word()
+        end = match.end()
+        if end < len(self.text) and self.text[end] not in _VALUE_END and not self.text[end].isspace() \
+                and not self.text.startswith("//", end):
+            return self.word()
+
+        token = match.group()
+        self.pos = end
+        if token.startswith("+"):
+            self.note("plus_number")
+            token = token[1:]
+        if end >= len(self.text):
+            self.mark_truncated()
+        if re.fullmatch(r'-?\d+', token):
+            return int(token)
+        return float(token)
+
+    def word(self) -> Any:
+        """解析字面量或裸字符串"""
+        start = self.pos
+        text = self.text
+        self.pos = _WORD_PATTERN.match(text, self.pos).end()
+        token = text[start:self.pos].strip()
+        if self.pos >= len(text):
+            self.mark_truncated()
+            if token and token.startswith("```"):
+                token = ""
+        if not token:
+            if self.pos == start:
+                self.pos += 1
+                self.note("unexpected_char")
+            return _MISSING
+
+        if token in _LITERALS:
+            return _LITERALS[token]
+        if token in _PYTHON_LITERALS:
+            self.note("python_literal")
+            return _PYTHON_LITERALS[token]
+        if self.truncated:
+            for literal, value in _LITERALS.items():
+                if literal.startswith(token):
+                    return value
+        self.note("bare_string")
+        return token
+
+
+def repair_json(text: str) -> RepairResult:
+    """
+    容错解析（可能不合法的）JSON文本
+
+    Args:
+        text: AI返回的原始内容
+
+    Returns:
+        修复结果（合法JSON时 repairs 为空）
+
+    Raises:
+        ValueError: 内容中找不到JSON对象或数组
+    """
+    try:
+        return RepairResult(value=json.loads(text))
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    parser = _RepairParser(text)
+    value = parser.parse()
+    return RepairResult(value=value, repairs=parser.repairs, truncated=parser.truncated, partial=parser.partial)
+
+
+def repair_turn(text: str) -> RepairResult:
+    """
+    修复AI回合响应，并按回合结构丢弃无效（或被截断）的元素
+
+    Args:
+        text: AI返回的原始内容
+
+    Returns:
+        修复结果（value 为字典）
+
+    Raises:
+        ValueError: 无法得到JSON对象
+    """
+    result = repair_json(text)
+    if not isinstance(result.value, dict):
+        raise ValueError(f"AI响应不是JSON对象: {type(result.value).__name__}")
+    salvage_turn(result.value, result.repairs, result.partial)
+    return result
+
+
+def salvage_turn(turn: dict, repairs: List[str], partial: Optional[Set[int]] = None) -> dict:
+    """
+    按回合结构校验各字段，丢弃无效元素（原地修改）
+
+    Args:
+        turn: 回合字典
+        repairs: 修复记录（追加 dropped:字段[序号]）
+        partial: 因截断被强制闭合的容器 id，对应元素视为不完整
+
+    Returns:
+        turn 本身
+    """
+    partial = partial or set()
+
+    for key, model in SCHEMA_ITEMS.items():
+        items = turn.get(key)
+        if items is None:
+            continue
+        if not isinstance(items, list):
+            del turn[key]
+            repairs.append(f"dropped:{key}")
+            continue
+        kept = []
+        for index, item in enumerate(items):
+            normalized = _validate(model, item) if id(item) not in partial else None
+            if normalized is None:
+                repairs.append(f"dropped:{key}[{index}]")
+            else:
+                kept.append(normalized)
+        turn[key] = kept
+
+    for key, model in SCHEMA_OBJECTS.items():
+        if key not in turn or turn[key] is None:
+            continue
+        normalized = _validate(model, turn[key]) if id(turn[key]) not in partial else None
+        if normalized is None:
+            del turn[key]
+            repairs.append(f"dropped:{key}")
+        else:
+            turn[key] = normalized
+    return turn
+
+
+def _validate(model: Type[BaseModel], item: Any) -> Optional[dict]:
+    """按模型校验并规范化（保留模型外的字段），无效时返回None"""
+    if not isinstance(item, dict):
+        return None
+    try:
+        return {**item, **model.model_validate(item).model_dump(exclude_none=True)}
+    except ValidationError:
+        return None
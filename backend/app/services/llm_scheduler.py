@@ -0,0 +1,178 @@
+"""
+LLM调用准入控制
+
+所有发往模型供应商的请求共享一个全局并发上限：
+1. 名额空闲时直接放行
+2. 名额用尽时按优先级排队（同优先级先到先得）
+3. 名额释放后直接移交给队首请求
+4. 记录各优先级的排队深度和等待时间
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+class LLMPriority(IntEnum):
+    """LLM调用优先级（数值越小越优先）"""
+
+    INTERACTIVE = 0  # 玩家正在等待的回合生成
+    START = 1  # 开始游戏时的初始世界
+    SPECULATIVE = 2  # 投机预生成、世界池补充
+    SUMMARY = 3  # 上下文摘要
+
+
+class LLMScheduler:
+    """
+    LLM调用调度器（单例）
+
+    职责：
+    - 限制同时进行的供应商请求数，避免突发流量触发 429
+    - 让交互式请求优先于后台请求获得名额
+    - 统计排队深度和等待时间
+    """
+
+    _instance: Optional['LLMScheduler'] = None
+
+    def __new__(cls):
+        """单例模式：并发上限需要全局共享"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化调度器（单例模式，只会初始化一次）"""
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self.max_concurrency = max(1, settings.LLM_MAX_CONCURRENCY)
+        self._active = 0
+        # 等待队列：(优先级, 到达序号, 名额移交用的future)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        self._stats: Dict[LLMPriority, dict] = {
+            priority: {
+                "admitted": 0,
+                "queued": 0,
+                "cancelled": 0,
+                "wait_count": 0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+            }
+            for priority in LLMPriority
+        }
+
+        self._initialized = True
+
+    @asynccontextmanager
+    async def slot(self, priority: LLMPriority) -> AsyncIterator[None]:
+        """
+        占用一个调用名额，退出时归还
+
+        Args:
+            priority: 调用优先级
+
+        Yields:
+            None（持有名额期间执行供应商请求）
+        """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: LLMPriority) -> None:
+        """获取名额，名额用尽时按优先级排队"""
+        stats = self._stats[priority]
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            stats["admitted"] += 1
+            return
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        stats["queued"] += 1
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            if future.done() and not future.cancelled():
+                # 名额已移交但请求同时被取消：转交给下一个
+                self._release()
+            elif entry in self._waiters:
+                # 仍在排队：移出队列，避免阻挡后续请求直接放行
+                # （同一轮事件循环中 _release 可能已弹出这个已取消的条目）
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+        waited = time.monotonic() - start
+        stats["admitted"] += 1
+        stats["wait_count"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        if waited > 1:
+            logger.info(f"🚦 LLM调用排队 {waited:.3f}秒 - 优先级: {priority.name}")
+
+    def _release(self) -> None:
+        """归还名额：有人排队时直接移交，否则释放"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def queue_depth(self, priority: LLMPriority) -> int:
+        """
+        该优先级的新请求前面排着多少个请求
+
+        Args:
+            priority: 新请求的优先级
+
+        Returns:
+            优先级不低于它的排队请求数
+        """
+        return sum(1 for p, _, future in self._waiters if p <= priority and not future.done())
+
+    def get_stats(self) -> dict:
+        """
+        获取调度统计
+
+        Returns:
+            并发上限、当前占用、队列深度及各优先级的等待时间
+        """
+        depth = {priority.name.lower(): 0 for priority in LLMPriority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[LLMPriority(priority).name.lower()] += 1
+
+        classes = {}
+        for priority, stats in self._stats.items():
+            wait_count = stats["wait_count"]
+            classes[priority.name.lower()] = {
+                "admitted": stats["admitted"],
+                "queued": stats["queued"],
+                "cancelled": stats["cancelled"],
+                "avg_wait_ms": round(stats["wait_total"] / wait_count * 1000, 1) if wait_count else 0.0,
+                "max_wait_ms": round(stats["wait_max"] * 1000, 1),
+            }
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "priorities": classes,
+        }
@@ -0,0 +1,259 @@
+"""
+初始回合局部重生成
+
+初始回合验证失败时（例如某个NPC缺少 personality、选项少了一个），
+不丢弃整个约2048 token的生成结果，而是：
+1. 能在本地修好的直接修（玩家状态、游戏元数据、多余的NPC/选项）
+2. 只把无效片段交给模型重生成（"补全NPC #3"、"再给1个选项"），小提示词 + 小 max_tokens
+3. 把结果合并回原内容后重新验证
+
+片段过多（世界基本不可用）时返回None，由调用方按原流程降级。
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.services.content_validator import ContentValidator
+
+
+# 每类片段的 max_tokens 估算
+TOKENS_PER_NPC = 160
+TOKENS_PER_CHOICE = 80
+TOKENS_PER_COMPANY_FIELD = 40
+TOKENS_FOR_STORY = 400
+TOKENS_OVERHEAD = 64
+
+REPAIR_SYSTEM_PROMPT = "你是职场摸鱼游戏的内容编辑，只补全用户指定的缺失片段，严格输出JSON，不要输出其他文字。"
+
+
+@dataclass
+class RepairPlan:
+    """
+    局部重生成计划
+
+    complete_npcs / complete_choices: 需要补全字段的元素下标
+    new_npcs / new_choices: 需要新增的数量
+    company_fields: 需要补全的公司信息字段
+    story: 是否需要重写开场剧情
+    local_fixes: 已在本地完成的修复
+    """
+    complete_npcs: List[int] = field(default_factory=list)
+    new_npcs: int = 0
+    complete_choices: List[int] = field(default_factory=list)
+    new_choices: int = 0
+    company_fields: List[str] = field(default_factory=list)
+    story: bool = False
+    local_fixes: List[str] = field(default_factory=list)
+
+    @property
+    def fragment_count(self) -> int:
+        """需要模型生成的片段数"""
+        return (
+            len(self.complete_npcs) + self.new_npcs
+            + len(self.complete_choices) + self.new_choices
+            + (1 if self.company_fields else 0) + (1 if self.story else 0)
+        )
+
+    @property
+    def max_tokens(self) -> int:
+        """局部重生成的 max_tokens"""
+        return (
+            TOKENS_OVERHEAD
+            + TOKENS_PER_NPC * (len(self.complete_npcs) + self.new_npcs)
+            + TOKENS_PER_CHOICE * (len(self.complete_choices) + self.new_choices)
+            + TOKENS_PER_COMPANY_FIELD * len(self.company_fields)
+            + (TOKENS_FOR_STORY if self.story else 0)
+        )
+
+
+def plan_initial_repair(result: dict, seed: int, max_fragments: int) -> Optional[RepairPlan]:
+    """
+    分析验证失败的初始回合，在本地修复能修的部分并列出需要重生成的片段
+
+    Args:
+        result: AI生成的初始回合（原地修改）
+        seed: 随机种子（补全游戏元数据）
+        max_fragments: 允许重生成的最大片段数
+
+    Returns:
+        重生成计划；片段数超过上限时返回None
+    """
+    plan = RepairPlan()
+    _fix_locally(result, seed, plan)
+
+    company = result["company_info"]
+    for name in ContentValidator.REQUIRED_COMPANY_FIELDS:
+        if not company.get(name):
+            plan.company_fields.append(name)
+
+    npcs = result["npcs"]
+    seen_names = set()
+    for index, npc in enumerate(npcs):
+        # 重名的NPC清空名字，按补全处理
+        if npc.get("name") in seen_names:
+            npc["name"] = ""
+        seen_names.add(npc.get("name"))
+        if any(not npc.get(name) for name in ContentValidator.REQUIRED_NPC_FIELDS):
+            plan.complete_npcs.append(index)
+    plan.new_npcs = max(0, ContentValidator.MIN_NPCS - len(npcs))
+
+    choices = result["choices"]
+    for index, choice in enumerate(choices):
+        if not choice.get("id") or not str(choice.get("text") or "").strip() or "effects" not in choice:
+            plan.complete_choices.append(index)
+    plan.new_choices = max(0, ContentValidator.MIN_CHOICES - len(choices))
+
+    story = result.get("story_context")
+    plan.story = not isinstance(story, str) or not story.strip()
+
+    if plan.fragment_count > max_fragments:
+        return None
+    return plan
+
+
+def _fix_locally(result: dict, seed: int, plan: RepairPlan) -> None:
+    """本地修复：类型错误、缺失的玩家状态和元数据、多余的元素、禁止词汇"""
+    if not isinstance(result.get("company_info"), dict):
+        result["company_info"] = {}
+        plan.local_fixes.append("company_info")
+    company = result["company_info"]
+    if any(word in str(company.get("name", "")) for word in ContentValidator.FORBIDDEN_WORDS):
+        company["name"] = ""
+
+    if not isinstance(result.get("game_meta"), dict):
+        result["game_meta"] = {
+            "company_type": company.get("type") or "未知",
+            "style_type": "接地气大白话",
+            "seed_used": seed,
+        }
+        plan.local_fixes.append("game_meta")
+
+    state = result.get("player_state")
+    if not isinstance(state, dict):
+        result["player_state"] = dict(INITIAL_PLAYER_STATE)
+        plan.local_fixes.append("player_state")
+    elif any(stat not in state for stat in ContentValidator.REQUIRED_STATS):
+        result["player_state"] = {**INITIAL_PLAYER_STATE, **state}
+        plan.local_fixes.append("player_state")
+
+    for key, limit in (("npcs", ContentValidator.MAX_NPCS), ("choices", ContentValidator.MAX_CHOICES)):
+        items = result.get(key)
+        if not isinstance(items, list):
+            items = []
+        kept = [item for item in items if isinstance(item, dict)][:limit]
+        if len(kept) != len(items) or not isinstance(result.get(key), list):
+            plan.local_fixes.append(key)
+        result[key] = kept
+
+    for choice in result["choices"]:
+        if any(word in str(choice.get("text", "")) for word in ContentValidator.FORBIDDEN_WORDS):
+            choice["text"] = ""
+
+
+def build_repair_prompt(result: dict, plan: RepairPlan) -> str:
+    """
+    构建局部重生成提示词（只包含补全所需的上下文）
+
+    Args:
+        result: 本地修复后的初始回合
+        plan: 重生成计划
+
+    Returns:
+        用户提示词
+    """
+    company = result["company_info"]
+    npc_names = "、".join(
+        f"{npc.get('name')}（{npc.get('role') or '未知'}）" for npc in result["npcs"] if npc.get("name")
+    ) or "无"
+    choice_texts = "、".join(str(choice.get("text")) for choice in result["choices"] if choice.get("text")) or "无"
+
+    lines = [
+        f"公司：{company.get('name') or '未命名'}（{company.get('type') or '未知类型'}）",
+        f"已有NPC：{npc_names}",
+        f"已有选项：{choice_texts}",
+        "",
+        "只生成以下缺失内容，已有内容保持不变：",
+    ]
+    for index in plan.complete_npcs:
+        npc = {k: v for k, v in result["npcs"][index].items() if v}
+        missing = [name for name in ContentValidator.REQUIRED_NPC_FIELDS if not npc.get(name)]
+        lines.append(f"- 补全NPC：{_dumps(npc)}，缺少 {'、'.join(missing)}")
+    if plan.new_npcs:
+        lines.append(f"- 新增{plan.new_npcs}个NPC（id、name、role、personality），名字不能与已有NPC重复")
+    for index in plan.complete_choices:
+        choice = {k: v for k, v in result["choices"][index].items() if v}
+        lines.append(f"- 补全选项：{_dumps(choice)}（需要 id、text、category、effects）")
+    if plan.new_choices:
+        lines.append(
+            f"- 新增{plan.new_choices}个选项（id、text 20字以内、category、"
+            "effects 为 energy/chill/progress/suspicion/connection/blackmail 的增量）"
+        )
+    if plan.company_fields:
+        lines.append(f"- 补全公司信息字段：{'、'.join(plan.company_fields)}")
+    if plan.story:
+        lines.append("- 写一段开场剧情 story_context（150字以内）")
+
+    shape = {}
+    if plan.complete_npcs or plan.new_npcs:
+        shape["npcs"] = "[先按顺序给出补全后的NPC，再给新增的NPC]"
+    if plan.complete_choices or plan.new_choices:
+        shape["choices"] = "[先按顺序给出补全后的选项，再给新增的选项]"
+    if plan.company_fields:
+        shape["company_info"] = {name: "..." for name in plan.company_fields}
+    if plan.story:
+        shape["story_context"] = "..."
+    lines += ["", f"返回JSON：{_dumps(shape)}"]
+    return "\n".join(lines)
+
+
+def merge_repair(result: dict, plan: RepairPlan, patch: Dict[str, Any]) -> None:
+    """
+    把局部重生成的片段合并回初始回合（原地修改，已有的非空字段不会被覆盖）
+
+    Args:
+        result: 本地修复后的初始回合
+        plan: 重生成计划
+        patch: 模型返回的片段
+    """
+    _merge_items(result["npcs"], plan.complete_npcs, plan.new_npcs, patch.get("npcs"), "npc")
+    _merge_items(result["choices"], plan.complete_choices, plan.new_choices, patch.get("choices"), "choice")
+    for choice in result["choices"]:
+        choice.setdefault("effects", {})
+
+    company_patch = patch.get("company_info")
+    if isinstance(company_patch, dict):
+        for name in plan.company_fields:
+            if company_patch.get(name):
+                result["company_info"][name] = company_patch[name]
+
+    story = patch.get("story_context")
+    if plan.story and isinstance(story, str) and story.strip():
+        result["story_context"] = story
+
+
+def _merge_items(items: List[dict], incomplete: List[int], new_count: int, patch: Any, prefix: str) -> None:
+    """按顺序补全下标对应的元素，再追加新增元素；id 缺失或重复时重新编号"""
+    if not isinstance(patch, list):
+        return
+    patch = [item for item in patch if isinstance(item, dict)]
+
+    for index, item in zip(incomplete, patch):
+        existing = {k: v for k, v in items[index].items() if v or k == "effects"}
+        items[index] = {**item, **existing}
+
+    ids = {item.get("id") for item in items}
+    for item in patch[len(incomplete):len(incomplete) + new_count]:
+        item = dict(item)
+        if not item.get("id") or item["id"] in ids:
+            number = len(items) + 1
+            while f"{prefix}_{number}" in ids:
+                number += 1
+            item["id"] = f"{prefix}_{number}"
+        ids.add(item["id"])
+        items.append(item)
+
+
+def _dumps(value: Any) -> str:
+    """紧凑JSON"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,367 @@
+"""
+多供应商路由
+
+把LLM调用分发到多个供应商端点/API Key：
+1. 每个端点记录滚动延迟（EWMA）、错误率和限流余量
+2. 按权重随机抽取两个可用端点，选得分较高者（power of two choices）
+3. 限流、超时、连接失败、5xx、鉴权失败时自动切换到下一个端点
+4. 出错的端点进入冷却期，冷却结束后重新参与路由
+5. 端点不支持结构化输出（response_format）时按端点逐级降级后重试
+"""
+import json
+import random
+import time
+from typing import Any, List, Optional, Set
+
+from loguru import logger
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    AuthenticationError,
+    BadRequestError,
+    InternalServerError,
+    PermissionDeniedError,
+    RateLimitError,
+)
+
+from app.core.config import settings
+from app.services.structured_output import RESPONSE_FORMAT_LEVELS
+
+
+# 可以换一个端点重试的错误（请求本身没问题，是端点不可用）
+FAILOVER_ERRORS = (
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError,
+    AuthenticationError,
+    PermissionDeniedError,
+)
+
+# 400错误信息中出现这些词时，视为端点不支持所请求的 response_format
+RESPONSE_FORMAT_ERROR_HINTS = ("response_format", "json_schema", "json_object", "schema", "structured")
+
+# EWMA平滑系数（越大越偏向最近的调用）
+EWMA_ALPHA = 0.2
+
+# 尚无样本的端点使用的乐观延迟估计（秒），让新端点有机会被探测
+DEFAULT_LATENCY = 1.0
+
+
+class ProviderEndpoint:
+    """单个供应商端点（base_url + API Key）的健康状态"""
+
+    def __init__(
+        self,
+        name: str,
+        client: Any,
+        model: Optional[str] = None,
+        weight: float = 1.0,
+    ):
+        """
+        初始化端点
+
+        Args:
+            name: 端点名称（日志和指标用）
+            client: AsyncOpenAI 客户端
+            model: 该端点使用的模型，None 表示沿用调用方指定的模型
+            weight: 路由权重
+        """
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = max(0.0, weight)
+
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.remaining_requests: Optional[int] = None
+        self.limit_requests: Optional[int] = None
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+
+        self.calls = 0
+        self.failures = 0
+
+        # 端点支持的最强结构化输出级别（RESPONSE_FORMAT_LEVELS 下标，遇到400时逐级降级）
+        self.response_format_level = 0
+
+    def available(self, now: float) -> bool:
+        """是否不在冷却期"""
+        return self.weight > 0 and now >= self.cooldown_until
+
+    def headroom(self) -> float:
+        """限流余量（0-1），未知时视为充足"""
+        if not self.limit_requests or self.remaining_requests is None:
+            return 1.0
+        return max(0.0, min(1.0, self.remaining_requests / self.limit_requests))
+
+    def score(self) -> float:
+        """路由得分：权重和余量越高、延迟/并发/错误率越低越好"""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        health = (1.0 - self.error_rate) ** 2
+        return self.weight * max(self.headroom(), 0.05) * health / (latency * (1 + self.in_flight))
+
+    def adapt_response_format(self, params: dict) -> Optional[str]:
+        """
+        按端点支持的级别改写 response_format 参数
+
+        Args:
+            params: 本次调用参数（原地修改）
+
+        Returns:
+            实际使用的级别，未请求结构化输出时返回None
+        """
+        requested = params.get("response_format")
+        if not requested:
+            return None
+        requested_type = requested.get("type")
+        level = RESPONSE_FORMAT_LEVELS.index(requested_type) if requested_type in RESPONSE_FORMAT_LEVELS else 0
+        mode = RESPONSE_FORMAT_LEVELS[max(level, self.response_format_level)]
+        if mode == "json_object":
+            params["response_format"] = {"type": "json_object"}
+        elif mode == "off":
+            params.pop("response_format")
+        return mode
+
+    def downgrade_response_format(self, mode: str, error: BadRequestError) -> bool:
+        """
+        端点拒绝 response_format 时降一级
+
+        Args:
+            mode: 本次调用使用的级别
+            error: 400错误
+
+        Returns:
+            是否已降级（可以重试）；错误与 response_format 无关或已无法降级时返回False
+        """
+        message = str(error).lower()
+        if mode == "off" or not any(hint in message for hint in RESPONSE_FORMAT_ERROR_HINTS):
+            return False
+        self.response_format_level = RESPONSE_FORMAT_LEVELS.index(mode) + 1
+        logger.warning(
+            f"🧩 端点 {self.name} 不支持 {mode} 结构化输出，"
+            f"降级为 {RESPONSE_FORMAT_LEVELS[self.response_format_level]}"
+        )
+        return True
+
+    def record_success(self, latency: float, headers: Any) -> None:
+        """
+        记录成功调用
+
+        Args:
+            latency: 调用耗时（秒）
+            headers: 响应头（读取限流余量）
+        """
+        self.calls += 1
+        self.latency = latency if self.latency is None else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+        )
+        self.error_rate *= (1 - EWMA_ALPHA)
+        self._read_rate_limit(headers)
+
+    def record_failure(self, error: Exception) -> None:
+        """
+        记录失败调用并进入冷却期
+
+        Args:
+            error: 调用异常
+        """
+        self.calls += 1
+        self.failures += 1
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+
+        if isinstance(error, RateLimitError):
+            self.remaining_requests = 0
+            cooldown = self._retry_after(error) or 5.0
+        elif isinstance(error, (AuthenticationError, PermissionDeniedError)):
+            cooldown = 300.0  # Key失效，长时间冷却
+        else:
+            cooldown = 2.0
+        self.cooldown_until = time.monotonic() + cooldown
+
+    def _read_rate_limit(self, headers: Any) -> None:
+        """读取 x-ratelimit-* 响应头"""
+        if headers is None:
+            return
+        try:
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            limit = headers.get("x-ratelimit-limit-requests")
+            if remaining is not None:
+                self.remaining_requests = int(remaining)
+            if limit is not None:
+                self.limit_requests = int(limit)
+        except (TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> Optional[float]:
+        """读取 429 响应的 retry-after（秒）"""
+        try:
+            return float(error.response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def get_stats(self) -> dict:
+        """端点统计"""
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "headroom": round(self.headroom(), 3),
+            "in_flight": self.in_flight,
+            "cooling_down": not self.available(now),
+            "calls": self.calls,
+            "failures": self.failures,
+            "response_format": RESPONSE_FORMAT_LEVELS[self.response_format_level],
+        }
+
+
+class ProviderRouter:
+    """
+    供应商路由器
+
+    职责：
+    - 为每次调用选择当前最合适的端点
+    - 端点不可用时自动切换
+    - 汇总各端点的健康指标
+    """
+
+    def __init__(self, endpoints: List[ProviderEndpoint]):
+        """
+        初始化路由器
+
+        Args:
+            endpoints: 供应商端点列表（至少一个）
+        """
+        if not any(e.weight > 0 for e in endpoints):
+            raise ValueError("至少需要配置一个权重大于0的LLM供应商端点")
+        self.endpoints = endpoints
+        self._rng = random.Random()
+        self._stats = {"failovers": 0}
+
+    @classmethod
+    def from_settings(cls) -> 'ProviderRouter':
+        """
+        根据配置创建路由器
+
+        OPENAI_PROVIDERS 为JSON列表时使用多个端点，例如
+        [{"name": "a", "api_key": "...", "base_url": "...", "model": "...", "weight": 2}]；
+        未配置时使用 OPENAI_API_KEY / OPENAI_BASE_URL 单端点。
+
+        Returns:
+            供应商路由器
+
+        Raises:
+            ValueError: 配置格式错误或缺少API Key
+        """
+        if not settings.OPENAI_PROVIDERS:
+            if not settings.OPENAI_API_KEY:
+                raise ValueError("OPENAI_API_KEY 未配置")
+            client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL if settings.OPENAI_BASE_URL else None
+            )
+            return cls([ProviderEndpoint(name="default", client=client)])
+
+        try:
+            configs = json.loads(settings.OPENAI_PROVIDERS)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"OPENAI_PROVIDERS 不是合法的JSON: {e}")
+        if not isinstance(configs, list) or not configs:
+            raise ValueError("OPENAI_PROVIDERS 必须是非空的JSON列表")
+
+        endpoints = []
+        for index, config in enumerate(configs):
+            if not isinstance(config, dict) or not config.get("api_key"):
+                raise ValueError(f"OPENAI_PROVIDERS 第{index + 1}项缺少 api_key")
+            client = AsyncOpenAI(
+                api_key=config["api_key"],
+                base_url=config.get("base_url") or None
+            )
+            endpoints.append(ProviderEndpoint(
+                name=config.get("name") or f"provider-{index + 1}",
+                client=client,
+                model=config.get("model"),
+                weight=float(config.get("weight", 1.0)),
+            ))
+
+        logger.info(f"🔀 LLM供应商路由 - 端点: {[e.name for e in endpoints]}")
+        return cls(endpoints)
+
+    def _pick(self, tried: Set[ProviderEndpoint]) -> Optional[ProviderEndpoint]:
+        """按权重抽取两个可用端点，返回得分较高者；全部冷却时选最早恢复的"""
+        candidates = [e for e in self.endpoints if e not in tried and e.weight > 0]
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        available = [e for e in candidates if e.available(now)]
+        if not available:
+            return min(candidates, key=lambda e: e.cooldown_until)
+        if len(available) == 1:
+            return available[0]
+
+        first, second = self._rng.choices(available, weights=[e.weight for e in available], k=2)
+        return first if first.score() >= second.score() else second
+
+    async def create(self, **kwargs) -> Any:
+        """
+        调用 chat.completions.create，端点不可用时自动切换
+
+        Args:
+            **kwargs: 透传给 chat.completions.create 的参数（端点配置了模型时覆盖 model）
+
+        Returns:
+            模型响应（stream=True 时为流对象）
+
+        Raises:
+            Exception: 所有端点都失败时抛出最后一个错误；请求本身错误（如400）直接抛出，
+                端点不支持 response_format 导致的400除外（该端点降级后重试）
+        """
+        tried: Set[ProviderEndpoint] = set()
+        last_error: Optional[Exception] = None
+
+        while True:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                raise last_error
+            tried.add(endpoint)
+
+            params = dict(kwargs)
+            if endpoint.model:
+                params["model"] = endpoint.model
+            response_format = endpoint.adapt_response_format(params)
+
+            start = time.monotonic()
+            endpoint.in_flight += 1
+            try:
+                raw = await endpoint.client.chat.completions.with_raw_response.create(**params)
+                endpoint.record_success(time.monotonic() - start, raw.headers)
+                return raw.parse()
+            except FAILOVER_ERRORS as e:
+                endpoint.record_failure(e)
+                last_error = e
+                if len(tried) < len(self.endpoints):
+                    self._stats["failovers"] += 1
+                    logger.warning(f"🔀 端点 {endpoint.name} 调用失败，切换端点: {type(e).__name__}")
+            except BadRequestError as e:
+                if response_format is None or not endpoint.downgrade_response_format(response_format, e):
+                    raise
+                tried.discard(endpoint)  # 降级后该端点重新参与路由
+            finally:
+                endpoint.in_flight -= 1
+
+    def get_stats(self) -> dict:
+        """
+        获取路由统计
+
+        Returns:
+            切换次数和各端点的健康指标
+        """
+        return {
+            "failovers": self._stats["failovers"],
+            "endpoints": [e.get_stats() for e in self.endpoints],
+        }
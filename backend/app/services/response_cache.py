@@ -0,0 +1,172 @@
+"""
+AI响应缓存
+
+真正的LRU + TTL缓存，按字节预算限制内存：
+1. 访问即刷新最近使用顺序
+2. 每个条目独立过期时间
+3. 总字节数超出预算时淘汰最久未使用的条目
+4. 命中/未命中/淘汰/过期计数
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    LRU + TTL 响应缓存
+
+    值以JSON文本存储：字节数精确可控，且每次读取返回独立副本，
+    调用方修改返回值不会污染缓存。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl: float = 3600,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大字节预算（按UTF-8编码后的JSON计算）
+            ttl: 默认过期时间（秒）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # key -> (JSON文本, 过期时间, 字节数)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "rejected": 0,
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值的副本，未命中或已过期返回None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        payload, expires_at, _ = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 可JSON序列化的值
+            ttl: 过期时间（秒），默认使用缓存的ttl
+
+        Returns:
+            是否写入成功（单条超过字节预算时拒绝）
+        """
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            self._stats["rejected"] += 1
+            return False
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (payload, expires_at, size)
+        self._bytes += size
+        self._evict()
+        return True
+
+    def delete(self, key: str) -> bool:
+        """
+        删除缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            是否存在并被删除
+        """
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def clear(self) -> None:
+        """清空缓存（统计保留）"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[1]
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计
+
+        Returns:
+            条目数、字节数、命中率及各项计数
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            **self._stats,
+        }
+
+    def _remove(self, key: str) -> None:
+        """移除条目并更新字节数"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        """先清理已过期条目，再按LRU淘汰直到满足条目数和字节预算"""
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+
+        now = time.monotonic()
+        for key in [k for k, (_, expires_at, _) in self._entries.items() if now >= expires_at]:
+            self._remove(key)
+            self._stats["expirations"] += 1
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats["evictions"] += 1
@@ -6,17 +6,30 @@
 - 会话恢复
 - 会话状态管理
 - 关键事件记录
+- 当前游戏状态（session_states，随开局和行动事件更新）
 """
 import random
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.game_engine import find_choice
 from app.core.logging import logger
 from app.repositories.session_repo import SessionRepository
 from app.repositories.message_repo import MessageRepository
+from app.repositories.state_repo import SessionStateRepository
+from app.repositories.stats_repo import SessionStatsRepository
 from app.models.database import KeyEvent
+from app.services.wire_format import npc_roster
+
+
+# 产生新回合（更新当前状态）的事件类型
+TURN_EVENT_TYPES = ("game_start", "action_choice")
+
+# 当前状态中保留的最近行动数（build_context_prompt 只展示最近3条）
+RECENT_ACTIONS_KEPT = 3
 
 
 class SessionService:
@@ -32,11 +45,14 @@ class SessionService:
         self.db = db_session
         self.session_repo = SessionRepository(db_session)
         self.message_repo = MessageRepository(db_session)
+        self.stats_repo = SessionStatsRepository(db_session)
+        self.state_repo = SessionStateRepository(db_session)
 
     async def create_game(
         self,
         player_name: str = "玩家",
-        difficulty: str = "normal"
+        difficulty: str = "normal",
+        seed: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         创建新游戏会话
@@ -44,12 +60,14 @@ class SessionService:
         Args:
             player_name: 玩家名称
             difficulty: 难度（easy, normal, hard）
+            seed: 随机种子（使用预热世界时沿用其种子，默认随机生成）
 
         Returns:
-            会话信息
+            会话信息（会话和初始消息已加入当前工作单元，由调用方提交）
         """
         # 生成随机种子（保证同一会话内AI输出一致）
-        seed = random.randint(0, 999999)
+        if seed is None:
+            seed = random.randint(0, 999999)
 
         # 创建会话
         session_id = await self.session_repo.create(
@@ -110,12 +128,15 @@ class SessionService:
 
         Args:
             session_id: 会话ID
-            event_type: 事件类型（action_choice, milestone, game_over）
+            event_type: 事件类型（game_start, action_choice, milestone, game_over）
             event_data: 事件数据
 
         Returns:
-            事件ID
+            事件ID（加入当前工作单元，不单独提交；开局和行动事件同时更新当前游戏状态）
         """
+        if event_type in TURN_EVENT_TYPES:
+            await self._save_current_state(session_id, event_data)
+
         event = KeyEvent(
             id=str(uuid.uuid4()),
             session_id=session_id,
@@ -124,12 +145,136 @@ class SessionService:
         )
 
         self.db.add(event)
-        await self.db.commit()
+        self.stats_repo.increment(session_id, turns=1 if event_type == "action_choice" else 0)
 
         logger.info(f"✅ 记录事件 - Session: {session_id}, Type: {event_type}")
 
         return event.id
 
+    async def get_last_turn(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取最近一个回合的AI内容（开局或最近一次行动）
+
+        后续回合不再携带公司信息，这里补上当前状态中的公司信息（本地生成器据此选择文案）。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            回合内容（包含 player_state、choices、company_info 等），没有记录时返回None
+        """
+        state = await self.state_repo.get(session_id)
+        if state is not None:
+            if state.last_turn and state.company_info and not state.last_turn.get("company_info"):
+                return {**state.last_turn, "company_info": state.company_info}
+            return state.last_turn
+
+        # 当前状态表上线前的会话：从最近的回合事件读取
+        result = await self.db.execute(
+            select(KeyEvent.event_data)
+            .where(
+                KeyEvent.session_id == session_id,
+                KeyEvent.event_type.in_(TURN_EVENT_TYPES)
+            )
+            .order_by(KeyEvent.created_at.desc())
+            .limit(1)
+        )
+        event_data = result.scalar_one_or_none()
+        if not event_data:
+            return None
+        return event_data.get("ai_response")
+
+    async def get_current_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取当前游戏状态（主键查询）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            当前状态（player_state、day、turn、company_info、npcs、magical_element、recent_actions），
+            没有记录时返回None
+        """
+        state = await self.state_repo.get(session_id)
+        if state is None:
+            return None
+
+        return {
+            "player_state": state.player_state,
+            "day": state.day,
+            "turn": state.turn,
+            "company_info": state.company_info,
+            "npcs": state.npcs or [],
+            "magical_element": state.magical_element,
+            "recent_actions": state.recent_actions or [],
+            "updated_at": state.updated_at.isoformat() if state.updated_at else None,
+        }
+
+    async def _save_current_state(self, session_id: str, event_data: Dict[str, Any]) -> None:
+        """
+        用新回合覆盖当前游戏状态（不提交，随关键事件一起提交）
+
+        NPC名册与上一回合合并；公司信息只在开局生成，之后沿用。
+
+        Args:
+            session_id: 会话ID
+            event_data: 开局或行动事件的数据（包含 ai_response，行动事件还有 choice_id）
+        """
+        turn = event_data.get("ai_response") or {}
+        choice_id = event_data.get("choice_id")
+        previous = await self.state_repo.get(session_id)
+
+        company_info = turn.get("company_info")
+        recent_actions = []
+        roster = {}
+        previous_turn = None
+        if previous is not None:
+            company_info = company_info or previous.company_info
+            recent_actions = list(previous.recent_actions or [])
+            roster = {npc["id"]: npc for npc in previous.npcs or [] if npc.get("id")}
+            previous_turn = previous.last_turn
+        elif choice_id:
+            # 当前状态表上线前的会话：从事件中补齐上一回合和公司信息（每个会话只执行一次）
+            previous_turn = await self.get_last_turn(session_id)
+            company_info = company_info or await self._get_start_company_info(session_id)
+        for npc in npc_roster(turn):
+            roster[npc["id"]] = {**roster.get(npc["id"], {}), **npc}
+
+        if choice_id:
+            choice = find_choice(previous_turn, choice_id)
+            recent_actions.append({"choice_id": choice_id, "choice_text": (choice or {}).get("text") or choice_id})
+
+        player_state = turn.get("player_state") or event_data.get("state_snapshot") or {}
+        await self.state_repo.save(
+            session_id,
+            player_state=player_state,
+            day=player_state.get("day", 1),
+            turn=player_state.get("turn", 0),
+            company_info=company_info,
+            npcs=list(roster.values()),
+            magical_element=turn.get("active_magical_element") or turn.get("current_magical_element"),
+            recent_actions=recent_actions[-RECENT_ACTIONS_KEPT:],
+            last_turn=turn,
+        )
+
+    async def _get_start_company_info(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        从开局事件读取公司信息
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            公司信息，没有开局事件时返回None
+        """
+        result = await self.db.execute(
+            select(KeyEvent.event_data)
+            .where(KeyEvent.session_id == session_id, KeyEvent.event_type == "game_start")
+            .limit(1)
+        )
+        event_data = result.scalar_one_or_none()
+        return ((event_data or {}).get("ai_response") or {}).get("company_info")
+
     async def end_session(
         self,
         session_id: str,
@@ -0,0 +1,76 @@
+"""
+请求合并（single-flight）
+
+相同键的并发请求只执行一次：
+1. 第一个到达的请求（leader）启动实际调用
+2. 之后到达的请求（follower）等待同一个结果
+3. 调用失败时异常只产生一次，并传递给所有等待者
+4. 调用结束后立即移除，后续请求重新执行
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from loguru import logger
+
+
+class SingleFlight:
+    """
+    并发请求合并器
+
+    实际调用运行在独立任务中，leader 所在请求被取消时
+    不会连累仍在等待的 follower。
+    """
+
+    def __init__(self):
+        """初始化合并器"""
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "leaders": 0,
+            "coalesced": 0,
+            "failed": 0,
+        }
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入一次调用
+
+        Args:
+            key: 合并键（相同键的并发请求共享结果）
+            factory: 无参协程工厂，只有 leader 会调用
+
+        Returns:
+            调用结果（所有等待者拿到同一个对象）
+
+        Raises:
+            Exception: 调用失败时向所有等待者抛出同一个异常
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            logger.info(f"🔗 合并重复请求 - Key: {key}")
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """调用结束：移除记录并统计失败（异常只记录一次）"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["failed"] += 1
+
+    def get_stats(self) -> dict:
+        """
+        获取合并统计
+
+        Returns:
+            进行中的调用数、leader/合并/失败计数
+        """
+        return {
+            "in_flight": len(self._in_flight),
+            **self._stats,
+        }
@@ -0,0 +1,312 @@
+"""
+投机预生成服务
+
+玩家阅读当前回合时，后台为每个可选项预先生成下一回合：
+1. 全局并发上限（信号量）
+2. 单会话预算（累计预生成次数）
+3. 结果按 session_id → choice_id 缓存
+4. 玩家提交后命中直接返回，其余分支立即取消；选中的分支仍在生成时只短暂等待，
+   超时则取消，由调用方实时生成（享有回合时限和本地降级）
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.game_engine import TurnResolution, resolve_turn
+from app.repositories.database import async_session_maker
+from app.services.ai_service_v2 import AIServiceV2
+from app.services.context_service import ContextService
+from app.services.llm_scheduler import LLMPriority
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """读取后台任务的异常，避免未被取用的分支产生 "exception was never retrieved" 告警"""
+    if not task.cancelled():
+        task.exception()
+
+
+class _SessionSpeculation:
+    """单个会话当前回合的预生成任务"""
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.prepare_task: Optional[asyncio.Task] = None
+
+    def cancel(self) -> int:
+        """取消所有未完成的任务，返回被取消的数量"""
+        cancelled = 0
+        if self.prepare_task and not self.prepare_task.done():
+            self.prepare_task.cancel()
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        self.tasks.clear()
+        return cancelled
+
+
+class SpeculativeTurnService:
+    """
+    投机预生成服务（单例）
+
+    职责：
+    - 为新回合的每个选项调度后台生成
+    - 按 choice_id 提供预生成结果
+    - 丢弃/取消落选分支
+    """
+
+    _instance: Optional['SpeculativeTurnService'] = None
+
+    def __new__(cls):
+        """单例模式：预生成缓存需要跨请求共享"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化服务（单例模式，只会初始化一次）"""
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self.enabled = settings.SPECULATIVE_ENABLED
+        self.session_budget = settings.SPECULATIVE_SESSION_BUDGET
+        self.ttl = settings.SPECULATIVE_TTL
+        self.take_wait = settings.SPECULATIVE_TAKE_WAIT
+        self._semaphore = asyncio.Semaphore(max(1, settings.SPECULATIVE_MAX_CONCURRENCY))
+
+        self._sessions: Dict[str, _SessionSpeculation] = {}
+        # 会话累计预生成次数和最近一次调度时间（长时间无调度的会话被清理）
+        self._spent: Dict[str, int] = {}
+        self._scheduled_at: Dict[str, float] = {}
+
+        self._stats = {
+            "scheduled": 0,
+            "hits": 0,
+            "misses": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "late": 0,
+            "budget_exhausted": 0,
+        }
+
+        self._initialized = True
+
+    # ========================================================================
+    # 调度
+    # ========================================================================
+
+    def schedule(self, session_id: str, turn: dict, seed: int, difficulty: str = "normal") -> None:
+        """
+        为回合的所有选项调度后台预生成（立即返回）
+
+        Args:
+            session_id: 会话ID
+            turn: 本回合内容（包含提供给玩家的选项和玩家状态）
+            seed: 会话随机种子
+            difficulty: 游戏难度（结算选项效果用）
+        """
+        choices = turn.get("choices") or []
+        if not self.enabled or not choices:
+            return
+
+        self._sweep_expired()
+        self.discard(session_id)
+
+        choice_ids = [c.get("id") for c in choices if isinstance(c, dict) and c.get("id")]
+        remaining = self.session_budget - self._spent.get(session_id, 0)
+        if remaining < len(choice_ids):
+            self._stats["budget_exhausted"] += 1
+            choice_ids = choice_ids[:max(0, remaining)]
+        if not choice_ids:
+            return
+
+        self._spent[session_id] = self._spent.get(session_id, 0) + len(choice_ids)
+        self._scheduled_at[session_id] = time.time()
+        entry = _SessionSpeculation()
+        self._sessions[session_id] = entry
+        entry.prepare_task = asyncio.create_task(
+            self._prepare(session_id, entry, turn, choice_ids, seed, difficulty)
+        )
+        entry.prepare_task.add_done_callback(_consume_exception)
+
+    async def _prepare(
+        self,
+        session_id: str,
+        entry: _SessionSpeculation,
+        turn: dict,
+        choice_ids: List[str],
+        seed: int,
+        difficulty: str
+    ) -> None:
+        """加载上下文并为每个选项启动生成任务"""
+        ai_service = AIServiceV2()
+        async with async_session_maker() as db:
+            context = await ContextService(db, ai_service).get_context_for_ai(session_id)
+
+        for choice_id in choice_ids:
+            # /act 会先写入玩家行动消息再取上下文，这里保持相同的上下文形状
+            branch_context = context + [{"role": "user", "content": choice_id}]
+            # 与 /act 相同的确定性结算，取用时状态一致
+            resolution = resolve_turn(turn, choice_id, seed, difficulty)
+            task = asyncio.create_task(
+                self._generate(ai_service, branch_context, turn, choice_id, seed, resolution)
+            )
+            task.add_done_callback(_consume_exception)
+            entry.tasks[choice_id] = task
+            self._stats["scheduled"] += 1
+
+        logger.info(f"🔮 已调度预生成 - Session: {session_id}, Choices: {len(choice_ids)}")
+
+    async def _generate(
+        self,
+        ai_service: AIServiceV2,
+        context: List[dict],
+        turn: dict,
+        choice_id: str,
+        seed: int,
+        resolution: Optional[TurnResolution]
+    ) -> dict:
+        """在并发上限内生成一个分支"""
+        async with self._semaphore:
+            return await ai_service.generate_next_turn(
+                context=context,
+                user_action=choice_id,
+                seed=seed,
+                priority=LLMPriority.SPECULATIVE,
+                resolution=resolution,
+                previous_turn=turn
+            )
+
+    # ========================================================================
+    # 取用
+    # ========================================================================
+
+    async def take(self, session_id: str, choice_id: str, wait: Optional[float] = None) -> Optional[dict]:
+        """
+        取出预生成结果，并取消同回合的其他分支
+
+        分支（或其上下文加载）仍在进行时最多等待 wait 秒：分支以最低优先级排队，
+        无限等待会绕过回合时限和本地降级。超时的分支被取消，按未命中处理。
+
+        Args:
+            session_id: 会话ID
+            choice_id: 玩家选择的选项ID
+            wait: 最多等待的秒数（默认 SPECULATIVE_TAKE_WAIT）
+
+        Returns:
+            预生成的回合内容，未命中返回None
+        """
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return None
+
+        if time.time() - entry.created_at > self.ttl:
+            self._stats["cancelled"] += entry.cancel()
+            self._stats["misses"] += 1
+            return None
+
+        deadline = time.monotonic() + (self.take_wait if wait is None else wait)
+        task = None
+        try:
+            # 上下文仍在加载时等它完成，否则拿不到分支任务
+            prepare_task = entry.prepare_task
+            if prepare_task and not prepare_task.done():
+                await asyncio.wait({prepare_task}, timeout=max(0.0, deadline - time.monotonic()))
+                if prepare_task.done() and not prepare_task.cancelled() and prepare_task.exception():
+                    logger.warning(f"⚠️ 预生成准备失败 - Session: {session_id}: {prepare_task.exception()}")
+
+            task = entry.tasks.pop(choice_id, None)
+            self._stats["cancelled"] += entry.cancel()
+            if task is None:
+                self._stats["misses"] += 1
+                return None
+
+            if not task.done():
+                await asyncio.wait({task}, timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            entry.cancel()
+            if task is not None:
+                task.cancel()
+            raise
+
+        if not task.done():
+            task.cancel()
+            self._stats["cancelled"] += 1
+            self._stats["late"] += 1
+            self._stats["misses"] += 1
+            logger.info(f"🔮 预生成分支未及时完成，改为实时生成 - Session: {session_id}, Choice: {choice_id}")
+            return None
+
+        try:
+            result = task.result()
+        except asyncio.CancelledError:
+            self._stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ 预生成分支失败，改为实时生成 - Session: {session_id}: {e}")
+            self._stats["failed"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        self._stats["hits"] += 1
+        logger.info(f"🔮 命中预生成 - Session: {session_id}, Choice: {choice_id}")
+        return result
+
+    def discard(self, session_id: str) -> None:
+        """
+        丢弃会话的所有预生成分支
+
+        Args:
+            session_id: 会话ID
+        """
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._stats["cancelled"] += entry.cancel()
+
+    def end_session(self, session_id: str) -> None:
+        """
+        会话结束时释放其预生成分支和预算记录
+
+        Args:
+            session_id: 会话ID
+        """
+        self.discard(session_id)
+        self._spent.pop(session_id, None)
+        self._scheduled_at.pop(session_id, None)
+
+    def _sweep_expired(self) -> None:
+        """清理过期会话及长时间无调度的预算记录，避免被放弃的游戏长期占用内存"""
+        now = time.time()
+        expired = [
+            session_id for session_id, entry in self._sessions.items()
+            if now - entry.created_at > self.ttl
+        ]
+        for session_id in expired:
+            self.discard(session_id)
+
+        idle = [
+            session_id for session_id, scheduled_at in self._scheduled_at.items()
+            if now - scheduled_at > self.ttl and session_id not in self._sessions
+        ]
+        for session_id in idle:
+            self._spent.pop(session_id, None)
+            del self._scheduled_at[session_id]
+
+    def get_stats(self) -> dict:
+        """
+        获取预生成统计
+
+        Returns:
+            命中/未命中/取消等计数
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "active_sessions": len(self._sessions),
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            **self._stats,
+        }
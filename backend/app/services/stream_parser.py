@@ -0,0 +1,407 @@
+"""
+流式回合解析器
+
+边接收AI补全的chunk边解析JSON，字段一旦完整立即产出：
+1. story_context 逐字产出增量文本
+2. choices 中的每个选项完整后立即产出
+3. 其他顶层字段（player_state 等）闭合后立即产出
+
+只做一次线性扫描，不依赖正则清洗；无法解析时由调用方回退到
+AIServiceV2._parse_ai_response（json_repair 容错修复）。
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Literal, Optional
+
+
+# 修复数字前的加号（如: "progress": +30），仅用于单个字段解析失败时重试
+_PLUS_NUMBER_PATTERN = re.compile(r'(^|[:\[,])(\s*)\+(\d)')
+
+
+@dataclass(frozen=True)
+class TurnStreamEvent:
+    """
+    流式解析产出的事件
+
+    kind:
+    - story: 剧情增量文本（value 为新增的字符串片段）
+    - choice: 一个完整的选项（value 为选项字典，index 为序号）
+    - field: 一个完整的顶层字段（key 为字段名，value 为解析后的值）
+    """
+    kind: Literal["story", "choice", "field"]
+    key: str
+    value: Any
+    index: Optional[int] = None
+
+
+class TurnStreamParser:
+    """
+    增量JSON解析器（面向AI回合响应）
+
+    用法：
+        parser = TurnStreamParser()
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                ...
+        result = parser.result()
+    """
+
+    def __init__(
+        self,
+        story_key: str = "story_context",
+        item_keys: Iterable[str] = ("choices",),
+    ):
+        """
+        初始化解析器
+
+        Args:
+            story_key: 需要逐字产出的剧情字段名
+            item_keys: 需要逐个元素产出的数组字段名
+        """
+        self.story_key = story_key
+        self.item_keys = set(item_keys)
+
+        self._buf = ""
+        self._pos = 0
+        self._fields: dict = {}
+
+        # 扫描状态
+        self._started = False
+        self._done = False
+        self._failed = False
+        self._stack: List[str] = []
+        self._expect = "key"  # 根对象内的期望：key / colon / value / scalar / comma
+
+        # 字符串状态
+        self._in_string = False
+        self._escape = ""
+        self._string_start = 0
+
+        # 当前顶层字段
+        self._key: Optional[str] = None
+        self._value_start = 0
+
+        # 数组元素状态（item_keys 字段内）
+        self._item_start: Optional[int] = None
+        self._item_scalar = False
+        self._item_index = 0
+
+        # 剧情流式解码状态
+        self._story_streaming = False
+        self._pending_surrogate = ""
+
+    @property
+    def is_complete(self) -> bool:
+        """根对象是否已完整闭合且全部字段解析成功"""
+        return self._done and not self._failed
+
+    @property
+    def failed(self) -> bool:
+        """是否遇到无法增量解析的内容"""
+        return self._failed
+
+    def feed(self, chunk: str) -> List[TurnStreamEvent]:
+        """
+        输入一个新chunk
+
+        Args:
+            chunk: AI补全的增量文本
+
+        Returns:
+            本次新产生的事件列表
+        """
+        if self._failed or self._done:
+            self._buf += chunk
+            return []
+
+        self._buf += chunk
+        events: List[TurnStreamEvent] = []
+        story_delta: List[str] = []
+
+        buf = self._buf
+        i = self._pos
+        end = len(buf)
+        while i < end and not self._done and not self._failed:
+            ch = buf[i]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append("{")
+                i += 1
+                continue
+
+            if self._in_string:
+                self._scan_string_char(ch, i, events, story_delta)
+                i += 1
+                continue
+
+            self._scan_structural_char(ch, i, events, story_delta)
+            i += 1
+
+        self._pos = i
+        if story_delta:
+            # 剧情增量放在同批次其他事件之前，保证客户端先看到文字
+            events.insert(0, TurnStreamEvent(kind="story", key=self.story_key, value="".join(story_delta)))
+        return events
+
+    def result(self) -> dict:
+        """
+        获取完整解析结果
+
+        Returns:
+            顶层字段字典
+
+        Raises:
+            ValueError: 响应尚未完整或解析失败
+        """
+        if not self.is_complete:
+            raise ValueError("AI响应不完整或无法流式解析")
+        return dict(self._fields)
+
+    # ========================================================================
+    # 扫描
+    # ========================================================================
+
+    def _scan_string_char(
+        self,
+        ch: str,
+        i: int,
+        events: List[TurnStreamEvent],
+        story_delta: List[str],
+    ) -> None:
+        """处理字符串内部的字符"""
+        if self._escape:
+            self._escape += ch
+            if self._escape_complete():
+                if self._story_streaming:
+                    story_delta.append(self._decode_escape(self._escape))
+                self._escape = ""
+            return
+
+        if ch == "\\":
+            self._escape = ch
+            return
+
+        if ch != '"':
+            if self._story_streaming:
+                # 孤立的高位代理无法编码，直接丢弃
+                self._pending_surrogate = ""
+                story_delta.append(ch)
+            return
+
+        # 字符串结束
+        self._in_string = False
+        depth = len(self._stack)
+        if depth == 1:
+            if self._expect == "key":
+                self._key = self._buf[self._string_start + 1:i]
+                self._expect = "colon"
+            elif self._expect == "value":
+                self._story_streaming = False
+                self._finish_value(i + 1, events)
+        elif depth == 2 and self._in_item_array() and self._item_start is not None and not self._item_scalar:
+            if self._item_start == self._string_start:
+                self._finish_item(i + 1, events)
+
+    def _scan_structural_char(
+        self,
+        ch: str,
+        i: int,
+        events: List[TurnStreamEvent],
+        story_delta: List[str],
+    ) -> None:
+        """处理字符串外部的字符"""
+        depth = len(self._stack)
+
+        # 根对象内：键、冒号、值、逗号
+        if depth == 1:
+            if self._expect == "scalar":
+                if ch in ",}":
+                    self._finish_value(i, events)
+                    self._after_value(ch)
+                return
+            if ch.isspace():
+                return
+            if self._expect == "key":
+                if ch == '"':
+                    self._in_string = True
+                    self._string_start = i
+                elif ch == "}":
+                    self._stack.pop()
+                    self._done = True
+                elif ch != ",":
+                    self._failed = True
+                return
+            if self._expect == "colon":
+                if ch == ":":
+                    self._expect = "value"
+                else:
+                    self._failed = True
+                return
+            if self._expect == "value":
+                self._value_start = i
+                if ch == '"':
+                    self._in_string = True
+                    self._string_start = i
+                    self._story_streaming = self._key == self.story_key
+                elif ch in "{[":
+                    self._stack.append(ch)
+                    self._item_start = None
+                    self._item_index = 0
+                else:
+                    self._expect = "scalar"
+                return
+            if self._expect == "comma":
+                self._after_value(ch)
+            return
+
+        # 嵌套结构内
+        if self._in_item_array() and depth == 2:
+            if self._item_start is None:
+                if ch.isspace() or ch == ",":
+                    return
+                if ch == "]":
+                    self._close_container(ch, i, events)
+                    return
+                self._item_start = i
+                self._item_scalar = ch not in '{["'
+                if self._item_scalar:
+                    return
+            elif self._item_scalar:
+                if ch in ",]":
+                    self._finish_item(i, events)
+                    if ch == "]":
+                        self._close_container(ch, i, events)
+                return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = i
+        elif ch in "{[":
+            self._stack.append(ch)
+        elif ch in "}]":
+            self._close_container(ch, i, events)
+
+    def _close_container(self, ch: str, i: int, events: List[TurnStreamEvent]) -> None:
+        """闭合一个对象或数组"""
+        opener = self._stack.pop() if self._stack else ""
+        if (opener, ch) not in (("{", "}"), ("[", "]")):
+            self._failed = True
+            return
+
+        depth = len(self._stack)
+        if depth == 2 and self._in_item_array() and self._item_start is not None:
+            self._finish_item(i + 1, events)
+        elif depth == 1:
+            self._finish_value(i + 1, events)
+
+    def _after_value(self, ch: str) -> None:
+        """根对象中一个值结束后的分隔符"""
+        if ch == ",":
+            self._expect = "key"
+        elif ch == "}":
+            self._stack.pop()
+            self._done = True
+        elif not ch.isspace():
+            self._failed = True
+
+    def _in_item_array(self) -> bool:
+        """当前是否位于需要逐元素产出的数组内"""
+        return (
+            len(self._stack) >= 2
+            and self._stack[1] == "["
+            and self._key in self.item_keys
+        )
+
+    # ========================================================================
+    # 产出
+    # ========================================================================
+
+    def _finish_value(self, end: int, events: List[TurnStreamEvent]) -> None:
+        """一个顶层字段完整"""
+        raw = self._buf[self._value_start:end].strip()
+        try:
+            value = self._loads(raw)
+        except ValueError:
+            self._failed = True
+            return
+
+        self._fields[self._key] = value
+        events.append(TurnStreamEvent(kind="field", key=self._key, value=value))
+        self._expect = "comma"
+
+    def _finish_item(self, end: int, events: List[TurnStreamEvent]) -> None:
+        """数组字段中的一个元素完整"""
+        raw = self._buf[self._item_start:end].strip()
+        self._item_start = None
+        self._item_scalar = False
+        try:
+            value = self._loads(raw)
+        except ValueError:
+            self._failed = True
+            return
+
+        events.append(TurnStreamEvent(kind="choice", key=self._key, value=value, index=self._item_index))
+        self._item_index += 1
+
+    @staticmethod
+    def _loads(raw: str) -> Any:
+        """解析单个字段的JSON文本（容忍数字前的加号）"""
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(_PLUS_NUMBER_PATTERN.sub(r"\1\2\3", raw))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"字段解析失败: {e}") from e
+
+    # ========================================================================
+    # 剧情转义解码
+    # ========================================================================
+
+    def _escape_complete(self) -> bool:
+        """当前转义序列是否已完整（\\n 为2字符，\\uXXXX 为6字符）"""
+        if len(self._escape) < 2:
+            return False
+        if self._escape[1] == "u":
+            return len(self._escape) == 6
+        return True
+
+    def _decode_escape(self, escape: str) -> str:
+        """解码一个完整的转义序列（处理代理对）"""
+        try:
+            char = json.loads(f'"{escape}"')
+        except json.JSONDecodeError:
+            return ""
+
+        if "\ud800" <= char <= "\udbff":
+            # 高位代理，等待低位代理
+            self._pending_surrogate = char
+            return ""
+        if "\udc00" <= char <= "\udfff" and self._pending_surrogate:
+            pair = self._pending_surrogate + char
+            self._pending_surrogate = ""
+            return pair.encode("utf-16", "surrogatepass").decode("utf-16")
+        return char
+
+
+def parse_turn_payload(content: str, story_key: str = "story_context") -> dict:
+    """
+    一次性解析完整的AI回合响应（单次扫描，无正则清洗）
+
+    Args:
+        content: AI返回的完整内容
+        story_key: 剧情字段名
+
+    Returns:
+        解析后的字典
+
+    Raises:
+        ValueError: 内容无法解析
+    """
+    parser = TurnStreamParser(story_key=story_key)
+    parser.feed(content)
+    return parser.result()
@@ -0,0 +1,113 @@
+"""
+结构化输出约束
+
+把回合响应的结构（由 Pydantic 模型生成的 JSON Schema）作为 response_format
+发给模型，减少格式错误导致的重新生成和降级：
+1. json_schema: 按 Schema 约束输出
+2. json_object: 只保证输出合法JSON
+3. off: 不约束（靠提示词和解析器）
+
+供应商不支持时由 ProviderRouter 按端点逐级降级（见 ProviderEndpoint.downgrade_response_format）。
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.api.schemas import (
+    AIChoice,
+    CompanyProfile,
+    GameMeta,
+    MagicalElement,
+    NPCProfile,
+    NPCReaction,
+    PlayerState,
+    TriggeredEvent,
+)
+
+
+# 约束级别（从强到弱）
+RESPONSE_FORMAT_LEVELS = ("json_schema", "json_object", "off")
+
+
+class InitialTurnOutput(BaseModel):
+    """AI生成的初始回合"""
+    game_meta: GameMeta
+    company_info: CompanyProfile
+    npcs: List[NPCProfile] = Field(..., description="NPC详细档案列表")
+    player_state: PlayerState
+    story_context: str = Field(..., description="开场剧情")
+    choices: List[AIChoice] = Field(..., description="3-6个初始选项")
+    current_magical_element: Optional[MagicalElement] = None
+
+
+class NextTurnOutput(BaseModel):
+    """AI生成的后续回合（玩家状态由服务端结算）"""
+    story_context: str = Field(..., description="本回合剧情")
+    choices: List[AIChoice] = Field(..., description="3-6个新选项")
+    updated_npcs: List[NPCProfile] = Field(default_factory=list, description="本回合有变化的NPC")
+    npc_reactions: Optional[NPCReaction] = None
+    triggered_events: List[TriggeredEvent] = Field(default_factory=list)
+    active_magical_element: Optional[MagicalElement] = None
+    flavor_texts: List[str] = Field(default_factory=list)
+
+
+# 紧凑回合格式（字段含义见 app/services/wire_format.py）
+COMPACT_TURN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "s": {"type": "string", "description": "剧情"},
+        "c": {
+            "type": "array",
+            "description": "选项：[id, 文本, 类别, [精力, 摸鱼值, 工作进度, 怀疑度, 人脉, 黑料]]",
+            "items": {"type": "array"},
+        },
+        "n": {
+            "type": "array",
+            "description": "有变化的NPC：{i: id, a: 好感度变化, 其余只写变化的字段}",
+            "items": {"type": "object", "properties": {"i": {"type": "string"}}, "required": ["i"]},
+        },
+        "r": {
+            "type": "object",
+            "properties": {"b": {"type": "string"}, "c": {"type": "string"}, "x": {"type": "object"}},
+        },
+        "e": {"type": "array", "items": {"type": "array", "items": {"type": "string"}}},
+        "m": {"type": "array", "items": {"type": "string"}},
+        "f": {"type": "array", "items": {"type": "string"}},
+        "d": {"type": "object", "additionalProperties": {"type": "integer"}},
+    },
+    "required": ["s", "c"],
+}
+
+
+@lru_cache(maxsize=None)
+def _schema(kind: str) -> Dict[str, Any]:
+    """各类响应的 JSON Schema（只生成一次）"""
+    if kind == "initial_turn":
+        return InitialTurnOutput.model_json_schema()
+    if kind == "next_turn":
+        return NextTurnOutput.model_json_schema()
+    if kind == "next_turn_compact":
+        return COMPACT_TURN_SCHEMA
+    raise ValueError(f"未知的响应类型: {kind}")
+
+
+def build_response_format(kind: str, mode: str) -> Optional[Dict[str, Any]]:
+    """
+    构建 chat.completions.create 的 response_format 参数
+
+    Args:
+        kind: 响应类型（initial_turn / next_turn / next_turn_compact）
+        mode: 约束级别（json_schema / json_object / off）
+
+    Returns:
+        response_format 字典；off 时返回None（调用方不传该参数）
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": kind, "schema": _schema(kind), "strict": False},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
@@ -0,0 +1,238 @@
+"""
+回合紧凑传输格式
+
+后续回合的补全按解码速度逐token输出，冗长的字段名、完整的玩家状态和NPC档案
+都是等待时间。紧凑格式：
+1. 顶层字段使用短代码（s=剧情，c=选项，n=NPC更新 ...）
+2. 选项为数组 [id, 文本, 类别, [六项效果增量]]
+3. NPC只按 id（上下文的NPC名册中给出）返回变化的字段，好感度为增量
+4. 玩家状态由服务端结算；无法结算时只返回属性增量 d
+
+expand_turn 把紧凑格式还原为原有的回合结构（ChoiceSubmitResponse 所需字段）。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.constants import CORE_STATS, INITIAL_PLAYER_STATE
+from app.core.game_engine import GameEngine
+
+
+# 选项效果数组的属性顺序
+EFFECT_ORDER = CORE_STATS
+
+# 属性增量 d 的短代码
+STAT_CODES: Dict[str, str] = {
+    "e": "energy",
+    "ch": "chill",
+    "p": "progress",
+    "su": "suspicion",
+    "co": "connection",
+    "b": "blackmail",
+}
+
+# NPC更新的短代码（a 为好感度增量，其余为替换后的值）
+NPC_FIELD_CODES: Dict[str, str] = {
+    "nm": "name",
+    "r": "role",
+    "p": "personality",
+    "bg": "background",
+    "ap": "appearance",
+    "rel": "relationships",
+    "sec": "secrets",
+}
+
+EVENT_TYPES = {"positive", "negative", "neutral", "magical", "threshold", "chain", "time", "random"}
+MAGICAL_TYPES = {"object", "phenomenon", "ability"}
+
+
+def is_compact(payload: dict) -> bool:
+    """判断AI响应是否为紧凑格式（模型没遵守格式时按原结构处理）"""
+    return "s" in payload and "story_context" not in payload
+
+
+def expand_choice(item: Any) -> Optional[dict]:
+    """
+    还原一个紧凑选项
+
+    Args:
+        item: [id, 文本, 类别, [效果]]，也接受原结构的选项字典
+
+    Returns:
+        选项字典，格式无法识别时返回None
+    """
+    if isinstance(item, dict):
+        return item if item.get("id") and item.get("text") else None
+    if not isinstance(item, list) or len(item) < 2:
+        return None
+
+    choice = {"id": str(item[0]), "text": str(item[1])[:100], "effects": {}}
+    if len(item) > 2 and isinstance(item[2], str):
+        choice["category"] = item[2]
+    if len(item) > 3 and isinstance(item[3], list):
+        for stat, value in zip(EFFECT_ORDER, item[3]):
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+                choice["effects"][stat] = int(round(value))
+    return choice
+
+
+def expand_turn(
+    payload: dict,
+    previous_turn: Optional[dict] = None,
+    seed: Optional[int] = None,
+    difficulty: str = "normal"
+) -> dict:
+    """
+    把紧凑格式的回合还原为原有结构
+
+    Args:
+        payload: 解析后的AI响应（非紧凑格式时原样返回）
+        previous_turn: 上一回合内容（提供NPC名册和状态基准）
+        seed: 会话随机种子（按增量 d 结算状态时使用）
+        difficulty: 难度
+
+    Returns:
+        回合内容（story_context、choices、npcs、updated_npcs、npc_reactions 等）
+    """
+    previous_turn = previous_turn or {}
+    if not is_compact(payload):
+        # 原结构同样带上NPC名册，后续紧凑回合才能按 id 更新
+        if "npcs" not in payload:
+            roster = npc_roster({"npcs": npc_roster(previous_turn), "updated_npcs": payload.get("updated_npcs")})
+            if roster:
+                payload["npcs"] = roster
+        return payload
+
+    result: Dict[str, Any] = {
+        "story_context": str(payload.get("s") or ""),
+        "choices": [c for c in map(expand_choice, payload.get("c") or []) if c],
+        "flavor_texts": [str(f) for f in payload.get("f") or []],
+    }
+
+    roster, updated = _merge_npcs(npc_roster(previous_turn), payload.get("n") or [])
+    if roster:
+        result["npcs"] = roster
+    result["updated_npcs"] = updated
+
+    reactions = payload.get("r")
+    if isinstance(reactions, dict):
+        result["npc_reactions"] = {
+            "boss": reactions.get("b"),
+            "colleagues": reactions.get("c"),
+            "specific_npcs": {str(k): str(v) for k, v in (reactions.get("x") or {}).items()},
+        }
+
+    result["triggered_events"] = [
+        {"type": event[0] if event[0] in EVENT_TYPES else "neutral", "message": str(event[1]), "effects": {}}
+        for event in payload.get("e") or []
+        if isinstance(event, list) and len(event) >= 2
+    ]
+
+    element = payload.get("m")
+    if isinstance(element, list) and len(element) >= 4 and element[0] in MAGICAL_TYPES:
+        result["active_magical_element"] = dict(zip(("type", "name", "description", "effect"), map(str, element)))
+
+    deltas = payload.get("d")
+    if isinstance(deltas, dict):
+        _apply_deltas(result, deltas, previous_turn, seed, difficulty)
+    return result
+
+
+def compact_turn(turn: dict) -> dict:
+    """
+    把原结构的回合编码为紧凑格式（基准测试和提示词示例用）
+
+    Args:
+        turn: 原结构的回合内容
+
+    Returns:
+        紧凑格式字典
+    """
+    compact: Dict[str, Any] = {
+        "s": turn.get("story_context", ""),
+        "c": [
+            [c["id"], c["text"], c.get("category", ""), [c.get("effects", {}).get(stat, 0) for stat in EFFECT_ORDER]]
+            for c in turn.get("choices", [])
+        ],
+    }
+    reactions = turn.get("npc_reactions")
+    if reactions:
+        compact["r"] = {"b": reactions.get("boss"), "c": reactions.get("colleagues")}
+        if reactions.get("specific_npcs"):
+            compact["r"]["x"] = reactions["specific_npcs"]
+    if turn.get("triggered_events"):
+        compact["e"] = [[e.get("type", "neutral"), e.get("message", "")] for e in turn["triggered_events"]]
+    element = turn.get("active_magical_element")
+    if element:
+        compact["m"] = [element["type"], element["name"], element["description"], element["effect"]]
+    if turn.get("flavor_texts"):
+        compact["f"] = turn["flavor_texts"]
+    return compact
+
+
+def npc_roster(turn: Optional[dict]) -> List[dict]:
+    """
+    回合结束时的完整NPC名册
+
+    Args:
+        turn: 回合内容
+
+    Returns:
+        NPC档案列表（npcs 合并本回合 updated_npcs）
+    """
+    turn = turn or {}
+    roster = {npc["id"]: npc for npc in turn.get("npcs") or [] if isinstance(npc, dict) and npc.get("id")}
+    for npc in turn.get("updated_npcs") or []:
+        if isinstance(npc, dict) and npc.get("id"):
+            roster[npc["id"]] = {**roster.get(npc["id"], {}), **npc}
+    return list(roster.values())
+
+
+def _merge_npcs(roster: List[dict], updates: List[Any]) -> Tuple[List[dict], List[dict]]:
+    """按 id 合并NPC更新（模型用姓名代替 id 时按姓名匹配），返回 (新名册, 完整的已更新档案列表)"""
+    by_id = {npc["id"]: dict(npc) for npc in roster}
+    by_name = {npc["name"]: npc["id"] for npc in roster if npc.get("name")}
+    updated_ids: List[str] = []
+
+    for update in updates:
+        if not isinstance(update, dict) or not update.get("i"):
+            continue
+        npc_id = str(update["i"])
+        if npc_id not in by_id:
+            npc_id = by_name.get(npc_id) or by_name.get(update.get("nm")) or npc_id
+        npc = by_id.get(npc_id)
+        if npc is None:
+            # 新登场的NPC必须给出完整的必填字段
+            if not all(update.get(code) for code in ("nm", "r", "p")):
+                continue
+            npc = {"id": npc_id, "attitude_toward_player": 50}
+
+        for code, field in NPC_FIELD_CODES.items():
+            if code in update:
+                npc[field] = update[code]
+        attitude = update.get("a")
+        if isinstance(attitude, (int, float)) and not isinstance(attitude, bool):
+            current = npc.get("attitude_toward_player", 50)
+            npc["attitude_toward_player"] = int(max(0, min(100, current + attitude)))
+
+        by_id[npc_id] = npc
+        if npc_id not in updated_ids:
+            updated_ids.append(npc_id)
+
+    return list(by_id.values()), [by_id[npc_id] for npc_id in updated_ids]
+
+
+def _apply_deltas(
+    result: dict,
+    deltas: dict,
+    previous_turn: dict,
+    seed: Optional[int],
+    difficulty: str
+) -> None:
+    """服务端无法结算选项时，按AI给出的属性增量结算状态"""
+    effects = {
+        STAT_CODES[code]: value
+        for code, value in deltas.items()
+        if code in STAT_CODES and isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    state = previous_turn.get("player_state") or dict(INITIAL_PLAYER_STATE)
+    engine = GameEngine(seed=f"{seed}:{state.get('day', 1)}:{state.get('turn', 0)}:deltas")
+    engine.resolve(state, {"effects": effects}, difficulty).apply(result)
@@ -0,0 +1,258 @@
+"""
+初始世界预热池
+
+后台预先生成并验证初始世界，/start 时直接取用：
+1. 按难度分池，每池保持固定深度
+2. 玩家姓名以占位符生成，取用时再绑定
+3. 取用后触发补充，补充并发受限
+4. 超过最大保留时间的世界直接丢弃
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.ai_service_v2 import AIServiceV2
+from app.services.llm_scheduler import LLMPriority
+
+
+# 预生成时使用的玩家姓名占位符
+PLAYER_NAME_PLACEHOLDER = "{{PLAYER_NAME}}"
+
+# 支持的难度（与 GameStartRequest.difficulty 一致）
+DIFFICULTIES: Tuple[str, ...] = ("normal", "easy", "hard")
+
+
+def bind_player_name(value: Any, player_name: str) -> Any:
+    """
+    递归地把占位符替换为真实玩家姓名
+
+    Args:
+        value: 世界内容（dict/list/str）
+        player_name: 玩家姓名
+
+    Returns:
+        替换后的内容
+    """
+    if isinstance(value, str):
+        return value.replace(PLAYER_NAME_PLACEHOLDER, player_name)
+    if isinstance(value, dict):
+        return {k: bind_player_name(v, player_name) for k, v in value.items()}
+    if isinstance(value, list):
+        return [bind_player_name(v, player_name) for v in value]
+    return value
+
+
+class InitialWorldPool:
+    """
+    初始世界预热池（单例）
+
+    职责：
+    - 后台生产者补充各难度的世界
+    - 为 /start 提供已验证的世界
+    - 统计池深度和命中率
+    """
+
+    _instance: Optional['InitialWorldPool'] = None
+
+    def __new__(cls):
+        """单例模式：池需要跨请求共享"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化世界池（单例模式，只会初始化一次）"""
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self.enabled = settings.WORLD_POOL_ENABLED
+        self.size = max(0, settings.WORLD_POOL_SIZE)
+        self.refill_concurrency = max(1, settings.WORLD_POOL_REFILL_CONCURRENCY)
+        self.max_age = settings.WORLD_POOL_MAX_AGE
+
+        # 每个元素：(生成时间, 种子, 世界内容)
+        self._pools: Dict[str, Deque[Tuple[float, int, dict]]] = {
+            difficulty: deque() for difficulty in DIFFICULTIES
+        }
+        self._pending: Dict[str, int] = {difficulty: 0 for difficulty in DIFFICULTIES}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._producer: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+        # 独立随机源：AI调用会用会话种子重置全局 random
+        self._rng = random.Random()
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "generated": 0,
+            "failed": 0,
+            "stale_discarded": 0,
+        }
+
+        self._initialized = True
+
+    # ========================================================================
+    # 生命周期
+    # ========================================================================
+
+    def start(self) -> None:
+        """启动后台生产者（未启用时不做任何事）"""
+        if not self.enabled or self.size == 0 or self._producer is not None:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._producer = asyncio.create_task(self._produce_forever())
+        logger.info(f"🌍 初始世界池启动 - 每个难度 {self.size} 个, 并发 {self.refill_concurrency}")
+
+    async def stop(self) -> None:
+        """停止后台生产者"""
+        if self._producer is None:
+            return
+
+        self._producer.cancel()
+        for task in list(self._in_flight):
+            task.cancel()
+        await asyncio.gather(self._producer, *self._in_flight, return_exceptions=True)
+        self._producer = None
+        logger.info("🌍 初始世界池已停止")
+
+    # ========================================================================
+    # 取用
+    # ========================================================================
+
+    def take(self, difficulty: str, player_name: str) -> Optional[Tuple[int, dict]]:
+        """
+        取出一个预生成世界并绑定玩家姓名
+
+        Args:
+            difficulty: 难度
+            player_name: 玩家姓名
+
+        Returns:
+            (种子, 世界内容)，池为空时返回None
+        """
+        if not self.enabled or difficulty not in self._pools:
+            return None
+
+        pool = self._pools[difficulty]
+        now = time.time()
+        entry = None
+        while pool:
+            created_at, seed, world = pool.popleft()
+            if now - created_at <= self.max_age:
+                entry = (seed, world)
+                break
+            self._stats["stale_discarded"] += 1
+
+        self._request_refill()
+
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        seed, world = entry
+        world = bind_player_name(world, player_name)
+        if isinstance(world.get("game_meta"), dict):
+            world["game_meta"]["seed_used"] = seed
+
+        self._stats["hits"] += 1
+        logger.info(f"🌍 命中预热世界 - Difficulty: {difficulty}, Seed: {seed}")
+        return seed, world
+
+    # ========================================================================
+    # 生产
+    # ========================================================================
+
+    def _request_refill(self) -> None:
+        """唤醒生产者"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _deficits(self) -> Dict[str, int]:
+        """各难度距离目标深度还差多少（含生成中的）"""
+        now = time.time()
+        deficits = {}
+        for difficulty, pool in self._pools.items():
+            # 顺带清理过期世界
+            while pool and now - pool[0][0] > self.max_age:
+                pool.popleft()
+                self._stats["stale_discarded"] += 1
+            deficits[difficulty] = self.size - len(pool) - self._pending[difficulty]
+        return deficits
+
+    async def _produce_forever(self) -> None:
+        """生产者主循环：补满各池，然后等待取用唤醒"""
+        semaphore = asyncio.Semaphore(self.refill_concurrency)
+        in_flight = self._in_flight
+        failures = 0
+
+        while True:
+            self._wakeup.clear()
+            for difficulty, deficit in self._deficits().items():
+                for _ in range(max(0, deficit)):
+                    self._pending[difficulty] += 1
+                    task = asyncio.create_task(self._produce_one(difficulty, semaphore))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+            # 等待任一生成完成或被取用唤醒，并定期检查过期
+            waiter = asyncio.create_task(self._wakeup.wait())
+            try:
+                done, _ = await asyncio.wait(
+                    in_flight | {waiter},
+                    timeout=max(1, self.max_age / 2),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                waiter.cancel()
+
+            finished = [t for t in done if t is not waiter and not t.cancelled()]
+            if any(t.result() is False for t in finished):
+                # 连续失败时退避，避免供应商故障期间空转
+                failures += 1
+                await asyncio.sleep(min(60, 2 ** failures))
+            elif finished:
+                failures = 0
+
+    async def _produce_one(self, difficulty: str, semaphore: asyncio.Semaphore) -> bool:
+        """生成一个世界并放入池中，返回是否成功"""
+        try:
+            async with semaphore:
+                seed = self._rng.randint(0, 999999)
+                world = await AIServiceV2().request_initial_turn(
+                    player_name=PLAYER_NAME_PLACEHOLDER,
+                    difficulty=difficulty,
+                    seed=seed,
+                    priority=LLMPriority.SPECULATIVE
+                )
+            self._pools[difficulty].append((time.time(), seed, world))
+            self._stats["generated"] += 1
+            return True
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning(f"⚠️ 预热世界生成失败 - Difficulty: {difficulty}: {e}")
+            return False
+        finally:
+            self._pending[difficulty] -= 1
+
+    def get_stats(self) -> dict:
+        """
+        获取世界池统计
+
+        Returns:
+            各难度池深度、命中率等指标
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "target_size": self.size,
+            "depth": {difficulty: len(pool) for difficulty, pool in self._pools.items()},
+            "pending": dict(self._pending),
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            **self._stats,
+        }
@@ -2,8 +2,11 @@
 Pytest 配置和共享 fixture
 """
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
 from app.api.schemas import PlayerState
 from app.core.constants import INITIAL_PLAYER_STATE
+from app.models.database import Base
 
 
 @pytest.fixture
@@ -23,3 +26,20 @@ def sample_ai_choice():
         category="work",
         effects={"energy": -10, "progress": 10},
     )
+
+
+@pytest.fixture
+async def engine():
+    """内存数据库引擎"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(engine):
+    """已建表的数据库会话"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
@@ -0,0 +1,122 @@
+"""
+JSON修复语料
+
+收集AI回合响应中实际出现过的格式问题。每条语料：
+- name: 名称
+- raw: AI返回的原始内容
+- expected: repair_turn 修复后的字典
+- repairs: 必须出现的修复记录
+
+test_json_repair.py 和 scripts/benchmark_json_repair.py 共用。
+"""
+
+CHOICE_WORK = {"id": "work_1", "text": "认真汇报", "category": "work", "effects": {"energy": -10, "progress": 8}}
+CHOICE_SLACK = {"id": "slack_1", "text": "假装打电话", "category": "slack", "effects": {"chill": 10, "suspicion": 5}}
+
+CORPUS = [
+    {
+        "name": "code_fence",
+        "raw": '```json\n{"story_context": "王总走了过来。", "choices": []}\n```',
+        "expected": {"story_context": "王总走了过来。", "choices": []},
+        "repairs": ["code_fence"],
+    },
+    {
+        "name": "prose_around_json",
+        "raw": '好的，这是下一回合：\n{"story_context": "午休时间到了。", "choices": []}\n希望你喜欢！',
+        "expected": {"story_context": "午休时间到了。", "choices": []},
+        "repairs": ["leading_text", "trailing_text"],
+    },
+    {
+        "name": "trailing_commas",
+        "raw": (
+            '{"story_context": "开会。", "choices": [{"id": "work_1", "text": "认真汇报", "category": "work", '
+            '"effects": {"energy": -10, "progress": 8,},},],}'
+        ),
+        "expected": {"story_context": "开会。", "choices": [CHOICE_WORK]},
+        "repairs": ["trailing_comma"],
+    },
+    {
+        "name": "plus_numbers",
+        "raw": (
+            '{"story_context": "摸鱼。", "choices": [{"id": "slack_1", "text": "假装打电话", "category": "slack", '
+            '"effects": {"chill": +10, "suspicion": +5}}]}'
+        ),
+        "expected": {"story_context": "摸鱼。", "choices": [CHOICE_SLACK]},
+        "repairs": ["plus_number"],
+    },
+    {
+        "name": "unquoted_keys_and_single_quotes",
+        "raw": "{story_context: '加班。', choices: [], is_game_over: False}",
+        "expected": {"story_context": "加班。", "choices": [], "is_game_over": False},
+        "repairs": ["unquoted_key", "single_quote", "python_literal"],
+    },
+    {
+        "name": "unescaped_quotes_and_newlines",
+        "raw": '{"story_context": "王总说："年轻人要多吃苦"。\n你沉默了。", "choices": []}',
+        "expected": {"story_context": '王总说："年轻人要多吃苦"。\n你沉默了。', "choices": []},
+        "repairs": ["unescaped_quote", "control_char"],
+    },
+    {
+        "name": "missing_commas_and_comments",
+        "raw": (
+            '{\n  "story_context": "周五下午。"  // 剧情\n'
+            '  "choices": []\n'
+            '  "flavor_texts": ["空调好冷"]\n}'
+        ),
+        "expected": {"story_context": "周五下午。", "choices": [], "flavor_texts": ["空调好冷"]},
+        "repairs": ["comment", "missing_comma"],
+    },
+    {
+        "name": "truncated_in_choice",
+        "raw": (
+            '{"story_context": "打印机卡纸了。", "choices": ['
+            '{"id": "work_1", "text": "认真汇报", "category": "work", "effects": {"energy": -10, "progress": 8}}, '
+            '{"id": "slack_1", "text": "假装打电'
+        ),
+        "expected": {"story_context": "打印机卡纸了。", "choices": [CHOICE_WORK]},
+        "repairs": ["truncated", "dropped:choices[1]"],
+    },
+    {
+        "name": "truncated_in_story",
+        "raw": '{"story_context": "你刚坐下，王总就',
+        "expected": {"story_context": "你刚坐下，王总就"},
+        "repairs": ["truncated"],
+    },
+    {
+        "name": "truncated_after_key",
+        "raw": (
+            '{"story_context": "茶水间。", "choices": [{"id": "work_1", "text": "认真汇报", "category": "work", '
+            '"effects": {"energy": -10, "progress": 8}}], "npc_reactions": '
+        ),
+        "expected": {"story_context": "茶水间。", "choices": [CHOICE_WORK]},
+        "repairs": ["truncated"],
+    },
+    {
+        "name": "invalid_items_dropped",
+        "raw": (
+            '{"story_context": "团建。", "choices": [{"id": "work_1", "text": "认真汇报", "category": "work", '
+            '"effects": {"energy": -10, "progress": 8}}, {"text": "没有id"}, "不是对象"], '
+            '"triggered_events": [{"type": "random", "message": "停电了"}, {"type": "unknown"}], '
+            '"active_magical_element": {"type": "spell", "name": "x"},}'
+        ),
+        "expected": {
+            "story_context": "团建。",
+            "choices": [CHOICE_WORK],
+            "triggered_events": [{"type": "random", "message": "停电了", "effects": {}}],
+        },
+        "repairs": ["dropped:choices[1]", "dropped:choices[2]", "dropped:triggered_events[1]",
+                    "dropped:active_magical_element"],
+    },
+    {
+        "name": "colon_inside_bare_value",
+        "raw": '{"story_context": "早会。", "meeting_time": 10:30, "choices": []}',
+        "expected": {"story_context": "早会。", "meeting_time": "10:30", "choices": []},
+        "repairs": ["bare_string"],
+    },
+    {
+        "name": "compact_format",
+        "raw": '{"s": "王总走了过来。", "c": [["w1", "认真汇报", "work", [-10, 0, +8, 0, 0, 0]],], "d": {"ch": +5}}',
+        "expected": {"s": "王总走了过来。", "c": [["w1", "认真汇报", "work", [-10, 0, 8, 0, 0, 0]]], "d": {"ch": 5}},
+        "repairs": ["plus_number", "trailing_comma"],
+    },
+]
@@ -0,0 +1,129 @@
+"""
+提交行动请求合并测试
+
+同一选项的并发提交共享一个任务；发起请求的客户端断开（请求被取消、依赖的数据库会话关闭）后，
+任务使用独立的数据库会话继续完成，等待中的请求拿到结果，回合被提交。
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import endpoints
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.models.database import Base
+from app.repositories.database import get_db_session
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.context_service import ContextService
+from app.services.fallback_turn_engine import FallbackTurnEngine
+from app.services.session_service import SessionService
+from app.services.single_flight import SingleFlight
+
+
+START_TURN = {
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "choices": [{"id": "choice_slack_1", "text": "假装看文档", "category": "slack", "effects": {"chill": 10}}],
+}
+
+
+class GatedTurnAI:
+    """等待放行后由本地生成器出回合的AI服务"""
+
+    def __init__(self):
+        self.fallback_engine = FallbackTurnEngine()
+        self.started = asyncio.Event()
+        self.gate = asyncio.Event()
+        self.calls = 0
+        self._flights = SingleFlight()
+
+    async def coalesce(self, key, factory):
+        return await self._flights.do(key, factory)
+
+    async def generate_next_turn_with_fallback(
+        self, context, user_action, seed, previous_turn, choice_id, difficulty="normal", deadline=None
+    ):
+        self.calls += 1
+        self.started.set()
+        await self.gate.wait()
+        return self.fallback_engine.generate_next_turn(previous_turn, choice_id, seed, difficulty)
+
+    async def create_summary(self, text: str) -> str:
+        return "摘要"
+
+
+def reject_reuse(session, transaction, connection):
+    """请求结束后（连接已归还、事务已回滚）再使用请求作用域的会话"""
+    raise RuntimeError("请求作用域的数据库会话已关闭")
+
+
+class FakeSpeculator:
+    """没有预生成结果的投机服务"""
+
+    async def take(self, session_id: str, choice_id: str):
+        return None
+
+    def schedule(self, session_id, ai_response, seed, difficulty="normal"):
+        pass
+
+
+@pytest.fixture
+async def maker(tmp_path, monkeypatch):
+    """临时文件数据库（合并任务使用独立会话）"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'game.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(endpoints, "async_session_maker", maker)
+    yield maker
+    await engine.dispose()
+
+
+class TestActCoalescing:
+    """提交行动请求合并测试类"""
+
+    async def test_leader_disconnect_does_not_lose_turn(self, maker):
+        """测试 leader 请求被取消后，follower 仍拿到结果且回合已提交"""
+        async with maker() as db:
+            service = SessionService(db)
+            session_id = (await service.create_game("玩家"))["session_id"]
+            await service.record_key_event(session_id, "game_start", {"ai_response": START_TURN})
+            await UnitOfWork(db).commit()
+
+        async def db_session():
+            async with maker() as db:
+                try:
+                    yield db
+                    await UnitOfWork(db).commit()
+                finally:
+                    event.listen(db.sync_session, "after_begin", reject_reuse)
+
+        ai = GatedTurnAI()
+        app = FastAPI()
+        app.include_router(endpoints.router, prefix="/api/game")
+        app.dependency_overrides[get_db_session] = db_session
+        app.dependency_overrides[endpoints.get_ai_service] = lambda: ai
+        app.dependency_overrides[endpoints.get_speculative_service] = FakeSpeculator
+        payload = {"session_id": session_id, "choice_id": "choice_slack_1"}
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            leader = asyncio.create_task(client.post("/api/game/act", json=payload))
+            await asyncio.wait_for(ai.started.wait(), timeout=1)
+            follower = asyncio.create_task(client.post("/api/game/act", json=payload))
+            await asyncio.sleep(0.05)
+
+            leader.cancel()
+            await asyncio.gather(leader, return_exceptions=True)
+            ai.gate.set()
+            response = await asyncio.wait_for(follower, timeout=1)
+
+        assert response.status_code == 200
+        assert response.json()["player_state"]["turn"] == 1
+        assert ai.calls == 1
+        async with maker() as db:
+            messages = await ContextService(db, None).get_messages(session_id)
+            state = await SessionService(db).get_current_state(session_id)
+        assert [message.role for message in messages] == ["system", "user", "assistant"]
+        assert state["turn"] == 1
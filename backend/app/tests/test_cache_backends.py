@@ -0,0 +1,196 @@
+"""
+AI结果缓存后端测试
+
+测试 memory / sqlite / redis 三种后端的读写、过期和故障降级。
+Redis 后端使用本地的 RESP 协议替身服务器测试，无需真实 Redis。
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.cache_backends import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+)
+
+
+class FakeRedisServer:
+    """最小化的 RESP 替身服务器（支持 GET / SET PX / DEL / AUTH / SELECT）"""
+
+    def __init__(self, password: str = None):
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        parts = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            parts.append((await reader.readexactly(length + 2))[:-2].decode("utf-8"))
+        return parts
+
+    async def _handle(self, reader, writer):
+        authed = self.password is None
+        while True:
+            parts = await self._read_command(reader)
+            if parts is None:
+                break
+            name = parts[0].upper()
+            self.commands.append(name)
+
+            if name == "AUTH":
+                authed = parts[1] == self.password
+                writer.write(b"+OK\r\n" if authed else b"-ERR invalid password\r\n")
+            elif not authed:
+                writer.write(b"-NOAUTH Authentication required\r\n")
+            elif name == "SELECT":
+                writer.write(b"+OK\r\n")
+            elif name == "SET":
+                expires_at = time.time() + int(parts[4]) / 1000 if len(parts) > 4 else None
+                self.data[parts[1]] = (parts[2], expires_at)
+                writer.write(b"+OK\r\n")
+            elif name == "GET":
+                value, expires_at = self.data.get(parts[1], (None, None))
+                if value is None or (expires_at and expires_at <= time.time()):
+                    writer.write(b"$-1\r\n")
+                else:
+                    encoded = value.encode("utf-8")
+                    writer.write(b"$%d\r\n%s\r\n" % (len(encoded), encoded))
+            elif name == "DEL":
+                existed = self.data.pop(parts[1], None) is not None
+                writer.write(b":%d\r\n" % int(existed))
+            else:
+                writer.write(b"-ERR unknown command\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def redis_server():
+    server = FakeRedisServer(password="secret")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+class TestMemoryCacheBackend:
+    """进程内后端测试类"""
+
+    async def test_roundtrip(self):
+        """测试读写和删除"""
+        backend = MemoryCacheBackend(max_entries=10, max_bytes=1024, ttl=60)
+        await backend.set("k", {"story": "摸鱼"})
+
+        assert await backend.get("k") == {"story": "摸鱼"}
+        await backend.delete("k")
+        assert await backend.get("k") is None
+        assert backend.get_stats()["backend"] == "memory"
+
+
+class TestSQLiteCacheBackend:
+    """SQLite 文件后端测试类"""
+
+    async def test_shared_between_instances(self, tmp_path):
+        """测试同一文件的两个实例（模拟两个 worker）共享缓存"""
+        path = str(tmp_path / "cache.db")
+        worker_a = SQLiteCacheBackend(path=path, max_bytes=1024, ttl=60)
+        worker_b = SQLiteCacheBackend(path=path, max_bytes=1024, ttl=60)
+
+        await worker_a.set("k", {"npcs": ["老王"]})
+        assert await worker_b.get("k") == {"npcs": ["老王"]}
+        assert worker_b.get_stats()["hits"] == 1
+
+        await worker_a.close()
+        await worker_b.close()
+
+    async def test_expired_entry_is_miss(self, tmp_path):
+        """测试过期条目视为未命中"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.db"), max_bytes=1024, ttl=60)
+        await backend.set("k", 1, ttl=-1)
+
+        assert await backend.get("k") is None
+        assert backend.get_stats()["misses"] == 1
+        await backend.close()
+
+    async def test_byte_budget_evicts_least_recent(self, tmp_path):
+        """测试超出字节预算时淘汰最久未访问的条目"""
+        backend = SQLiteCacheBackend(path=str(tmp_path / "cache.db"), max_bytes=50, ttl=60)
+        await backend.set("a", "x" * 20)
+        await backend.set("b", "y" * 20)
+        await backend.get("a")  # a 变为最近访问
+        await backend.set("c", "z" * 20)
+
+        assert await backend.get("a") == "x" * 20
+        assert await backend.get("b") is None
+        assert await backend.get("c") == "z" * 20
+        await backend.close()
+
+
+class TestRedisCacheBackend:
+    """Redis 协议后端测试类"""
+
+    async def test_roundtrip_with_auth_and_db(self, redis_server):
+        """测试认证、选库和读写"""
+        backend = RedisCacheBackend(
+            url=f"redis://:secret@127.0.0.1:{redis_server.port}/2", ttl=60
+        )
+        await backend.set("k", {"story": "开会中……"})
+
+        assert await backend.get("k") == {"story": "开会中……"}
+        assert "ai_cache:k" in redis_server.data
+        assert redis_server.commands[:2] == ["AUTH", "SELECT"]
+
+        await backend.delete("k")
+        assert await backend.get("k") is None
+        await backend.close()
+
+    async def test_shared_between_instances(self, redis_server):
+        """测试两个实例（模拟两台机器上的 worker）共享缓存"""
+        url = f"redis://:secret@127.0.0.1:{redis_server.port}/0"
+        worker_a = RedisCacheBackend(url=url, ttl=60)
+        worker_b = RedisCacheBackend(url=url, ttl=60)
+
+        await worker_a.set("k", [1, 2, 3])
+        assert await worker_b.get("k") == [1, 2, 3]
+
+        await worker_a.close()
+        await worker_b.close()
+
+    async def test_server_down_is_miss(self):
+        """测试服务端不可用时按未命中处理，不抛异常"""
+        backend = RedisCacheBackend(url="redis://127.0.0.1:1/0", ttl=60, timeout=0.5)
+
+        await backend.set("k", 1)
+        assert await backend.get("k") is None
+
+        stats = backend.get_stats()
+        assert stats["errors"] == 2
+        assert stats["misses"] == 1
+
+    async def test_reconnects_after_disconnect(self, redis_server):
+        """测试连接断开后下次请求自动重连"""
+        backend = RedisCacheBackend(
+            url=f"redis://:secret@127.0.0.1:{redis_server.port}/0", ttl=60
+        )
+        await backend.set("k", "v")
+        backend._writer.close()
+
+        # 第一次请求可能因断线失败，随后应恢复
+        await backend.get("k")
+        assert await backend.get("k") == "v"
+        await backend.close()
@@ -0,0 +1,171 @@
+"""
+LLM熔断器单元测试
+
+测试 CircuitBreaker 的熔断、拒绝、半开探测和恢复
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+from app.core.config import settings
+from app.services.ai_service_v2 import AIServiceV2
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from app.services.llm_scheduler import LLMPriority, LLMScheduler
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """窗口为4、最少2次调用、熔断10秒的新熔断器（绕过单例缓存）"""
+    values = {
+        "CIRCUIT_BREAKER_ENABLED": True,
+        "CIRCUIT_WINDOW": 4,
+        "CIRCUIT_MIN_CALLS": 2,
+        "CIRCUIT_FAILURE_RATE": 0.5,
+        "CIRCUIT_SLOW_CALL_SECONDS": 5.0,
+        "CIRCUIT_SLOW_CALL_RATE": 0.8,
+        "CIRCUIT_OPEN_SECONDS": 10.0,
+        "CIRCUIT_HALF_OPEN_PROBES": 1,
+    }
+    for key, value in values.items():
+        monkeypatch.setattr(settings, key, value)
+    monkeypatch.setattr(CircuitBreaker, "_instance", None)
+    return CircuitBreaker()
+
+
+def timeout_error() -> APITimeoutError:
+    """构造供应商超时错误"""
+    return APITimeoutError(request=httpx.Request("POST", "https://llm.example.com"))
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    """连续记录失败直到熔断"""
+    breaker.record(failed=True, latency=20.0)
+    breaker.record(failed=True, latency=20.0)
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_trips_on_failure_rate(self, breaker):
+        """测试失败率超过阈值后熔断并拒绝调用"""
+        trip(breaker)
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.is_open()
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+        assert breaker.get_stats()["rejected"] == 1
+
+    def test_trips_on_slow_calls(self, breaker):
+        """测试慢调用率超过阈值后熔断"""
+        breaker.record(failed=False, latency=6.0)
+        breaker.record(failed=False, latency=7.0)
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_half_open_probe_success_closes(self, breaker):
+        """测试熔断到期后只放行一个探测请求，成功则恢复"""
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=100.0):
+            trip(breaker)
+
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=111.0):
+            breaker.acquire()
+            assert breaker.state == CircuitState.HALF_OPEN
+            with pytest.raises(CircuitOpenError):
+                breaker.acquire()
+
+            breaker.record(failed=False, latency=1.0)
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.get_stats()["window_calls"] == 0
+
+    def test_half_open_probe_failure_reopens(self, breaker):
+        """测试探测请求失败时重新熔断"""
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=100.0):
+            trip(breaker)
+
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=111.0):
+            breaker.acquire()
+            breaker.record(failed=True, latency=1.0)
+            assert breaker.state == CircuitState.OPEN
+            assert breaker.is_open()
+
+    async def test_guard_counts_only_provider_errors(self, breaker):
+        """测试 guard 只把供应商错误计为失败"""
+        with pytest.raises(ValueError):
+            async with breaker.guard():
+                raise ValueError("请求参数错误")
+        assert breaker.get_stats()["window_calls"] == 0
+
+        for _ in range(2):
+            with pytest.raises(APITimeoutError):
+                async with breaker.guard():
+                    raise timeout_error()
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_disabled_never_rejects(self, breaker):
+        """测试关闭熔断器时始终放行"""
+        breaker.enabled = False
+        trip(breaker)
+
+        breaker.acquire()
+        assert not breaker.is_open()
+
+    def test_check_rejects_before_queueing(self, breaker):
+        """测试熔断中快速拒绝，到期后放行且不消耗探测名额"""
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=100.0):
+            trip(breaker)
+            with pytest.raises(CircuitOpenError):
+                breaker.check()
+
+        with patch("app.services.circuit_breaker.time.monotonic", return_value=111.0):
+            breaker.check()
+            breaker.acquire()
+            assert breaker.state == CircuitState.HALF_OPEN
+
+    async def test_stream_slow_call_uses_first_token(self, breaker):
+        """测试流式调用按首token耗时判断慢调用，之后的推流时间不计入"""
+        with patch("app.services.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            async with breaker.guard() as call:
+                monotonic.return_value = 101.0
+                call.first_token()
+                monotonic.return_value = 160.0
+
+            monotonic.return_value = 200.0
+            async with breaker.guard():
+                monotonic.return_value = 220.0
+
+        assert breaker.get_stats()["slow_call_rate"] == 0.5
+
+    async def test_queue_wait_not_counted(self, breaker, monkeypatch):
+        """测试在调度队列中等待的时间不计入调用耗时"""
+        monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 1)
+        monkeypatch.setattr(LLMScheduler, "_instance", None)
+        breaker.slow_call_seconds = 0.1
+
+        async def create(**kwargs):
+            return "ok"
+
+        service = object.__new__(AIServiceV2)
+        service.breaker = breaker
+        service.scheduler = LLMScheduler()
+        service.router = SimpleNamespace(create=create)
+
+        async def busy():
+            async with service.scheduler.slot(LLMPriority.INTERACTIVE):
+                await asyncio.sleep(0.2)
+
+        holder = asyncio.create_task(busy())
+        await asyncio.sleep(0)
+        assert await service._create_completion(LLMPriority.SUMMARY) == "ok"
+        await holder
+
+        stats = breaker.get_stats()
+        assert stats["window_calls"] == 1
+        assert stats["slow_call_rate"] == 0.0
@@ -0,0 +1,93 @@
+"""
+上下文打包器单元测试
+
+测试 ContextPacker 的预算控制、优先级、必选条目和输出顺序，
+以及 ContextService 按 CONTEXT_RECENT_TURNS 保留最近的已存回合
+"""
+from app.core.config import settings
+from app.repositories.session_repo import SessionRepository
+from app.services.context_service import ContextService
+from app.services.context_packer import (
+    PRIORITY_HISTORY,
+    PRIORITY_KEY_EVENTS,
+    PRIORITY_RECENT,
+    PRIORITY_SUMMARY,
+    PRIORITY_WORLD,
+    ContextPacker,
+)
+
+
+def text(tokens: int) -> str:
+    """构造估算为指定token数的文本"""
+    return "字" * (tokens * 2)
+
+
+def make_packer(budget: int, history: int = 20) -> ContextPacker:
+    """构造一个包含各类条目的打包器"""
+    packer = ContextPacker(budget=budget)
+    packer.add("world", {"role": "system", "content": text(100)}, PRIORITY_WORLD)
+    packer.add("summary", {"role": "system", "content": text(200)}, PRIORITY_SUMMARY)
+    packer.add("key_events", {"role": "system", "content": text(50)}, PRIORITY_KEY_EVENTS)
+    for position in range(history):
+        recent = position >= history - 2
+        packer.add(
+            "message",
+            {"role": "user" if position % 2 else "assistant", "content": f"{position}:{text(100)}"},
+            PRIORITY_RECENT if recent else PRIORITY_HISTORY,
+            position=position,
+            required=recent,
+        )
+    return packer
+
+
+class TestContextPacker:
+    """上下文打包器测试类"""
+
+    def test_stays_within_budget(self):
+        """测试总token数不超过预算，且与历史长度无关"""
+        for history in (20, 200):
+            result = make_packer(budget=1000, history=history).pack()
+
+            assert result.tokens <= 1000
+            assert result.included["world"] == 1
+            assert result.included["summary"] == 1
+            assert result.included["key_events"] == 1
+            assert result.dropped["message"] == history - result.included["message"]
+
+    def test_prefers_newer_history(self):
+        """测试更早的消息中越新越优先，输出按时间顺序"""
+        result = make_packer(budget=800).pack()
+
+        positions = [int(m["content"].split(":")[0]) for m in result.messages if m["role"] != "system"]
+        assert positions == sorted(positions)
+        assert positions[-1] == 19
+        assert positions[0] > 10
+
+    def test_system_items_first(self):
+        """测试世界状态、摘要、关键事件在消息之前"""
+        result = make_packer(budget=5000).pack()
+
+        roles = [m["role"] for m in result.messages]
+        assert roles[:3] == ["system"] * 3
+        assert "system" not in roles[3:]
+
+    def test_required_items_kept_over_budget(self):
+        """测试预算不足时仍保留最近回合"""
+        result = make_packer(budget=100).pack()
+
+        assert result.included == {"message": 2}
+        assert result.report()["dropped"]["world"] == 1
+
+    async def test_recent_turns_are_stored_turns(self, db, monkeypatch):
+        """测试必选的最近回合数按已存回合计算（本回合的玩家行动在打包后追加）"""
+        monkeypatch.setattr(settings, "CONTEXT_TOKEN_BUDGET", 10)
+        monkeypatch.setattr(settings, "CONTEXT_RECENT_TURNS", 2)
+        service = ContextService(db, None)
+        session_id = await SessionRepository(db).create(seed=1)
+        for turn in range(4):
+            await service.add_message(session_id, "user", f"行动{turn}")
+            await service.add_message(session_id, "assistant", f"剧情{turn}" + text(50))
+
+        context = await service.get_context_for_ai(session_id)
+
+        assert [message["content"][:3] for message in context] == ["行动2", "剧情2", "行动3", "剧情3"]
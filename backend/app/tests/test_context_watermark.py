@@ -0,0 +1,147 @@
+"""
+摘要水位线和分层摘要单元测试
+
+使用内存SQLite数据库测试：
+1. 自动摘要只处理水位线之后的消息，摘要后上下文只包含摘要和水位线之后的消息
+2. 水位线是 (created_at, id) 游标，与水位线消息同一时间戳的后续消息不会被跳过
+3. 在用摘要超过预算时合并成上一级摘要，摘要数量与游戏长度无关
+4. 关键事件压缩
+5. 旧库缺少的列在初始化时自动补齐
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, inspect, text
+
+from app.core.config import settings
+from app.models.database import Base, Message, SessionStats, Summary, calculate_tokens
+from app.repositories.message_repo import MessageCursor
+from app.repositories.database import _add_missing_columns
+from app.repositories.session_repo import SessionRepository
+from app.services.context_service import ContextService
+
+
+class FakeSummaryAI:
+    """只实现 create_summary 的AI服务"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create_summary(self, text: str) -> str:
+        self.calls.append(text)
+        return f"摘要{len(self.calls)}" + "剧" * 100
+
+
+class TestSummaryWatermark:
+    """摘要水位线测试类"""
+
+    async def test_summarized_messages_leave_context(self, db):
+        """测试摘要调用次数和上下文大小有界，被摘要的消息不再进入上下文"""
+        ai = FakeSummaryAI()
+        service = ContextService(db, ai)
+        session_id = await SessionRepository(db).create(seed=1)
+
+        for index in range(40):
+            await service.add_message(session_id, "assistant" if index % 2 else "user", f"第{index}条" + "字" * 200)
+            context = await service.get_context_for_ai(session_id, token_limit=1000)
+
+        assert 0 < len(ai.calls) < 20
+        # 每次摘要只包含上一次水位线之后的消息
+        assert "第0条" not in ai.calls[-1]
+        assert service.last_pack.tokens <= 1000
+
+        watermark = await service.get_summary_watermark(session_id)
+        contents = [message["content"] for message in context if message["role"] != "system"]
+        remaining = await service.get_messages(session_id, after=watermark)
+        assert contents == [message.content for message in remaining]
+
+    async def test_watermark_ties_on_timestamp(self, db):
+        """测试与水位线消息同一时间戳的后续消息仍进入上下文，统计回填按同一游标计算"""
+        service = ContextService(db, FakeSummaryAI())
+        session_id = await SessionRepository(db).create(seed=1)
+        for index in range(8):
+            db.add(Message(
+                id=f"m{index:03d}", session_id=session_id, role="user",
+                content=f"消息{index}", tokens=1, created_at=datetime(2024, 1, 1),
+            ))
+        await db.commit()
+
+        messages = await service.get_messages(session_id)
+        await service.create_summary(session_id, messages[:3])
+
+        watermark = await service.get_summary_watermark(session_id)
+        assert watermark == MessageCursor(datetime(2024, 1, 1), "m002")
+        remaining = await service.get_messages(session_id, after=watermark)
+        assert [message.id for message in remaining] == [f"m{i:03d}" for i in range(3, 8)]
+        context = await service.get_context_for_ai(session_id)
+        assert [m["content"] for m in context if m["role"] == "user"] == [f"消息{i}" for i in range(3, 8)]
+
+        await db.execute(delete(SessionStats))
+        await db.commit()
+        db.expunge_all()
+        assert await service._count_unsummarized_tokens(session_id) == 5
+
+    async def test_summaries_merged_hierarchically(self, db):
+        """测试在用摘要超过预算时合并成上一级摘要，被合并的摘要不再进入上下文"""
+        ai = FakeSummaryAI()
+        service = ContextService(db, ai)
+        session_id = await SessionRepository(db).create(seed=1)
+
+        for index in range(120):
+            await service.add_message(session_id, "assistant" if index % 2 else "user", "字" * 200)
+            context = await service.get_context_for_ai(session_id, token_limit=1000)
+
+        active = await service.get_summaries(session_id)
+        everything = await service.get_summaries(session_id, include_merged=True)
+        assert len(everything) > len(active)
+        assert max(summary.level for summary in active) >= 1
+        active_tokens = sum(calculate_tokens(summary.summary_text) for summary in active)
+        assert len(active) <= 2 or active_tokens <= settings.SUMMARY_TOKEN_BUDGET
+        assert len([m for m in context if m["content"].startswith("[历史摘要]")]) == len(active)
+
+        merged = [summary for summary in everything if summary.merged_into]
+        assert {summary.merged_into for summary in merged} <= {summary.id for summary in everything}
+
+    async def test_latest_summary_never_merged(self, db, monkeypatch):
+        """测试合并只作用于最新摘要之前的摘要：2个摘要不合并，3个摘要只合并较早的2个"""
+        monkeypatch.setattr(settings, "SUMMARY_TOKEN_BUDGET", 10)
+        service = ContextService(db, FakeSummaryAI())
+
+        for count, expected in ((2, 0), (3, 1)):
+            session_id = await SessionRepository(db).create(seed=1)
+            for index in range(count):
+                db.add(Summary(
+                    id=f"{session_id}-{index}", session_id=session_id, summary_text="剧" * 100,
+                    message_count=1, covers_until=datetime(2024, 1, 1, 0, index), covers_until_id=f"m{index}",
+                ))
+            await db.commit()
+
+            assert await service._compact_summaries(session_id) == expected
+            active = await service.get_summaries(session_id)
+            assert active[-1].id == f"{session_id}-{count - 1}"
+            assert active[-1].merged_into is None and len(active) == 2
+
+    def test_compress_key_events(self):
+        """测试连续重复的选择合并计数，超过上限时只保留最近的"""
+        lines = ContextService._compress_choices(["摸鱼", "摸鱼", "摸鱼", "开会", "加班", "摸鱼"], limit=3)
+
+        assert lines == ["…（此前2条从略）", "加班", "摸鱼"]
+        assert ContextService._compress_choices(["摸鱼", "摸鱼", "开会"], limit=3) == ["摸鱼 ×2", "开会"]
+
+        text = ContextService(None, None)._format_summary([{"choice": c} for c in ("摸鱼", "开会")], "剧情")
+        assert ContextService._split_summary(text) == (["摸鱼", "开会"], "剧情")
+
+    async def test_missing_column_added(self, engine):
+        """测试旧表缺少的可空列在初始化时补齐"""
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE summaries (id VARCHAR(36) PRIMARY KEY, session_id VARCHAR(36) NOT NULL, "
+                "summary_text TEXT NOT NULL, message_count INTEGER NOT NULL, "
+                "summary_type VARCHAR(20) NOT NULL, created_at DATETIME NOT NULL)"
+            ))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
+            columns = await conn.run_sync(
+                lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns("summaries")}
+            )
+
+        assert {"covers_until", "covers_until_id", "level", "merged_into"} <= columns
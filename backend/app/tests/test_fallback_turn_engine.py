@@ -0,0 +1,158 @@
+"""
+本地回合生成器单元测试
+
+测试 FallbackTurnEngine 的回合格式、确定性、效果应用、结局判定和按公司/风格选择文案
+"""
+import pytest
+
+from app.api.schemas import AIChoice, PlayerState, TriggeredEvent
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.core.game_engine import resolve_turn
+from app.prompts.fallback_library import (
+    FALLBACK_BOSS_REACTIONS,
+    FALLBACK_COMPANIES,
+    FALLBACK_COMPANY_TURN_LINES,
+    FALLBACK_OUTCOME_LINES,
+    FALLBACK_STYLE_TURN_LINES,
+)
+from app.services.content_validator import ContentValidator
+from app.services.fallback_turn_engine import FallbackTurnEngine
+
+
+@pytest.fixture(autouse=True)
+def no_random_events(monkeypatch):
+    """关闭随机事件，便于断言状态"""
+    monkeypatch.setattr("app.core.game_engine.RANDOM_EVENT_PROBABILITY", 0.0)
+
+
+def make_previous_turn(**state) -> dict:
+    """构造上一回合内容（一个工作选项）"""
+    return {
+        "player_state": {**INITIAL_PLAYER_STATE, **state},
+        "choices": [
+            {
+                "id": "choice_work_1",
+                "text": "埋头干活",
+                "category": "work",
+                "effects": {"energy": -10, "progress": 10, "chill": -5},
+            },
+        ],
+        "npcs": [{"name": "王经理"}, {"name": "小李"}],
+    }
+
+
+class TestFallbackTurnEngine:
+    """本地回合生成器测试类"""
+
+    def test_generates_valid_turn(self):
+        """测试生成的回合通过内容校验且符合响应模型"""
+        result = FallbackTurnEngine().generate_next_turn(make_previous_turn(), "choice_work_1", seed=42)
+
+        is_valid, errors = ContentValidator.validate_turn_response(result)
+        assert is_valid, errors
+        assert result["is_fallback"] is True
+        PlayerState(**result["player_state"])
+        for choice in result["choices"]:
+            AIChoice(**choice)
+        for event in result["triggered_events"]:
+            TriggeredEvent(**event)
+        assert len({choice["id"] for choice in result["choices"]}) == len(result["choices"])
+
+    def test_deterministic(self):
+        """测试相同输入生成相同回合"""
+        engine = FallbackTurnEngine()
+        first = engine.generate_next_turn(make_previous_turn(), "choice_work_1", seed=7)
+        second = engine.generate_next_turn(make_previous_turn(), "choice_work_1", seed=7)
+
+        assert first == second
+
+    def test_applies_effects_and_advances_turn(self):
+        """测试应用选项效果、限制范围并推进回合"""
+        result = FallbackTurnEngine().generate_next_turn(
+            make_previous_turn(chill=2), "choice_work_1", seed=1
+        )
+
+        state = result["player_state"]
+        assert state["energy"] == 90
+        assert state["progress"] == 10
+        assert state["chill"] == 0
+        assert state["turn"] == 1
+
+    def test_end_of_day_restores_energy(self):
+        """测试一天最后一回合后进入第二天并恢复精力"""
+        result = FallbackTurnEngine().generate_next_turn(
+            make_previous_turn(turn=7, energy=40), "choice_work_1", seed=1
+        )
+
+        state = result["player_state"]
+        assert state["day"] == 2
+        assert state["turn"] == 0
+        assert state["energy"] == 100
+
+    def test_uses_given_resolution(self):
+        """测试传入结算结果时直接采用其状态"""
+        previous = make_previous_turn()
+        resolution = resolve_turn(previous, "choice_work_1", seed=5)
+
+        result = FallbackTurnEngine().generate_next_turn(
+            previous, "choice_work_1", seed=5, resolution=resolution
+        )
+
+        assert result["player_state"] == resolution.player_state
+
+    def test_game_over_on_suspicion(self):
+        """测试怀疑度满值时游戏结束"""
+        previous = make_previous_turn(suspicion=98)
+        previous["choices"][0]["effects"] = {"suspicion": 5}
+
+        result = FallbackTurnEngine().generate_next_turn(previous, "choice_work_1", seed=1)
+
+        assert result["is_game_over"] is True
+        assert result["is_victory"] is False
+        assert "开除" in result["game_over_reason"]
+        assert result["choices"] == []
+
+    def test_without_previous_turn(self):
+        """测试没有上一回合时从初始状态推进"""
+        engine = FallbackTurnEngine()
+        result = engine.generate_next_turn(None, "choice_slack_3", seed=3, reason="timeout")
+
+        assert result["player_state"]["turn"] == 1
+        assert engine.get_stats()["timeout"] == 1
+
+    def test_lines_follow_company_and_style(self):
+        """测试按公司类型和文案风格选择剧情、老板反应和选项"""
+        previous = make_previous_turn()
+        company = FALLBACK_COMPANIES["xianxia_fantasy"]
+        previous["company_info"] = {"name": company["name"], "type": company["type"], "style": company["style"]}
+        company_lines = FALLBACK_COMPANY_TURN_LINES["xianxia_fantasy"]
+        style_lines = FALLBACK_STYLE_TURN_LINES["ancient_xianxia"]
+
+        for seed in range(10):
+            result = FallbackTurnEngine().generate_next_turn(previous, "choice_work_1", seed=seed)
+
+            outcomes = company_lines["outcomes"]["work"] + style_lines["outcomes"]["work"]
+            assert any(line in result["story_context"] for line in outcomes)
+            assert result["npc_reactions"]["boss"] in company_lines["boss_reactions"]["work"]
+            texts = {choice["category"]: choice["text"] for choice in result["choices"]}
+            assert texts["work"] == company_lines["choices"]["work"][0]["text"]
+            assert texts["slack"] == company_lines["choices"]["slack"][0]["text"]
+
+    def test_style_from_game_meta(self):
+        """测试公司信息没有风格时使用开局元数据中的风格，未知公司使用通用文案"""
+        previous = make_previous_turn()
+        previous["company_info"] = {"name": "某某科技", "type": "未知公司"}
+        previous["game_meta"] = {"company_type": "未知公司", "style_type": "官话套话风"}
+
+        result = FallbackTurnEngine().generate_next_turn(previous, "choice_work_1", seed=5)
+
+        outcomes = FALLBACK_STYLE_TURN_LINES["official_bureaucratic"]["outcomes"]["work"]
+        assert any(line in result["story_context"] for line in outcomes)
+        assert result["npc_reactions"]["boss"] in FALLBACK_BOSS_REACTIONS["work"]
+
+    def test_generic_lines_without_company(self):
+        """测试没有公司和风格信息时使用通用文案"""
+        result = FallbackTurnEngine().generate_next_turn(make_previous_turn(), "choice_work_1", seed=5)
+
+        assert any(line in result["story_context"] for line in FALLBACK_OUTCOME_LINES["work"])
+        assert result["npc_reactions"]["boss"] in FALLBACK_BOSS_REACTIONS["work"]
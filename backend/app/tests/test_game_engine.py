@@ -5,7 +5,7 @@
 """
 import pytest
 from app.api.schemas import PlayerState, AIChoice, PlayerLevel
-from app.core.game_engine import GameEngine
+from app.core.game_engine import GameEngine, resolve_turn
 from app.core.constants import INITIAL_PLAYER_STATE
 
 
@@ -139,3 +139,58 @@ class TestGameEngine:
         # 验证有事件被触发（虽然种子固定，但至少应该触发一些事件）
         total_events = sum(len(events) for events in events_list)
         assert total_events > 0
+
+
+class TestResolveTurn:
+    """回合结算测试类"""
+
+    def _previous_turn(self, **state):
+        """构造上一回合内容"""
+        return {
+            "player_state": {**INITIAL_PLAYER_STATE, **state},
+            "choices": [
+                {"id": "slack", "text": "摸鱼", "effects": {"chill": 10, "suspicion": 5}},
+            ],
+        }
+
+    def test_deterministic(self):
+        """测试相同会话种子和选项得到相同结算"""
+        first = resolve_turn(self._previous_turn(), "slack", seed=42)
+        second = resolve_turn(self._previous_turn(), "slack", seed=42)
+
+        assert first == second
+        assert first.player_state["turn"] == 1
+
+    def test_unknown_choice_returns_none(self):
+        """测试找不到选项时不结算"""
+        assert resolve_turn(self._previous_turn(), "missing", seed=1) is None
+        assert resolve_turn(None, "slack", seed=1) is None
+
+    def test_apply_overrides_ai_state(self):
+        """测试结算结果覆盖AI返回的状态和结束判定"""
+        resolution = resolve_turn(self._previous_turn(suspicion=99), "slack", seed=1)
+        ai_result = {
+            "story_context": "...",
+            "player_state": {"energy": 1, "suspicion": 0},
+            "choices": [{"id": "a", "text": "继续", "effects": {}}],
+            "triggered_events": [{"type": "random", "message": "彩蛋", "effects": {"energy": 50}}],
+            "is_game_over": False,
+        }
+
+        resolution.apply(ai_result)
+
+        assert ai_result["player_state"] == resolution.player_state
+        assert ai_result["is_game_over"] is True
+        assert "开除" in ai_result["game_over_reason"]
+        assert ai_result["choices"] == []
+        assert ai_result["triggered_events"][-1]["effects"] == {}
+
+    def test_tolerates_malformed_state(self):
+        """测试AI生成的越界或非法状态被截断/忽略"""
+        resolution = resolve_turn(
+            self._previous_turn(energy=150, chill="很高", day=0), "slack", seed=3, difficulty="hard"
+        )
+
+        state = PlayerState(**resolution.player_state)
+        assert 0 <= state.energy <= 100
+        assert state.day >= 1
@@ -0,0 +1,174 @@
+"""
+请求对冲单元测试
+
+测试 LatencyTracker 分位数计算和 RequestHedger 的对冲、取消、预算控制
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core.config import settings
+from app.services.hedging import LatencyTracker, RequestHedger
+
+
+@pytest.fixture
+def make_hedger(monkeypatch):
+    """创建启用对冲的新实例（绕过单例缓存）"""
+    def factory(**overrides) -> RequestHedger:
+        values = {
+            "HEDGE_ENABLED": True,
+            "HEDGE_PERCENTILE": 0.9,
+            "HEDGE_MAX_RATE": 0.5,
+            "HEDGE_MIN_DELAY": 0.01,
+            "HEDGE_MIN_SAMPLES": 5,
+            **overrides,
+        }
+        for key, value in values.items():
+            monkeypatch.setattr(settings, key, value)
+        monkeypatch.setattr(RequestHedger, "_instance", None)
+        return RequestHedger()
+    return factory
+
+
+def warm_up(hedger: RequestHedger, task: str, seconds: float, count: int = 10) -> None:
+    """填充延迟样本"""
+    for _ in range(count):
+        hedger.latency.record(task, seconds)
+
+
+class TestLatencyTracker:
+    """延迟记录器测试类"""
+
+    def test_percentile(self):
+        """测试分位数取最近邻样本"""
+        tracker = LatencyTracker()
+        for value in range(1, 11):
+            tracker.record("turn", float(value))
+
+        assert tracker.percentile("turn", 0.9) == 9.0
+        assert tracker.percentile("turn", 0.5) == 5.0
+        assert tracker.percentile("missing", 0.9) is None
+
+    def test_window_keeps_recent_samples(self):
+        """测试只保留最近的样本"""
+        tracker = LatencyTracker(window=3)
+        for value in (100.0, 1.0, 2.0, 3.0):
+            tracker.record("turn", value)
+
+        assert tracker.count("turn") == 3
+        assert tracker.percentile("turn", 1.0) == 3.0
+
+
+class TestRequestHedger:
+    """请求对冲器测试类"""
+
+    async def test_slow_primary_is_hedged_and_cancelled(self, make_hedger):
+        """测试主请求超过阈值时发起备用请求，备用先返回则取消主请求"""
+        hedger = make_hedger()
+        warm_up(hedger, "next_turn", 0.02)
+        attempts = []
+        primary_cancelled = asyncio.Event()
+
+        async def call():
+            attempt = len(attempts)
+            attempts.append(attempt)
+            if attempt == 0:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    primary_cancelled.set()
+                    raise
+            return f"attempt-{attempt}"
+
+        result = await asyncio.wait_for(hedger.run("next_turn", call), timeout=1)
+        await asyncio.wait_for(primary_cancelled.wait(), timeout=1)
+
+        assert result == "attempt-1"
+        stats = hedger.get_stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+
+    async def test_fast_primary_not_hedged(self, make_hedger):
+        """测试阈值内返回的请求不对冲"""
+        hedger = make_hedger()
+        warm_up(hedger, "next_turn", 0.5)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        assert await hedger.run("next_turn", call) == "ok"
+        assert calls == 1
+        assert hedger.get_stats()["hedged"] == 0
+
+    async def test_no_hedge_without_samples(self, make_hedger):
+        """测试样本不足时不对冲"""
+        hedger = make_hedger()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        assert await hedger.run("initial_turn", call) == "ok"
+        assert calls == 1
+        assert hedger.threshold("initial_turn") is None
+
+    async def test_hedge_rate_capped(self, make_hedger):
+        """测试对冲比例达到上限后不再对冲"""
+        hedger = make_hedger(HEDGE_MAX_RATE=0.1, HEDGE_MIN_SAMPLES=5)
+        warm_up(hedger, "next_turn", 0.01, count=50)
+
+        async def call():
+            await asyncio.sleep(0.03)
+            return "ok"
+
+        for _ in range(3):
+            await hedger.run("next_turn", call)
+
+        stats = hedger.get_stats()
+        assert stats["hedged"] == 0
+        assert stats["budget_denied"] == 3
+
+    async def test_failed_primary_falls_back_to_hedge(self, make_hedger):
+        """测试对冲后主请求失败时使用备用请求的结果"""
+        hedger = make_hedger()
+        warm_up(hedger, "next_turn", 0.01)
+        attempts = []
+
+        async def call():
+            attempt = len(attempts)
+            attempts.append(attempt)
+            if attempt == 0:
+                await asyncio.sleep(0.03)
+                raise TimeoutError("供应商超时")
+            await asyncio.sleep(0.05)
+            return "hedge"
+
+        assert await hedger.run("next_turn", call) == "hedge"
+
+    async def test_queue_wait_not_hedged_or_sampled(self, make_hedger):
+        """测试主请求排队期间不对冲，排队时间不计入延迟样本"""
+        hedger = make_hedger()
+        warm_up(hedger, "next_turn", 0.02)
+        calls = 0
+
+        @asynccontextmanager
+        async def queued_slot():
+            await asyncio.sleep(0.1)
+            yield
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        assert await hedger.run("next_turn", call, admission=queued_slot) == "ok"
+        assert calls == 1
+        assert hedger.get_stats()["hedged"] == 0
+        assert hedger.latency.percentile("next_turn", 1.0) < 0.05
@@ -0,0 +1,42 @@
+"""
+JSON修复单元测试
+
+用语料（json_repair_corpus.py）测试 repair_turn 的修复结果和修复记录，
+以及合法JSON和无法修复的内容
+"""
+import json
+
+import pytest
+
+from app.services.json_repair import repair_json, repair_turn
+from app.tests.json_repair_corpus import CORPUS
+
+
+class TestJsonRepair:
+    """JSON修复测试类"""
+
+    @pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+    def test_corpus(self, case):
+        """测试语料修复后得到期望的内容，并记录修复"""
+        result = repair_turn(case["raw"])
+
+        assert result.value == case["expected"]
+        for repair in case["repairs"]:
+            assert repair in result.repairs
+
+    def test_valid_json_untouched(self):
+        """测试合法JSON不做任何修复"""
+        payload = {"story_context": "正常", "choices": [{"id": "a", "text": "b", "effects": {}}]}
+
+        result = repair_json(json.dumps(payload, ensure_ascii=False))
+
+        assert result.value == payload
+        assert result.repaired is False
+        assert result.truncated is False
+
+    def test_no_json_raises(self):
+        """测试没有JSON对象时抛出 ValueError"""
+        with pytest.raises(ValueError):
+            repair_turn("抱歉，我无法生成这个内容。")
+        with pytest.raises(ValueError):
+            repair_turn("[1, 2, 3]")
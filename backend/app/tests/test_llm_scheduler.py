@@ -0,0 +1,139 @@
+"""
+LLM调度器单元测试
+
+测试 LLMScheduler 的并发上限、优先级排队、取消处理和统计
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_scheduler import LLMPriority, LLMScheduler
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    """创建指定并发上限的新调度器（绕过单例缓存）"""
+    def factory(max_concurrency: int) -> LLMScheduler:
+        monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", max_concurrency)
+        monkeypatch.setattr(LLMScheduler, "_instance", None)
+        return LLMScheduler()
+    return factory
+
+
+class TestLLMScheduler:
+    """LLM调度器测试类"""
+
+    async def test_concurrency_limit(self, make_scheduler):
+        """测试同时持有名额的请求数不超过上限"""
+        scheduler = make_scheduler(2)
+        active = 0
+        peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with scheduler.slot(LLMPriority.INTERACTIVE):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+
+        assert peak == 2
+        assert scheduler.get_stats()["active"] == 0
+
+    async def test_priority_order(self, make_scheduler):
+        """测试名额释放后按优先级移交（回合 > 开局 > 预生成 > 摘要）"""
+        scheduler = make_scheduler(1)
+        order = []
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(LLMPriority.INTERACTIVE):
+                await release.wait()
+
+        async def call(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+
+        blocker = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(call(p))
+            for p in (LLMPriority.SUMMARY, LLMPriority.SPECULATIVE, LLMPriority.INTERACTIVE, LLMPriority.START)
+        ]
+        await asyncio.sleep(0)
+
+        assert scheduler.get_stats()["queue_depth"] == 4
+        release.set()
+        await asyncio.gather(blocker, *waiters)
+
+        assert order == [
+            LLMPriority.INTERACTIVE,
+            LLMPriority.START,
+            LLMPriority.SPECULATIVE,
+            LLMPriority.SUMMARY,
+        ]
+
+    async def test_cancelled_waiter_does_not_leak_slot(self, make_scheduler):
+        """测试排队中被取消的请求不占用名额、不阻挡后续请求"""
+        scheduler = make_scheduler(1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(LLMPriority.INTERACTIVE):
+                await release.wait()
+
+        async def call():
+            async with scheduler.slot(LLMPriority.SPECULATIVE):
+                return "ok"
+
+        blocker = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        doomed = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        doomed.cancel()
+        await asyncio.gather(doomed, return_exceptions=True)
+
+        release.set()
+        await blocker
+
+        assert await asyncio.wait_for(call(), timeout=1) == "ok"
+        stats = scheduler.get_stats()
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+        assert stats["priorities"]["speculative"]["cancelled"] == 1
+
+    async def test_cancel_and_release_same_tick(self, make_scheduler):
+        """测试排队请求被取消、同一轮事件循环中名额释放时，取消原样抛出且名额移交给下一个"""
+        scheduler = make_scheduler(1)
+        await scheduler._acquire(LLMPriority.INTERACTIVE)
+        doomed = asyncio.create_task(scheduler._acquire(LLMPriority.SPECULATIVE))
+        follower = asyncio.create_task(scheduler._acquire(LLMPriority.SUMMARY))
+        await asyncio.sleep(0)
+
+        doomed.cancel()
+        scheduler._release()
+        results = await asyncio.gather(doomed, return_exceptions=True)
+        await asyncio.wait_for(follower, timeout=1)
+
+        assert isinstance(results[0], asyncio.CancelledError)
+        scheduler._release()
+        stats = scheduler.get_stats()
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+
+    async def test_wait_time_stats(self, make_scheduler):
+        """测试排队等待时间计入对应优先级"""
+        scheduler = make_scheduler(1)
+
+        async def call(priority, hold):
+            async with scheduler.slot(priority):
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(call(LLMPriority.START, 0.02), call(LLMPriority.SUMMARY, 0))
+
+        summary = scheduler.get_stats()["priorities"]["summary"]
+        assert summary["queued"] == 1
+        assert summary["max_wait_ms"] >= 15
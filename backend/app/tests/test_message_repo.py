@@ -0,0 +1,128 @@
+"""
+消息仓库单元测试
+
+测试尾部窗口读取：最新的N条、游标之后的消息、同一时间戳的消息按id区分；
+历史分页（向前翻页、按时间顺序导出）和游标编码；
+以及窗口查询按 idx_session_messages 顺序读取（无临时排序），旧库的索引在初始化时重建
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from app.models.database import Base, Message
+from app.repositories.database import _rebuild_changed_indexes
+from app.repositories.message_repo import MessageCursor, MessageRepository
+from app.repositories.session_repo import SessionRepository
+
+
+async def add_messages(db, session_id: str, count: int, same_time: bool = False) -> None:
+    """按时间顺序插入消息"""
+    start = datetime(2024, 1, 1)
+    for index in range(count):
+        db.add(Message(
+            id=f"m{index:03d}",
+            session_id=session_id,
+            role="user",
+            content=f"消息{index}",
+            tokens=1,
+            created_at=start if same_time else start + timedelta(seconds=index),
+        ))
+    await db.commit()
+
+
+class TestMessageWindow:
+    """消息窗口测试类"""
+
+    async def test_tail_window_returns_newest_in_order(self, db):
+        """测试 limit 返回最新的N条，并按时间顺序排列"""
+        session_id = await SessionRepository(db).create(seed=1)
+        await add_messages(db, session_id, 30)
+        repo = MessageRepository(db)
+
+        window = await repo.get_window(session_id, limit=5)
+
+        assert [row.content for row in window] == [f"消息{i}" for i in range(25, 30)]
+        assert set(window[0]._fields) == {"id", "role", "content", "tokens", "created_at"}
+        entities = await repo.get_by_session(session_id, limit=3)
+        assert [message.content for message in entities] == ["消息27", "消息28", "消息29"]
+
+    async def test_after_cursor(self, db):
+        """测试游标之后的消息（同一时间戳按id区分）和时间水位线"""
+        session_id = await SessionRepository(db).create(seed=1)
+        await add_messages(db, session_id, 6, same_time=True)
+        repo = MessageRepository(db)
+
+        window = await repo.get_window(session_id, after=MessageCursor(datetime(2024, 1, 1), "m002"))
+        assert [row.id for row in window] == ["m003", "m004", "m005"]
+
+        window = await repo.get_window(session_id, limit=2, after=MessageCursor(datetime(2024, 1, 1), "m002"))
+        assert [row.id for row in window] == ["m004", "m005"]
+
+        assert await repo.get_window(session_id, after=datetime(2024, 1, 1)) == []
+
+    async def test_pages_cover_history_once(self, db):
+        """测试向前翻页和向后导出都不重不漏（包括同一时间戳的消息）"""
+        session_id = await SessionRepository(db).create(seed=1)
+        await add_messages(db, session_id, 25, same_time=True)
+        repo = MessageRepository(db)
+
+        pages, before = [], None
+        while True:
+            page = await repo.get_page(session_id, 10, before=before)
+            pages = page + pages
+            if len(page) < 10:
+                break
+            before = MessageCursor.of(page[0])
+        assert [row.id for row in pages] == [f"m{i:03d}" for i in range(25)]
+
+        exported, after = [], None
+        while True:
+            batch = await repo.get_after(session_id, 10, after=after)
+            exported += batch
+            if len(batch) < 10:
+                break
+            after = MessageCursor.of(batch[-1])
+        assert [row.id for row in exported] == [f"m{i:03d}" for i in range(25)]
+
+    def test_cursor_encoding(self):
+        """测试游标编码往返，无效游标抛出 ValueError"""
+        cursor = MessageCursor(datetime(2024, 1, 1, 8, 30, 0, 123456), "m001")
+
+        assert MessageCursor.decode(cursor.encode()) == cursor
+        with pytest.raises(ValueError):
+            MessageCursor.decode("bad")
+
+    async def test_window_uses_index_order(self, db, engine):
+        """测试窗口查询（最新N条、游标之后）按索引顺序读取，不需要临时排序"""
+        session_id = await SessionRepository(db).create(seed=1)
+        await add_messages(db, session_id, 5)
+        repo = MessageRepository(db)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        await repo.get_window(session_id, limit=2)
+        await repo.get_window(session_id, after=MessageCursor(datetime(2024, 1, 1), "m002"))
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        for statement, parameters in statements:
+            rows = (await (await db.connection()).exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            details = " ".join(row[-1] for row in rows)
+            assert "idx_session_messages" in details
+            assert "TEMP B-TREE" not in details
+
+    async def test_changed_index_rebuilt(self, engine):
+        """测试旧库中列不一致的同名索引在初始化时重建"""
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("DROP INDEX idx_session_messages"))
+            await conn.execute(text("CREATE INDEX idx_session_messages ON messages (session_id, created_at)"))
+            await conn.run_sync(_rebuild_changed_indexes)
+            indexes = await conn.run_sync(
+                lambda sync_conn: {index["name"]: index["column_names"] for index in inspect(sync_conn).get_indexes("messages")}
+            )
+
+        assert indexes["idx_session_messages"] == ["session_id", "created_at", "id"]
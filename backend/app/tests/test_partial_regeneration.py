@@ -0,0 +1,105 @@
+"""
+初始回合局部重生成单元测试
+
+测试 plan_initial_repair 的片段识别和本地修复、提示词内容，以及 merge_repair 合并后通过验证
+"""
+import copy
+
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.services.content_validator import ContentValidator
+from app.services.partial_regeneration import build_repair_prompt, merge_repair, plan_initial_repair
+
+
+VALID_INITIAL = {
+    "game_meta": {"company_type": "互联网大厂", "style_type": "互联网黑话风", "seed_used": 1},
+    "company_info": {"name": "摸鱼科技", "type": "互联网大厂", "culture": "996", "atmosphere": "紧张"},
+    "npcs": [
+        {"id": "boss_1", "name": "王总", "role": "老板", "personality": "爱画饼"},
+        {"id": "npc_2", "name": "小李", "role": "同事", "personality": "八卦"},
+        {"id": "npc_3", "name": "张姐", "role": "HR", "personality": "严厉"},
+    ],
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "story_context": "你第一天来到摸鱼科技。",
+    "choices": [
+        {"id": "work_1", "text": "认真工作", "category": "work", "effects": {"progress": 5}},
+        {"id": "slack_1", "text": "假装忙碌", "category": "slack", "effects": {"chill": 5}},
+        {"id": "social_1", "text": "认识同事", "category": "social", "effects": {"connection": 5}},
+    ],
+}
+
+
+def make_initial(**overrides) -> dict:
+    """构造初始回合（覆盖部分字段）"""
+    result = copy.deepcopy(VALID_INITIAL)
+    result.update(copy.deepcopy(overrides))
+    return result
+
+
+class TestPartialRegeneration:
+    """局部重生成测试类"""
+
+    def test_plans_only_invalid_fragments(self):
+        """测试只列出缺字段的NPC和缺少的选项"""
+        result = make_initial()
+        del result["npcs"][2]["personality"]
+        result["choices"] = result["choices"][:2]
+
+        plan = plan_initial_repair(result, seed=1, max_fragments=4)
+
+        assert plan.complete_npcs == [2]
+        assert plan.new_choices == 1
+        assert plan.fragment_count == 2
+        assert plan.max_tokens < 1024
+        prompt = build_repair_prompt(result, plan)
+        assert "personality" in prompt
+        assert "新增1个选项" in prompt
+
+    def test_merge_then_validate(self):
+        """测试合并片段后通过验证，已有字段不被覆盖"""
+        result = make_initial()
+        del result["npcs"][2]["personality"]
+        result["choices"] = result["choices"][:2]
+        plan = plan_initial_repair(result, seed=1, max_fragments=4)
+
+        merge_repair(result, plan, {
+            "npcs": [{"id": "x", "name": "改名", "role": "HR", "personality": "刀子嘴豆腐心"}],
+            "choices": [{"id": "work_1", "text": "去茶水间", "category": "rest", "effects": {"energy": 5}}],
+        })
+
+        is_valid, errors = ContentValidator.validate_initial_response(result)
+        assert is_valid, errors
+        assert result["npcs"][2] == {"id": "npc_3", "name": "张姐", "role": "HR", "personality": "刀子嘴豆腐心"}
+        assert len({choice["id"] for choice in result["choices"]}) == 3
+
+    def test_renumbered_ids_unique(self):
+        """测试新增元素重新编号时跳过已被占用的 id"""
+        result = make_initial(choices=[
+            {"id": "choice_3", "text": "认真工作", "category": "work", "effects": {"progress": 5}},
+            {"id": "choice_4", "text": "假装忙碌", "category": "slack", "effects": {"chill": 5}},
+        ])
+        plan = plan_initial_repair(result, seed=1, max_fragments=4)
+
+        merge_repair(result, plan, {
+            "choices": [{"id": "choice_3", "text": "去茶水间", "category": "rest", "effects": {"energy": 5}}],
+        })
+
+        assert [choice["id"] for choice in result["choices"]] == ["choice_3", "choice_4", "choice_5"]
+        assert ContentValidator.validate_initial_response(result)[0]
+
+    def test_local_fixes_need_no_model_call(self):
+        """测试缺失的玩家状态、元数据和多余选项在本地修复"""
+        result = make_initial(choices=VALID_INITIAL["choices"] * 3)
+        del result["player_state"]
+        del result["game_meta"]
+
+        plan = plan_initial_repair(result, seed=1, max_fragments=4)
+
+        assert plan.fragment_count == 0
+        assert set(plan.local_fixes) == {"player_state", "game_meta", "choices"}
+        assert ContentValidator.validate_initial_response(result)[0]
+
+    def test_too_many_fragments(self):
+        """测试无效片段过多时放弃局部重生成"""
+        result = make_initial(npcs=[], choices=[])
+
+        assert plan_initial_repair(result, seed=1, max_fragments=4) is None
@@ -0,0 +1,178 @@
+"""
+多供应商路由单元测试
+
+测试 ProviderRouter 的端点选择、自动切换、冷却、限流余量解析和结构化输出降级
+"""
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from app.services.provider_router import ProviderEndpoint, ProviderRouter
+
+
+def make_status_error(error_cls, status_code: int, headers: dict = None, message: str = "error"):
+    """构造带响应的 openai 状态错误"""
+    request = httpx.Request("POST", "https://llm.example.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_cls(message, response=response, body=None)
+
+
+class FakeClient:
+    """模拟 AsyncOpenAI 的 chat.completions.with_raw_response.create"""
+
+    def __init__(self, result=None, error=None, headers=None):
+        self.calls = []
+        self._result = result
+        self._error = error
+        self._headers = headers or {}
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(
+                with_raw_response=SimpleNamespace(create=self._create)
+            )
+        )
+
+    async def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self._error is not None:
+            raise self._error
+        return SimpleNamespace(headers=self._headers, parse=lambda: self._result)
+
+
+class NoSchemaClient(FakeClient):
+    """只支持 json_object 的供应商"""
+
+    async def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("response_format", {}).get("type") == "json_schema":
+            raise make_status_error(BadRequestError, 400, message="response_format json_schema is not supported")
+        return SimpleNamespace(headers={}, parse=lambda: "ok")
+
+
+SCHEMA_FORMAT = {"type": "json_schema", "json_schema": {"name": "t", "schema": {"type": "object"}}}
+
+
+class TestProviderEndpoint:
+    """端点健康状态测试类"""
+
+    def test_rate_limit_headers_update_headroom(self):
+        """测试从响应头读取限流余量"""
+        endpoint = ProviderEndpoint(name="a", client=None)
+        endpoint.record_success(0.5, {
+            "x-ratelimit-remaining-requests": "25",
+            "x-ratelimit-limit-requests": "100",
+        })
+
+        assert endpoint.headroom() == 0.25
+        assert endpoint.latency == 0.5
+
+    def test_rate_limited_endpoint_cools_down(self):
+        """测试 429 后按 retry-after 冷却且余量归零"""
+        endpoint = ProviderEndpoint(name="a", client=None)
+        endpoint.record_failure(make_status_error(RateLimitError, 429, {"retry-after": "30"}))
+
+        stats = endpoint.get_stats()
+        assert stats["cooling_down"] is True
+        assert stats["failures"] == 1
+        assert endpoint.error_rate > 0
+
+
+class TestProviderRouter:
+    """供应商路由器测试类"""
+
+    async def test_failover_on_rate_limit(self):
+        """测试端点限流时自动切换到其他端点"""
+        limited = FakeClient(error=make_status_error(RateLimitError, 429))
+        healthy = FakeClient(result="ok")
+        router = ProviderRouter([
+            ProviderEndpoint(name="limited", client=limited, weight=100),
+            ProviderEndpoint(name="healthy", client=healthy, weight=0.01),
+        ])
+        # 让 limited 端点得分最高，确保先被选中
+        router.endpoints[1].latency = 10.0
+        router._rng.seed(0)
+
+        assert await router.create(model="m", messages=[]) == "ok"
+        assert len(limited.calls) == 1
+        assert router.get_stats()["failovers"] == 1
+
+    async def test_request_errors_do_not_failover(self):
+        """测试请求本身错误（400）直接抛出，不切换端点"""
+        bad = FakeClient(error=make_status_error(BadRequestError, 400))
+        other = FakeClient(result="ok")
+        router = ProviderRouter([
+            ProviderEndpoint(name="bad", client=bad),
+            ProviderEndpoint(name="other", client=other, weight=0.0001),
+        ])
+        router.endpoints[1].latency = 100.0
+        router._rng.seed(0)
+
+        with pytest.raises(BadRequestError):
+            await router.create(model="m", messages=[])
+        assert other.calls == []
+
+    async def test_all_endpoints_failing_raises_last_error(self):
+        """测试所有端点都失败时抛出错误"""
+        router = ProviderRouter([
+            ProviderEndpoint(name="a", client=FakeClient(error=make_status_error(RateLimitError, 429))),
+            ProviderEndpoint(name="b", client=FakeClient(error=make_status_error(RateLimitError, 429))),
+        ])
+
+        with pytest.raises(RateLimitError):
+            await router.create(model="m", messages=[])
+
+    async def test_prefers_faster_endpoint(self):
+        """测试同权重下偏向延迟更低的端点"""
+        fast = FakeClient(result="fast")
+        slow = FakeClient(result="slow")
+        router = ProviderRouter([
+            ProviderEndpoint(name="fast", client=fast),
+            ProviderEndpoint(name="slow", client=slow),
+        ])
+        router.endpoints[0].latency = 0.2
+        router.endpoints[1].latency = 5.0
+        router._rng.seed(0)
+
+        results = [await router.create(model="m", messages=[]) for _ in range(50)]
+
+        assert results.count("fast") > results.count("slow")
+
+    async def test_endpoint_model_overrides_request(self):
+        """测试端点配置的模型覆盖调用方模型"""
+        client = FakeClient(result="ok")
+        router = ProviderRouter([ProviderEndpoint(name="a", client=client, model="gpt-4o-mini")])
+
+        await router.create(model="default-model", messages=[])
+
+        assert client.calls[0]["model"] == "gpt-4o-mini"
+
+    def test_requires_positive_weight(self):
+        """测试没有可用权重的端点时拒绝创建"""
+        with pytest.raises(ValueError):
+            ProviderRouter([ProviderEndpoint(name="a", client=None, weight=0)])
+
+    async def test_downgrades_unsupported_response_format(self):
+        """测试端点不支持 json_schema 时降级为 json_object 重试，之后直接使用降级后的级别"""
+        client = NoSchemaClient()
+        router = ProviderRouter([ProviderEndpoint(name="a", client=client)])
+
+        assert await router.create(model="m", messages=[], response_format=SCHEMA_FORMAT) == "ok"
+        assert await router.create(model="m", messages=[], response_format=SCHEMA_FORMAT) == "ok"
+
+        assert [call["response_format"]["type"] for call in client.calls] == [
+            "json_schema", "json_object", "json_object"
+        ]
+        stats = router.get_stats()["endpoints"][0]
+        assert stats["response_format"] == "json_object"
+        assert stats["failures"] == 0
+
+    async def test_unrelated_bad_request_keeps_response_format(self):
+        """测试与 response_format 无关的400不降级，直接抛出"""
+        client = FakeClient(error=make_status_error(BadRequestError, 400, message="context length exceeded"))
+        router = ProviderRouter([ProviderEndpoint(name="a", client=client)])
+
+        with pytest.raises(BadRequestError):
+            await router.create(model="m", messages=[], response_format=SCHEMA_FORMAT)
+        assert len(client.calls) == 1
+        assert router.endpoints[0].response_format_level == 0
@@ -0,0 +1,90 @@
+"""
+AI响应缓存单元测试
+
+测试 ResponseCache 的LRU顺序、TTL过期、字节预算和统计
+"""
+from unittest.mock import patch
+
+from app.services.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """响应缓存测试类"""
+
+    def test_get_returns_copy(self):
+        """测试读取返回独立副本，修改不会污染缓存"""
+        cache = ResponseCache()
+        cache.set("k", {"npcs": [{"name": "老王"}]})
+
+        value = cache.get("k")
+        value["npcs"].append({"name": "小李"})
+
+        assert cache.get("k") == {"npcs": [{"name": "老王"}]}
+
+    def test_lru_recency(self):
+        """测试访问会刷新顺序，淘汰最久未使用的条目"""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # a 变为最近使用
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """测试条目过期后视为未命中"""
+        cache = ResponseCache(ttl=10)
+        with patch("app.services.response_cache.time.monotonic", return_value=100.0):
+            cache.set("a", {"v": 1})
+            cache.set("b", {"v": 2}, ttl=100)
+
+        with patch("app.services.response_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+            assert cache.get("b") == {"v": 2}
+
+        stats = cache.get_stats()
+        assert stats["expirations"] == 1
+        assert stats["entries"] == 1
+
+    def test_byte_budget(self):
+        """测试总字节数超出预算时按LRU淘汰"""
+        cache = ResponseCache(max_entries=100, max_bytes=50)
+        cache.set("a", "x" * 20)
+        cache.set("b", "y" * 20)
+        cache.set("c", "z" * 20)
+
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 50
+        assert "a" not in cache
+        assert "c" in cache
+
+    def test_oversized_value_rejected(self):
+        """测试单条超过字节预算时拒绝写入"""
+        cache = ResponseCache(max_bytes=10)
+
+        assert cache.set("big", "中文" * 10) is False
+        assert cache.get_stats()["rejected"] == 1
+        assert len(cache) == 0
+
+    def test_overwrite_updates_bytes(self):
+        """测试覆盖写入时字节数正确更新"""
+        cache = ResponseCache()
+        cache.set("a", "x" * 100)
+        cache.set("a", "x")
+
+        assert cache.get_stats()["bytes"] == len('"x"')
+
+    def test_hit_miss_stats(self):
+        """测试命中率统计"""
+        cache = ResponseCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
@@ -0,0 +1,77 @@
+"""
+当前游戏状态单元测试
+
+测试开局和行动事件在同一事务中更新当前状态（玩家状态、NPC名册、公司、最近行动），
+以及状态表上线前的旧会话补齐
+"""
+from sqlalchemy import delete
+
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.models.database import SessionState
+from app.services.session_service import SessionService
+
+
+COMPANY = {"name": "摸鱼科技", "type": "互联网"}
+START_TURN = {
+    "company_info": COMPANY,
+    "npcs": [{"id": "npc_wang", "name": "王总", "role": "老板", "attitude_toward_player": 50}],
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "choices": [{"id": "slack_1", "text": "假装打电话", "effects": {}}],
+}
+
+
+def next_turn(turn: int, attitude: int) -> dict:
+    """一个行动回合（只包含变化的NPC）"""
+    return {
+        "player_state": {**INITIAL_PLAYER_STATE, "turn": turn},
+        "updated_npcs": [{"id": "npc_wang", "attitude_toward_player": attitude}],
+        "choices": [{"id": f"work_{turn}", "text": f"认真汇报{turn}", "effects": {}}],
+        "active_magical_element": {"type": "object", "name": "会说话的打印机"},
+    }
+
+
+class TestSessionState:
+    """当前游戏状态测试类"""
+
+    async def test_state_follows_turns(self, db):
+        """测试每个回合覆盖当前状态，NPC名册与公司信息沿用（上一回合附带公司信息）"""
+        service = SessionService(db)
+        session_id = (await service.create_game("玩家"))["session_id"]
+        await service.record_key_event(session_id, "game_start", {"ai_response": START_TURN})
+        await service.record_key_event(
+            session_id, "action_choice", {"choice_id": "slack_1", "ai_response": next_turn(1, 40)}
+        )
+        await service.record_key_event(
+            session_id, "action_choice", {"choice_id": "work_1", "ai_response": next_turn(2, 45)}
+        )
+
+        state = await service.get_current_state(session_id)
+
+        assert state["turn"] == 2 and state["player_state"]["turn"] == 2
+        assert state["company_info"] == COMPANY
+        assert state["npcs"] == [{**START_TURN["npcs"][0], "attitude_toward_player": 45}]
+        assert [action["choice_text"] for action in state["recent_actions"]] == ["假装打电话", "认真汇报1"]
+        assert state["magical_element"]["name"] == "会说话的打印机"
+        last_turn = await service.get_last_turn(session_id)
+        assert last_turn["choices"][0]["id"] == "work_2"
+        assert last_turn["company_info"] == COMPANY
+
+    async def test_existing_session_backfilled(self, db):
+        """测试没有状态记录的旧会话：读取回退到事件，下一回合从事件补齐公司信息"""
+        service = SessionService(db)
+        session_id = (await service.create_game("玩家"))["session_id"]
+        await service.record_key_event(session_id, "game_start", {"ai_response": START_TURN})
+        await db.execute(delete(SessionState))
+        await db.commit()
+        db.expunge_all()
+
+        assert await service.get_current_state(session_id) is None
+        assert (await service.get_last_turn(session_id))["company_info"] == COMPANY
+
+        await service.record_key_event(
+            session_id, "action_choice", {"choice_id": "slack_1", "ai_response": next_turn(1, 40)}
+        )
+        state = await service.get_current_state(session_id)
+
+        assert state["company_info"] == COMPANY
+        assert state["recent_actions"] == [{"choice_id": "slack_1", "choice_text": "假装打电话"}]
@@ -0,0 +1,90 @@
+"""
+会话统计单元测试
+
+测试计数随消息、事件、摘要写入增量更新，以及旧会话从历史回填（并发回填不冲突）
+"""
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.database import SessionStats
+from app.repositories import stats_repo
+from app.repositories.stats_repo import SessionStatsRepository, insert_stats_if_missing
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.context_service import ContextService
+from app.services.session_service import SessionService
+
+
+class FakeSummaryAI:
+    """只实现 create_summary 的AI服务"""
+
+    async def create_summary(self, text: str) -> str:
+        return "摘要"
+
+
+class TestSessionStats:
+    """会话统计测试类"""
+
+    async def test_counters_follow_writes(self, db):
+        """测试消息、回合和摘要计数在写入时更新"""
+        session_service = SessionService(db)
+        context_service = ContextService(db, FakeSummaryAI())
+        session_id = (await session_service.create_game("玩家"))["session_id"]
+
+        for index in range(6):
+            await context_service.add_message(session_id, "user", "字" * 20)
+            await session_service.record_key_event(session_id, "action_choice", {"choice_id": f"c{index}"})
+        messages = await context_service.get_messages(session_id)
+        await context_service.create_summary(session_id, messages[:3])
+
+        stats = await context_service.get_token_stats(session_id)
+        assert stats["total_messages"] == 7
+        assert stats["total_tokens"] == 6 * 10
+        assert stats["turn_count"] == 6
+        assert stats["summarized_tokens"] == 2 * 10
+        assert await context_service._count_unsummarized_tokens(session_id) == 4 * 10
+
+    async def test_backfill_for_existing_session(self, db):
+        """测试统计记录缺失的旧会话从历史回填，之后继续增量更新"""
+        session_service = SessionService(db)
+        context_service = ContextService(db, FakeSummaryAI())
+        session_id = (await session_service.create_game("玩家"))["session_id"]
+        await context_service.add_message(session_id, "user", "字" * 20)
+        await session_service.record_key_event(session_id, "action_choice", {"choice_id": "c1"})
+        await db.execute(delete(SessionStats))
+        await db.commit()
+        db.expunge_all()
+
+        await context_service.add_message(session_id, "assistant", "字" * 40)
+        stats = await context_service.get_token_stats(session_id)
+
+        assert stats["total_messages"] == 3
+        assert stats["total_tokens"] == 30
+        assert stats["turn_count"] == 1
+        missing = await context_service.get_token_stats("missing")
+        assert missing["total_messages"] == 0 and missing["last_activity"] is None
+
+    @pytest.mark.parametrize("upsert", [True, False])
+    async def test_concurrent_backfill_keeps_existing_row(self, db, monkeypatch, upsert):
+        """测试另一个请求已先回填时，插入冲突被忽略并返回已有记录（不支持 ON CONFLICT 的方言用保存点）"""
+        if not upsert:
+            monkeypatch.setattr(stats_repo, "_UPSERT_INSERTS", {})
+        session_service = SessionService(db)
+        session_id = (await session_service.create_game("玩家"))["session_id"]
+        await ContextService(db, None).add_message(session_id, "user", "字" * 20)
+        await UnitOfWork(db).commit()
+
+        # 模拟两个请求都读到记录缺失后，另一个请求先完成了回填
+        stats = await SessionStatsRepository(db)._backfill(session_id)
+
+        assert stats.message_count == 2
+        assert (await db.execute(select(func.count()).select_from(SessionStats))).scalar_one() == 1
+
+    def test_backfill_insert_compiles_per_dialect(self):
+        """测试回填插入语句在 PostgreSQL 和 SQLite 下都编译为 ON CONFLICT DO NOTHING"""
+        values = {"session_id": "s1", "message_count": 0, "token_total": 0, "summarized_token_total": 0, "turn_count": 0}
+
+        for name, dialect in (("postgresql", postgresql.dialect()), ("sqlite", sqlite.dialect())):
+            sql = str(insert_stats_if_missing(name, values).compile(dialect=dialect))
+            assert "ON CONFLICT (session_id) DO NOTHING" in sql
+        assert insert_stats_if_missing("mysql", values) is None
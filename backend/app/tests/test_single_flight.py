@@ -0,0 +1,86 @@
+"""
+请求合并单元测试
+
+测试 SingleFlight 的结果共享、异常传递和键释放
+"""
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """请求合并测试类"""
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """测试并发的相同请求只执行一次并共享结果"""
+        flights = SingleFlight()
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"story": "摸鱼"}
+
+        results = await asyncio.gather(*(flights.do("k", factory) for _ in range(5)))
+
+        assert calls == 1
+        assert all(r is results[0] for r in results)
+        stats = flights.get_stats()
+        assert stats["leaders"] == 1
+        assert stats["coalesced"] == 4
+
+    async def test_failure_propagated_to_all_waiters(self):
+        """测试失败只发生一次，所有等待者收到同一个异常"""
+        flights = SingleFlight()
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("AI超时")
+
+        results = await asyncio.gather(
+            *(flights.do("k", factory) for _ in range(3)), return_exceptions=True
+        )
+
+        assert calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flights.get_stats()["failed"] == 1
+
+    async def test_key_released_after_completion(self):
+        """测试调用结束后相同键会重新执行"""
+        flights = SingleFlight()
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flights.do("k", factory) == 1
+        assert await flights.do("k", factory) == 2
+        assert flights.get_stats()["in_flight"] == 0
+
+    async def test_leader_cancellation_does_not_cancel_followers(self):
+        """测试 leader 请求被取消时 follower 仍拿到结果"""
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def factory():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        leader = asyncio.create_task(flights.do("k", factory))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("k", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
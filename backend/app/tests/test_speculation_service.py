@@ -0,0 +1,175 @@
+"""
+投机预生成服务单元测试
+
+使用可控完成时机的假AI服务测试 SpeculativeTurnService：
+1. 命中返回预生成结果并取消其他分支，未命中返回None
+2. 选中的分支仍在生成时只等待有限时间，超时取消并按未命中处理
+3. 过期结果不再使用，长时间无调度的预算记录被清理
+4. 单会话预算限制预生成数量
+5. 丢弃/结束会话时取消进行中的分支
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.services import speculation_service
+from app.services.speculation_service import SpeculativeTurnService
+
+
+TURN = {
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "choices": [
+        {"id": "slack_1", "text": "假装看文档", "category": "slack", "effects": {"chill": 10}},
+        {"id": "work_1", "text": "认真开会", "category": "work", "effects": {"progress": 5}},
+    ],
+}
+
+
+class FakeTurnAI:
+    """每个分支等待对应事件后返回的AI服务"""
+
+    def __init__(self):
+        self.gates = {}
+        self.cancelled = []
+
+    def gate(self, choice_id: str) -> asyncio.Event:
+        return self.gates.setdefault(choice_id, asyncio.Event())
+
+    async def generate_next_turn(self, context, user_action, seed, priority, resolution, previous_turn):
+        try:
+            await self.gate(user_action).wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(user_action)
+            raise
+        return {"story_context": f"选择了{user_action}", "context": context}
+
+
+class FakeContextService:
+    """返回固定上下文的上下文服务"""
+
+    def __init__(self, db, ai_service):
+        pass
+
+    async def get_context_for_ai(self, session_id: str) -> list:
+        return [{"role": "assistant", "content": "上一回合"}]
+
+
+@pytest.fixture
+def make_service(monkeypatch, engine):
+    """创建使用假AI服务的新实例（绕过单例缓存）"""
+    ai = FakeTurnAI()
+    monkeypatch.setattr(speculation_service, "AIServiceV2", lambda: ai)
+    monkeypatch.setattr(speculation_service, "ContextService", FakeContextService)
+    monkeypatch.setattr(speculation_service, "async_session_maker", async_sessionmaker(engine))
+
+    def factory(**overrides) -> SpeculativeTurnService:
+        values = {
+            "SPECULATIVE_ENABLED": True,
+            "SPECULATIVE_MAX_CONCURRENCY": 4,
+            "SPECULATIVE_SESSION_BUDGET": 30,
+            "SPECULATIVE_TTL": 300,
+            "SPECULATIVE_TAKE_WAIT": 1.0,
+            **overrides,
+        }
+        for key, value in values.items():
+            monkeypatch.setattr(settings, key, value)
+        monkeypatch.setattr(SpeculativeTurnService, "_instance", None)
+        service = SpeculativeTurnService()
+        service.ai = ai
+        return service
+    return factory
+
+
+async def settle() -> None:
+    """让后台的准备任务启动分支"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSpeculativeTurnService:
+    """投机预生成服务测试类"""
+
+    async def test_hit_cancels_other_branches(self, make_service):
+        """测试命中返回分支结果（上下文附带玩家行动），其他分支被取消"""
+        service = make_service()
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+        service.ai.gate("slack_1").set()
+
+        result = await service.take("s1", "slack_1")
+        await settle()
+
+        assert result["story_context"] == "选择了slack_1"
+        assert result["context"][-1] == {"role": "user", "content": "slack_1"}
+        assert service.ai.cancelled == ["work_1"]
+        stats = service.get_stats()
+        assert stats["hits"] == 1 and stats["cancelled"] == 1
+
+    async def test_miss(self, make_service):
+        """测试未调度的会话和未预生成的选项返回None"""
+        service = make_service()
+        assert await service.take("missing", "slack_1") is None
+
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+        assert await service.take("s1", "other") is None
+        assert service.get_stats()["misses"] == 1
+
+    async def test_late_branch_not_awaited(self, make_service):
+        """测试选中的分支仍在生成时只等待有限时间，超时取消"""
+        service = make_service()
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+
+        start = time.monotonic()
+        result = await service.take("s1", "slack_1", wait=0.05)
+        await settle()
+
+        assert result is None
+        assert time.monotonic() - start < 0.5
+        assert sorted(service.ai.cancelled) == ["slack_1", "work_1"]
+        assert service.get_stats()["late"] == 1
+
+    async def test_ttl_expiry_and_sweep(self, make_service):
+        """测试过期的结果不再使用，长时间无调度的会话预算记录被清理"""
+        service = make_service()
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+        service._sessions["s1"].created_at -= 1000
+
+        assert await service.take("s1", "slack_1") is None
+
+        service._scheduled_at["s1"] -= 1000
+        service.schedule("s2", TURN, seed=1)
+        assert "s1" not in service._spent and "s1" not in service._scheduled_at
+        assert service._spent["s2"] == 2
+        service.end_session("s2")
+
+    async def test_session_budget(self, make_service):
+        """测试会话累计预生成数量不超过预算"""
+        service = make_service(SPECULATIVE_SESSION_BUDGET=3)
+        service.schedule("s1", TURN, seed=1)
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+
+        assert list(service._sessions["s1"].tasks) == ["slack_1"]
+        service.schedule("s1", TURN, seed=1)
+        assert "s1" not in service._sessions
+        assert service.get_stats()["budget_exhausted"] == 2
+
+    async def test_end_session_cancels_branches(self, make_service):
+        """测试结束会话时取消进行中的分支并释放预算记录"""
+        service = make_service()
+        service.schedule("s1", TURN, seed=1)
+        await settle()
+
+        service.end_session("s1")
+        await settle()
+
+        assert sorted(service.ai.cancelled) == ["slack_1", "work_1"]
+        assert "s1" not in service._spent
+        assert service.get_stats()["active_sessions"] == 0
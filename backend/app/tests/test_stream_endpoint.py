@@ -0,0 +1,163 @@
+"""
+流式提交行动端点测试
+
+使用假的流式AI服务和临时文件SQLite数据库测试 /act/stream：
+1. 事件顺序：剧情增量 → 单个选项 → 选项列表 → 玩家状态 → done，回合在推流结束后持久化
+2. 推送剧情之前流式生成失败时改由本地生成器出回合
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import endpoints
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.models.database import Base
+from app.repositories.database import get_db_session
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.context_service import ContextService
+from app.services.fallback_turn_engine import FallbackTurnEngine
+from app.services.session_service import SessionService
+
+
+START_TURN = {
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "npcs": [{"id": "npc_wang", "name": "王总", "role": "老板"}],
+    "choices": [{"id": "choice_slack_1", "text": "假装看文档", "category": "slack", "effects": {"chill": 10}}],
+}
+
+STORY_PARTS = ["你打开文档，", "目光却飘向了窗外。"]
+
+
+class FakeStreamingAI:
+    """只实现流式回合和摘要的AI服务（回合内容借用本地生成器）"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.fallback_engine = FallbackTurnEngine()
+
+    async def stream_next_turn(self, context, user_action, seed, resolution=None, previous_turn=None):
+        if self.fail:
+            raise TimeoutError("供应商超时")
+        turn = FallbackTurnEngine().generate_next_turn(previous_turn, user_action, seed, resolution=resolution)
+        turn["story_context"] = "".join(STORY_PARTS)
+        for part in STORY_PARTS:
+            yield "story", part
+        for choice in turn["choices"]:
+            yield "choice", choice
+        yield "result", turn
+
+    async def create_summary(self, text: str) -> str:
+        return "摘要"
+
+
+class FakeSpeculator:
+    """没有预生成结果的投机服务，记录调度调用"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    async def take(self, session_id: str, choice_id: str):
+        return None
+
+    def schedule(self, session_id, ai_response, seed, difficulty="normal"):
+        self.scheduled.append(session_id)
+
+    def end_session(self, session_id: str) -> None:
+        pass
+
+
+@pytest.fixture
+async def maker(tmp_path, monkeypatch):
+    """临时文件数据库（推流结束后端点用独立会话持久化）"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'game.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(endpoints, "async_session_maker", maker)
+    yield maker
+    await engine.dispose()
+
+
+async def start_game(maker) -> str:
+    """创建一局已开局的游戏"""
+    async with maker() as db:
+        service = SessionService(db)
+        session_id = (await service.create_game("玩家"))["session_id"]
+        await service.record_key_event(session_id, "game_start", {"ai_response": START_TURN})
+        await UnitOfWork(db).commit()
+    return session_id
+
+
+async def post_stream(maker, ai, speculator, session_id: str) -> list:
+    """调用 /act/stream 并解析事件列表 [(事件名, 数据)]"""
+    async def db_session():
+        async with maker() as db:
+            yield db
+            await UnitOfWork(db).commit()
+
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/game")
+    app.dependency_overrides[get_db_session] = db_session
+    app.dependency_overrides[endpoints.get_ai_service] = lambda: ai
+    app.dependency_overrides[endpoints.get_speculative_service] = lambda: speculator
+    app.dependency_overrides[endpoints.get_context_service] = lambda db=endpoints.Depends(get_db_session): (
+        ContextService(db, ai)
+    )
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/game/act/stream", json={"session_id": session_id, "choice_id": "choice_slack_1"}
+        )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        name, data = frame.split("\n", 1)
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def stored_roles(maker, session_id: str) -> list:
+    """会话已提交的消息角色"""
+    async with maker() as db:
+        return [message.role for message in await ContextService(db, None).get_messages(session_id)]
+
+
+class TestActStream:
+    """流式提交行动测试类"""
+
+    async def test_event_order_and_persist(self, maker):
+        """测试剧情增量、选项、玩家状态、done 的推送顺序，推流结束后回合已提交并调度预生成"""
+        session_id = await start_game(maker)
+        speculator = FakeSpeculator()
+
+        events = await post_stream(maker, FakeStreamingAI(), speculator, session_id)
+        names = [name for name, _ in events]
+
+        assert names[:2] == ["story", "story"]
+        assert [data["delta"] for name, data in events if name == "story"] == STORY_PARTS
+        assert names[-3:] == ["choices", "player_state", "done"]
+        assert set(names[2:-3]) == {"choice"}
+        streamed = [data["choice"]["id"] for name, data in events if name == "choice"]
+        assert streamed == [choice["id"] for choice in events[-3][1]["choices"]]
+        assert events[-1][1]["player_state"]["turn"] == 1
+
+        assert await stored_roles(maker, session_id) == ["system", "user", "assistant"]
+        assert speculator.scheduled == [session_id]
+
+    async def test_fallback_before_story(self, maker):
+        """测试推送剧情之前流式生成失败时由本地生成器出回合"""
+        session_id = await start_game(maker)
+        ai = FakeStreamingAI(fail=True)
+
+        events = await post_stream(maker, ai, FakeSpeculator(), session_id)
+        names = [name for name, _ in events]
+
+        assert names == ["story", "choices", "player_state", "done"]
+        assert events[0][1]["delta"].startswith("你决定：假装看文档")
+        assert events[-1][1]["player_state"]["turn"] == 1
+        assert ai.fallback_engine.get_stats()["error"] == 1
+        assert await stored_roles(maker, session_id) == ["system", "user", "assistant"]
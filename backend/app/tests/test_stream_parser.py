@@ -0,0 +1,96 @@
+"""
+流式回合解析器单元测试
+
+测试 TurnStreamParser 的增量产出、任意切分下的一致性和异常输入处理
+"""
+import json
+
+import pytest
+
+from app.services.stream_parser import TurnStreamParser, parse_turn_payload
+
+
+SAMPLE_TURN = {
+    "story_context": "你推开会议室的门，老板说：\"来得正好\"\n😀 今天又要画饼了。",
+    "choices": [
+        {"id": "work_1", "text": "认真听讲", "category": "work", "effects": {"energy": -10, "progress": 5}},
+        {"id": "slack_1", "text": "假装记笔记", "category": "slack", "effects": {"chill": 10}},
+        {"id": "social_1", "text": "附和老板", "category": "social", "effects": {"connection": 5}},
+    ],
+    "player_state": {"energy": 90, "chill": 50, "progress": 5, "suspicion": 0},
+    "is_game_over": False,
+    "game_over_reason": None,
+}
+
+
+def _feed_in_chunks(text: str, size: int):
+    """按固定大小切分输入，返回 (解析器, 事件列表)"""
+    parser = TurnStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+class TestTurnStreamParser:
+    """流式解析器测试类"""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 4096])
+    @pytest.mark.parametrize("ensure_ascii", [True, False])
+    def test_any_chunking_yields_same_result(self, size, ensure_ascii):
+        """测试任意chunk切分都能得到完整结果和完整剧情"""
+        text = json.dumps(SAMPLE_TURN, ensure_ascii=ensure_ascii, indent=2)
+        parser, events = _feed_in_chunks(text, size)
+
+        story = "".join(e.value for e in events if e.kind == "story")
+        assert story == SAMPLE_TURN["story_context"]
+        assert parser.is_complete
+        assert parser.result() == SAMPLE_TURN
+
+    def test_event_order(self):
+        """测试事件按字段完成顺序产出：剧情 → 每个选项 → 玩家状态"""
+        text = json.dumps(SAMPLE_TURN, ensure_ascii=False)
+        _, events = _feed_in_chunks(text, 5)
+
+        first_story = next(i for i, e in enumerate(events) if e.kind == "story")
+        choice_events = [(i, e) for i, e in enumerate(events) if e.kind == "choice"]
+        state_index = next(
+            i for i, e in enumerate(events) if e.kind == "field" and e.key == "player_state"
+        )
+
+        assert [e.index for _, e in choice_events] == [0, 1, 2]
+        assert [e.value["id"] for _, e in choice_events] == ["work_1", "slack_1", "social_1"]
+        assert first_story < choice_events[0][0] < choice_events[-1][0] < state_index
+
+    def test_choice_emitted_before_completion(self):
+        """测试选项闭合后立即产出，不等待整个响应结束"""
+        text = json.dumps(SAMPLE_TURN, ensure_ascii=False)
+        cut = text.index('"slack_1"')
+        parser = TurnStreamParser()
+
+        events = parser.feed(text[:cut])
+
+        assert [e.value["id"] for e in events if e.kind == "choice"] == ["work_1"]
+        assert not parser.is_complete
+
+    def test_markdown_fence_and_plus_numbers(self):
+        """测试代码块包裹和数字前加号"""
+        content = '```json\n{"story_context": "好", "choices": [{"id": "a", "effects": {"progress": +30}}]}\n```'
+
+        result = parse_turn_payload(content)
+
+        assert result["choices"][0]["effects"]["progress"] == 30
+
+    def test_truncated_content_raises(self):
+        """测试被截断的响应无法解析"""
+        with pytest.raises(ValueError):
+            parse_turn_payload('{"story_context": "好", "choices": [{"id": "a"')
+
+    def test_invalid_structure_marks_failed(self):
+        """测试非标准结构（裸键名）标记为失败，交给调用方回退"""
+        parser = TurnStreamParser()
+        parser.feed('{story_context: "好"}')
+
+        assert parser.failed
+        with pytest.raises(ValueError):
+            parser.result()
@@ -0,0 +1,45 @@
+"""
+结构化输出约束单元测试
+
+测试由 Pydantic 模型生成的回合 Schema 与内容校验、紧凑格式一致
+"""
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.services.content_validator import ContentValidator
+from app.services.structured_output import NextTurnOutput, build_response_format
+
+
+class TestStructuredOutput:
+    """结构化输出测试类"""
+
+    def test_initial_schema_requires_validated_fields(self):
+        """测试初始回合 Schema 的必填字段覆盖内容校验要求的字段"""
+        schema = build_response_format("initial_turn", "json_schema")["json_schema"]["schema"]
+
+        assert {"game_meta", "company_info", "npcs", "player_state", "story_context", "choices"} <= set(
+            schema["required"]
+        )
+        assert "AIChoice" in schema["$defs"]
+        assert "NPCProfile" in schema["$defs"]
+
+    def test_next_turn_schema_matches_turn_validation(self):
+        """测试符合后续回合 Schema 的内容（加上服务端结算的状态）能通过回合校验"""
+        turn = NextTurnOutput(
+            story_context="王总端着保温杯走了过来，在你身后站了很久，意味深长地叹了口气。",
+            choices=[
+                {"id": f"c{i}", "text": text, "category": "work", "effects": {"energy": -5}}
+                for i, text in enumerate(("认真汇报", "假装打电话", "去茶水间"))
+            ],
+        ).model_dump(exclude_none=True)
+        turn["player_state"] = dict(INITIAL_PLAYER_STATE)
+
+        is_valid, errors = ContentValidator.validate_turn_response(turn)
+        assert is_valid, errors
+        assert set(NextTurnOutput.model_json_schema()["required"]) == {"story_context", "choices"}
+
+    def test_compact_schema_and_modes(self):
+        """测试紧凑格式 Schema 和各约束级别"""
+        compact = build_response_format("next_turn_compact", "json_schema")["json_schema"]["schema"]
+
+        assert compact["required"] == ["s", "c"]
+        assert build_response_format("next_turn", "json_object") == {"type": "json_object"}
+        assert build_response_format("next_turn", "off") is None
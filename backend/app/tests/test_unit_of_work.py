@@ -0,0 +1,86 @@
+"""
+工作单元单元测试
+
+使用临时文件SQLite数据库（两个连接互相隔离）测试：
+1. 一个回合的消息、事件、当前状态和统计在 UnitOfWork.commit() 之前对其他连接不可见，提交后一次可见
+2. 回滚时丢弃累计的统计增量
+"""
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models.database import Base, KeyEvent, Message, SessionState, SessionStats
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.context_service import ContextService
+from app.services.session_service import SessionService
+
+
+async def _snapshot(maker, session_id: str) -> dict:
+    """用另一个连接读取会话的已提交数据"""
+    async with maker() as other:
+        messages = (await other.execute(
+            select(func.count(Message.id)).where(Message.session_id == session_id)
+        )).scalar_one()
+        events = (await other.execute(
+            select(func.count(KeyEvent.id)).where(KeyEvent.session_id == session_id)
+        )).scalar_one()
+        state = await other.get(SessionState, session_id)
+        stats = await other.get(SessionStats, session_id)
+        return {
+            "messages": messages,
+            "events": events,
+            "turn": state.turn if state else None,
+            "message_count": stats.message_count if stats else None,
+            "turn_count": stats.turn_count if stats else None,
+        }
+
+
+class TestUnitOfWork:
+    """工作单元测试类"""
+
+    async def test_turn_committed_once(self, tmp_path):
+        """测试回合写入在提交前不可见，提交后统计正确，整个回合只提交一次"""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'game.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with maker() as db:
+            session_service = SessionService(db)
+            context_service = ContextService(db, None)
+            session_id = (await session_service.create_game("玩家"))["session_id"]
+            await UnitOfWork(db).commit()
+
+            commits = []
+            event.listen(db.sync_session, "after_commit", lambda session: commits.append(session))
+
+            await context_service.add_message(session_id, "user", "c1")
+            await context_service.add_message(session_id, "assistant", "剧情")
+            await session_service.record_key_event(session_id, "action_choice", {
+                "choice_id": "c1",
+                "ai_response": {"player_state": {"day": 1, "turn": 1}, "choices": []},
+            })
+            await db.flush()
+
+            before = await _snapshot(maker, session_id)
+            await UnitOfWork(db).commit()
+            after = await _snapshot(maker, session_id)
+
+        await engine.dispose()
+
+        assert before == {"messages": 1, "events": 0, "turn": None, "message_count": 1, "turn_count": 0}
+        assert after == {"messages": 3, "events": 1, "turn": 1, "message_count": 3, "turn_count": 1}
+        assert len(commits) == 1
+
+    async def test_rollback_discards_pending_stats(self, db):
+        """测试回滚后累计的统计增量不会在下一次提交时写入"""
+        session_service = SessionService(db)
+        context_service = ContextService(db, None)
+        session_id = (await session_service.create_game("玩家"))["session_id"]
+        await UnitOfWork(db).commit()
+
+        await context_service.add_message(session_id, "user", "c1")
+        await UnitOfWork(db).rollback()
+        await UnitOfWork(db).commit()
+
+        stats = await context_service.get_token_stats(session_id)
+        assert stats["total_messages"] == 1
@@ -0,0 +1,138 @@
+"""
+回合紧凑格式单元测试
+
+测试 expand_turn 的选项还原、NPC增量合并、属性增量结算和原结构兼容，
+以及从模型看到的上下文到NPC好感度更新落库的完整链路
+"""
+import json
+import re
+
+from app.api.schemas import AIChoice, MagicalElement, NPCProfile, TriggeredEvent
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.services.context_service import ContextService
+from app.services.session_service import SessionService
+from app.services.wire_format import compact_turn, expand_choice, expand_turn
+
+
+PREVIOUS_TURN = {
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "npcs": [
+        {"id": "boss_1", "name": "王总", "role": "老板", "personality": "爱画饼", "attitude_toward_player": 40},
+        {"id": "npc_2", "name": "小李", "role": "同事", "personality": "八卦", "attitude_toward_player": 60},
+    ],
+}
+
+VERBOSE_TURN = {
+    "story_context": "你刚坐下，王总就走了过来。",
+    "choices": [
+        {"id": "work_1", "text": "认真汇报", "category": "work", "effects": {"energy": -10, "progress": 8}},
+        {"id": "slack_1", "text": "假装打电话", "category": "slack", "effects": {"chill": 10, "suspicion": 5}},
+        {"id": "social_1", "text": "找小李聊天", "category": "social", "effects": {"connection": 6}},
+    ],
+    "npc_reactions": {"boss": "王总皱了皱眉", "colleagues": "大家低头干活", "specific_npcs": {"npc_2": "小李冲你眨眼"}},
+    "triggered_events": [{"type": "random", "message": "打印机又卡纸了", "effects": {}}],
+    "active_magical_element": {"type": "object", "name": "会说话的打印机", "description": "有脾气", "effect": "拒绝打印"},
+    "flavor_texts": ["窗外在下雨"],
+}
+
+
+class TestWireFormat:
+    """紧凑格式测试类"""
+
+    def test_round_trip(self):
+        """测试编码后再还原得到相同的剧情、选项和反应"""
+        compact = json.loads(json.dumps(compact_turn(VERBOSE_TURN), ensure_ascii=False))
+
+        result = expand_turn(compact, PREVIOUS_TURN)
+
+        assert result["story_context"] == VERBOSE_TURN["story_context"]
+        assert result["choices"] == VERBOSE_TURN["choices"]
+        assert result["npc_reactions"] == VERBOSE_TURN["npc_reactions"]
+        assert result["flavor_texts"] == VERBOSE_TURN["flavor_texts"]
+        for choice in result["choices"]:
+            AIChoice(**choice)
+        for event in result["triggered_events"]:
+            TriggeredEvent(**event)
+        MagicalElement(**result["active_magical_element"])
+
+    def test_compact_is_smaller(self):
+        """测试紧凑格式比原结构短"""
+        verbose = json.dumps(VERBOSE_TURN, ensure_ascii=False)
+        compact = json.dumps(compact_turn(VERBOSE_TURN), ensure_ascii=False, separators=(",", ":"))
+
+        assert len(compact) < len(verbose) * 0.8
+
+    def test_npc_updates_merge_by_id(self):
+        """测试NPC按 id 只更新变化的字段，好感度为增量"""
+        compact = {"s": "...", "c": [], "n": [
+            {"i": "boss_1", "a": 70},
+            {"i": "npc_3", "nm": "张姐", "r": "HR", "p": "严厉"},
+            {"i": "ghost", "a": 5},
+        ]}
+
+        result = expand_turn(compact, PREVIOUS_TURN)
+
+        updated = {npc["id"]: npc for npc in result["updated_npcs"]}
+        assert set(updated) == {"boss_1", "npc_3"}
+        assert updated["boss_1"]["attitude_toward_player"] == 100
+        assert updated["boss_1"]["personality"] == "爱画饼"
+        for npc in result["updated_npcs"]:
+            NPCProfile(**npc)
+        assert len(result["npcs"]) == 3
+
+    def test_npc_updates_match_name(self):
+        """测试模型用姓名代替 id 时按姓名匹配已有NPC"""
+        compact = {"s": "...", "c": [], "n": [{"i": "小李", "a": -10}, {"i": "li", "nm": "小李", "p": "记仇"}]}
+
+        result = expand_turn(compact, PREVIOUS_TURN)
+
+        assert [npc["id"] for npc in result["updated_npcs"]] == ["npc_2"]
+        assert result["updated_npcs"][0]["attitude_toward_player"] == 50
+        assert result["updated_npcs"][0]["personality"] == "记仇"
+        assert len(result["npcs"]) == 2
+
+    def test_deltas_settle_state(self):
+        """测试无法服务端结算时按属性增量结算并推进回合"""
+        compact = {"s": "...", "c": [["a", "继续", "work", [0, 0, 0, 0, 0, 0]]], "d": {"ch": 10, "co": 5}}
+
+        result = expand_turn(compact, PREVIOUS_TURN, seed=1)
+
+        assert result["player_state"]["turn"] == 1
+        assert result["player_state"]["connection"] >= 5
+        assert result["is_game_over"] is False
+
+    def test_verbose_payload_passes_through(self):
+        """测试模型未遵守紧凑格式时原样返回（并带上NPC名册）"""
+        payload = {"story_context": "原结构", "choices": []}
+
+        result = expand_turn(payload, PREVIOUS_TURN)
+
+        assert result["story_context"] == "原结构"
+        assert len(result["npcs"]) == 2
+
+    def test_expand_choice_ignores_malformed(self):
+        """测试格式错误的选项被丢弃"""
+        assert expand_choice(["only_id"]) is None
+        assert expand_choice("text") is None
+        assert expand_choice(["id", "文本", "work", [1, "x", True]])["effects"] == {"energy": 1}
+
+    async def test_context_ids_drive_npc_updates(self, db):
+        """测试上下文中的NPC id 可用于紧凑格式更新，好感度增量写入当前状态"""
+        service = SessionService(db)
+        session_id = (await service.create_game("玩家"))["session_id"]
+        await service.record_key_event(session_id, "game_start", {"ai_response": {
+            **PREVIOUS_TURN,
+            "choices": [{"id": "slack_1", "text": "假装打电话", "effects": {}}],
+        }})
+
+        context = await ContextService(db, None).get_context_for_ai(session_id)
+        world = next(message["content"] for message in context if message["content"].startswith("【当前世界】"))
+        npc_id = re.search(r"王总（id: (\w+)，", world).group(1)
+
+        compact = {"s": "王总瞪了你一眼。", "c": [], "n": [{"i": npc_id, "a": -15}]}
+        result = expand_turn(compact, await service.get_last_turn(session_id))
+        await service.record_key_event(session_id, "action_choice", {"choice_id": "slack_1", "ai_response": result})
+
+        state = await service.get_current_state(session_id)
+        attitudes = {npc["name"]: npc["attitude_toward_player"] for npc in state["npcs"]}
+        assert attitudes == {"王总": 25, "小李": 60}
@@ -0,0 +1,212 @@
+"""
+初始世界预热池单元测试
+
+测试 InitialWorldPool：
+1. 玩家姓名占位符在取用时替换，种子写回游戏元数据，过期世界被丢弃
+2. 后台生产者补满各难度的池，取用后补充；连续失败时指数退避
+3. /start 命中预热世界时不调用AI，池为空时实时生成
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api import endpoints
+from app.core.config import settings
+from app.core.constants import INITIAL_PLAYER_STATE
+from app.models.database import Base
+from app.repositories.database import get_db_session
+from app.repositories.unit_of_work import UnitOfWork
+from app.services import world_pool
+from app.services.world_pool import PLAYER_NAME_PLACEHOLDER, InitialWorldPool, bind_player_name
+
+
+def make_world(name: str = PLAYER_NAME_PLACEHOLDER) -> dict:
+    """一个最小的初始世界"""
+    return {
+        "game_meta": {"company_type": "互联网", "style_type": "接地气大白话", "seed_used": 0},
+        "player_state": dict(INITIAL_PLAYER_STATE),
+        "story_context": f"欢迎你，{name}！",
+        "choices": [{"id": "choice_slack_1", "text": f"{name}先摸会儿鱼", "category": "slack", "effects": {}}],
+        "npcs": [],
+    }
+
+
+class FakeWorldAI:
+    """生成最小初始世界的AI服务（可设为失败）"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.requests = []
+        self.initial_calls = 0
+
+    async def request_initial_turn(self, player_name, difficulty, seed, priority):
+        self.requests.append(difficulty)
+        if self.fail:
+            raise TimeoutError("供应商超时")
+        return make_world(player_name)
+
+    async def generate_initial_turn(self, player_name, difficulty, seed):
+        self.initial_calls += 1
+        return make_world(player_name)
+
+
+class FakeSpeculator:
+    """不做预生成的投机服务"""
+
+    def schedule(self, session_id, ai_response, seed, difficulty="normal"):
+        pass
+
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    """创建使用假AI服务的新实例（绕过单例缓存）"""
+    created = []
+
+    def factory(ai: FakeWorldAI, **overrides) -> InitialWorldPool:
+        values = {
+            "WORLD_POOL_ENABLED": True,
+            "WORLD_POOL_SIZE": 1,
+            "WORLD_POOL_REFILL_CONCURRENCY": 1,
+            "WORLD_POOL_MAX_AGE": 1800,
+            **overrides,
+        }
+        for key, value in values.items():
+            monkeypatch.setattr(settings, key, value)
+        monkeypatch.setattr(world_pool, "AIServiceV2", lambda: ai)
+        monkeypatch.setattr(InitialWorldPool, "_instance", None)
+        pool = InitialWorldPool()
+        created.append(pool)
+        return pool
+
+    yield factory
+    for pool in created:
+        if pool._producer is not None:
+            pool._producer.cancel()
+
+
+async def wait_for(predicate, timeout: float = 1.0) -> None:
+    """等待后台生产者达到某个状态"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+class TestWorldPool:
+    """初始世界预热池测试类"""
+
+    def test_bind_player_name(self):
+        """测试递归替换占位符，非字符串原样保留"""
+        world = {"a": [PLAYER_NAME_PLACEHOLDER, {"b": f"你好{PLAYER_NAME_PLACEHOLDER}"}], "n": 3}
+
+        assert bind_player_name(world, "小王") == {"a": ["小王", {"b": "你好小王"}], "n": 3}
+        assert world["a"][0] == PLAYER_NAME_PLACEHOLDER
+
+    def test_take_binds_name_and_discards_stale(self, make_pool):
+        """测试取用时绑定玩家姓名和种子，过期世界丢弃"""
+        pool = make_pool(FakeWorldAI(), WORLD_POOL_MAX_AGE=60)
+        pool._pools["normal"].append((time.time() - 120, 1, make_world()))
+        pool._pools["normal"].append((time.time(), 42, make_world()))
+
+        seed, world = pool.take("normal", "小王")
+
+        assert seed == 42
+        assert world["story_context"] == "欢迎你，小王！"
+        assert world["choices"][0]["text"] == "小王先摸会儿鱼"
+        assert world["game_meta"]["seed_used"] == 42
+        assert pool.take("normal", "小王") is None
+        stats = pool.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["stale_discarded"] == 1
+
+    async def test_refill_after_take(self, make_pool):
+        """测试生产者补满各难度的池，取用后再补充"""
+        ai = FakeWorldAI()
+        pool = make_pool(ai)
+        pool.start()
+        await wait_for(lambda: all(len(p) == 1 for p in pool._pools.values()))
+
+        assert pool.take("hard", "小王") is not None
+        await wait_for(lambda: len(pool._pools["hard"]) == 1)
+
+        await pool.stop()
+        assert sorted(ai.requests) == ["easy", "hard", "hard", "normal"]
+        assert pool.get_stats()["generated"] == 4
+
+    async def test_backoff_on_failures(self, make_pool, monkeypatch):
+        """测试连续生成失败时指数退避"""
+        delays = []
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(seconds):
+            if seconds >= 1:  # 只记录退避，不影响测试自身的轮询
+                delays.append(seconds)
+                seconds = 0
+            await real_sleep(seconds)
+
+        monkeypatch.setattr(world_pool.asyncio, "sleep", fake_sleep)
+        pool = make_pool(FakeWorldAI(fail=True))
+        pool.start()
+        await wait_for(lambda: len(delays) >= 3)
+        await pool.stop()
+
+        assert delays[:3] == [2, 4, 8]
+        assert pool.get_stats()["failed"] >= 3
+
+
+@pytest.fixture
+async def start_client(engine, make_pool):
+    """挂载 /start 的测试客户端工厂（内存数据库，依赖替换为给定的池和假AI服务）"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def db_session():
+        async with maker() as db:
+            yield db
+            await UnitOfWork(db).commit()
+
+    def factory(pool: InitialWorldPool, ai: FakeWorldAI) -> httpx.AsyncClient:
+        app = FastAPI()
+        app.include_router(endpoints.router, prefix="/api/game")
+        app.dependency_overrides[get_db_session] = db_session
+        app.dependency_overrides[endpoints.get_ai_service] = lambda: ai
+        app.dependency_overrides[endpoints.get_speculative_service] = FakeSpeculator
+        app.dependency_overrides[endpoints.get_world_pool] = lambda: pool
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    return factory
+
+
+class TestStartWithPool:
+    """/start 取用预热世界测试类"""
+
+    async def test_pooled_world_used(self, start_client, make_pool):
+        """测试命中预热世界时不调用AI，沿用其种子和绑定后的玩家姓名"""
+        ai = FakeWorldAI()
+        pool = make_pool(ai)
+        pool._pools["normal"].append((time.time(), 42, make_world()))
+
+        async with start_client(pool, ai) as client:
+            response = await client.post("/api/game/start", json={"player_name": "小王"})
+
+        assert response.status_code == 201
+        assert response.json()["message"] == "欢迎你，小王！"
+        assert response.json()["game_meta"]["seed_used"] == 42
+        assert ai.initial_calls == 0
+
+    async def test_empty_pool_falls_back_to_ai(self, start_client, make_pool):
+        """测试池为空时实时生成初始世界"""
+        ai = FakeWorldAI()
+        pool = make_pool(ai)
+
+        async with start_client(pool, ai) as client:
+            response = await client.post("/api/game/start", json={"player_name": "小王"})
+
+        assert response.status_code == 201
+        assert response.json()["message"] == "欢迎你，小王！"
+        assert ai.initial_calls == 1
+        assert pool.get_stats()["misses"] == 1
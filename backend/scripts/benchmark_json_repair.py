@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+JSON修复基准测试
+
+用修复语料（app/tests/json_repair_corpus.py）比较原正则清洗与容错修复：
+1. 成功率：修复后与期望内容一致的语料条数
+2. 吞吐：每条语料的平均解析耗时，以及一个完整回合（合法JSON / 截断）的解析耗时
+
+用法：
+    python scripts/benchmark_json_repair.py
+    python scripts/benchmark_json_repair.py --rounds 5000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.json_repair import repair_turn  # noqa: E402
+from app.tests.json_repair_corpus import CORPUS  # noqa: E402
+
+
+def legacy_parse(content: str) -> dict:
+    """原 AIServiceV2._extract_json 的正则清洗 + json.loads"""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    content = re.sub(r'^\s*([^:]+)\s*:\s*"?([^"]+)"?$', r'\1: "\2"', content, flags=re.MULTILINE)
+    content = re.sub(r':\s*\+(\d+)', r': \1', content)
+    content = re.sub(r':\s*\-(\d+)', r': -\1', content)
+    content = re.sub(r'"\s*:', '":', content)
+    content = re.sub(r'```\w*', '', content)
+    return json.loads(content)
+
+
+def repair_parse(content: str) -> dict:
+    """容错修复"""
+    return repair_turn(content).value
+
+
+def success_count(parse) -> int:
+    """修复结果与期望一致的语料条数"""
+    count = 0
+    for case in CORPUS:
+        try:
+            if parse(case["raw"]) == case["expected"]:
+                count += 1
+        except ValueError:
+            pass
+    return count
+
+
+def time_per_call(parse, text: str, rounds: int) -> float:
+    """单次解析平均耗时（微秒），失败也计入"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        try:
+            parse(text)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def sample_turn() -> str:
+    """一个完整的多行回合（合法JSON）"""
+    choice = {"id": "work_1", "text": "认真汇报", "category": "work", "effects": {"energy": -10, "progress": 8}}
+    turn = {
+        "story_context": "你刚把文档切到全屏，王总就端着保温杯晃了过来。" * 4,
+        "choices": [dict(choice, id=f"c{i}") for i in range(5)],
+        "npc_reactions": {"boss": "王总皱眉", "colleagues": "大家低头", "specific_npcs": {"npc_li": "小李眨眼"}},
+        "triggered_events": [{"type": "random", "message": "打印机卡纸", "effects": {}}],
+        "flavor_texts": ["空调很冷"],
+    }
+    return json.dumps(turn, ensure_ascii=False, indent=2)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="JSON修复基准测试")
+    parser.add_argument("--rounds", type=int, default=2000, help="每项计时的循环次数")
+    args = parser.parse_args()
+
+    implementations = (("正则清洗", legacy_parse), ("容错修复", repair_parse))
+    print(f"语料 {len(CORPUS)} 条\n")
+    print(f"{'实现':<8}{'成功':>6}{'语料平均耗时':>14}")
+    for name, parse in implementations:
+        corpus_time = sum(time_per_call(parse, c["raw"], args.rounds // 10 or 1) for c in CORPUS) / len(CORPUS)
+        print(f"{name:<8}{success_count(parse):>8}{corpus_time:>14.1f}μs")
+
+    turn = sample_turn()
+    truncated = turn[: len(turn) * 2 // 3]
+    print(f"\n完整回合（{len(turn)} 字符）/ 截断回合（{len(truncated)} 字符）:")
+    for name, parse in implementations:
+        print(
+            f"{name:<8}{time_per_call(parse, turn, args.rounds):>10.1f}μs"
+            f"{time_per_call(parse, truncated, args.rounds):>12.1f}μs"
+        )
+
+
+if __name__ == "__main__":
+    main()
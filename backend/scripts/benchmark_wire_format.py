@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+回合输出格式基准测试
+
+比较原结构（完整字段名 + 完整NPC档案，玩家状态已由服务端结算、不再回传）与紧凑格式：
+1. 离线：同一回合两种编码（相同的 json.dumps 设置）的字符数、估算token数、按解码速度估算的输出耗时，以及还原开销
+2. 在线（--live N）：用当前配置的供应商各请求N次，比较 completion_tokens 和实际耗时
+
+用法：
+    python scripts/benchmark_wire_format.py
+    python scripts/benchmark_wire_format.py --tps 40
+    python scripts/benchmark_wire_format.py --live 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.constants import INITIAL_PLAYER_STATE  # noqa: E402
+from app.models.database import calculate_tokens  # noqa: E402
+from app.services.wire_format import compact_turn, expand_turn  # noqa: E402
+
+
+# 典型的后续回合（服务端结算后的原结构：不回传 player_state 和结局字段，但NPC档案完整回传）
+SAMPLE_PREVIOUS_TURN = {
+    "player_state": dict(INITIAL_PLAYER_STATE),
+    "npcs": [
+        {
+            "id": "boss_wang",
+            "name": "王总",
+            "role": "部门总监",
+            "personality": "表面和善，实则精于算计，喜欢在周五下午布置紧急任务",
+            "background": "从基层销售做起，十年坐上总监位置",
+            "relationships": {"npc_li": "提拔过小李"},
+            "attitude_toward_player": 45,
+            "secrets": ["偷偷在做副业"],
+        },
+        {
+            "id": "npc_li",
+            "name": "小李",
+            "role": "资深同事",
+            "personality": "消息灵通的八卦中心，但关键时刻靠得住",
+            "background": "入职五年，知道公司所有的秘密",
+            "relationships": {"boss_wang": "王总的老部下"},
+            "attitude_toward_player": 60,
+            "secrets": ["正在偷偷面试"],
+        },
+    ],
+}
+
+SAMPLE_VERBOSE_TURN = {
+    "story_context": (
+        "你刚把文档切到全屏，王总就端着保温杯晃了过来。他在你身后站了足足十秒，"
+        "然后意味深长地说：“年轻人，效率要提上来啊。”小李在隔壁工位冲你挤眉弄眼，"
+        "显然有什么新八卦要分享。窗外的乌云越压越低，会议室里又传来了熟悉的争吵声。"
+    ),
+    "choices": [
+        {"id": "work_report", "text": "立刻整理周报发给王总", "category": "work",
+         "effects": {"energy": -12, "chill": -5, "progress": 10, "suspicion": -8, "connection": 0, "blackmail": 0}},
+        {"id": "slack_toilet", "text": "带薪如厕顺便刷会儿手机", "category": "slack",
+         "effects": {"energy": 8, "chill": 12, "progress": 0, "suspicion": 6, "connection": 0, "blackmail": 0}},
+        {"id": "social_li", "text": "凑过去听小李的八卦", "category": "social",
+         "effects": {"energy": -3, "chill": 5, "progress": 0, "suspicion": 3, "connection": 8, "blackmail": 6}},
+        {"id": "scheme_record", "text": "偷偷记下王总的副业证据", "category": "scheme",
+         "effects": {"energy": -5, "chill": 0, "progress": 0, "suspicion": 4, "connection": -2, "blackmail": 12}},
+    ],
+    "updated_npcs": [
+        {**SAMPLE_PREVIOUS_TURN["npcs"][0], "attitude_toward_player": 40},
+        {**SAMPLE_PREVIOUS_TURN["npcs"][1], "attitude_toward_player": 65},
+    ],
+    "npc_reactions": {
+        "boss": "王总拧紧保温杯盖，眼神里写满了不信任",
+        "colleagues": "同事们默契地低头敲键盘",
+        "specific_npcs": {"npc_li": "小李压低声音说午饭时有大事告诉你"},
+    },
+    "triggered_events": [{"type": "random", "message": "打印机又卡纸了，整层楼都听到了它的哀嚎", "effects": {}}],
+    "flavor_texts": ["空调冷得像南极"],
+}
+
+
+def to_compact(turn: dict) -> dict:
+    """编码为紧凑格式（NPC只保留好感度增量）"""
+    compact = compact_turn(turn)
+    previous = {npc["id"]: npc for npc in SAMPLE_PREVIOUS_TURN["npcs"]}
+    compact["n"] = [
+        {"i": npc["id"], "a": npc["attitude_toward_player"] - previous[npc["id"]]["attitude_toward_player"]}
+        for npc in turn.get("updated_npcs", [])
+    ]
+    return compact
+
+
+def count_tokens(text: str) -> str:
+    """token数（安装了 tiktoken 时给出精确值，否则用项目的估算）"""
+    estimate = calculate_tokens(text)
+    try:
+        import tiktoken
+    except ImportError:
+        return f"~{estimate}"
+    return str(len(tiktoken.get_encoding("o200k_base").encode(text)))
+
+
+def bench_expand(compact: dict, rounds: int = 20000) -> float:
+    """还原一次紧凑回合的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        expand_turn(dict(compact), SAMPLE_PREVIOUS_TURN)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def run_offline(tps: float) -> None:
+    """离线对比（两种格式使用相同的序列化设置，只比较格式本身）"""
+    verbose = json.dumps(SAMPLE_VERBOSE_TURN, ensure_ascii=False, separators=(",", ":"))
+    compact_dict = to_compact(SAMPLE_VERBOSE_TURN)
+    compact = json.dumps(compact_dict, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"{'格式':<8}{'字符数':>8}{'token':>10}{'估算输出耗时':>14}")
+    for name, text in (("原结构", verbose), ("紧凑", compact)):
+        tokens = calculate_tokens(text)
+        print(f"{name:<8}{len(text):>10}{count_tokens(text):>10}{tokens / tps:>14.2f}s")
+    print(f"\n字符减少: {1 - len(compact) / len(verbose):.1%}（解码速度按 {tps:.0f} tokens/s 估算）")
+    print(f"还原开销: {bench_expand(compact_dict):.1f}μs/回合")
+
+
+async def run_live(rounds: int) -> None:
+    """用当前配置的供应商实际请求两种格式"""
+    from app.core.config import settings
+    from app.prompts.system_prompt import SYSTEM_PROMPT, build_turn_prompt
+    from app.services.provider_router import ProviderRouter
+
+    router = ProviderRouter.from_settings()
+    context = [{"role": "assistant", "content": SAMPLE_VERBOSE_TURN["story_context"]}]
+
+    for name, compact in (("原结构", False), ("紧凑", True)):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *context,
+            {"role": "user", "content": build_turn_prompt("social_li", compact=compact)},
+        ]
+        latencies, tokens = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            response = await router.create(
+                model=settings.OPENAI_MODEL, messages=messages, temperature=0.8, max_tokens=1024
+            )
+            latencies.append(time.perf_counter() - start)
+            if response.usage:
+                tokens.append(response.usage.completion_tokens)
+        print(
+            f"{name}: completion_tokens 中位数 {statistics.median(tokens) if tokens else 'N/A'}, "
+            f"耗时中位数 {statistics.median(latencies):.2f}s"
+        )
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="回合输出格式基准测试")
+    parser.add_argument("--tps", type=float, default=50.0, help="估算用的解码速度（tokens/s）")
+    parser.add_argument("--live", type=int, default=0, help="在线请求次数（需要配置API Key）")
+    args = parser.parse_args()
+
+    run_offline(args.tps)
+    if args.live:
+        print()
+        asyncio.run(run_live(args.live))
+
+
+if __name__ == "__main__":
+    main()
@@ -98,6 +98,14 @@ export interface SubmitChoiceResponse {
   game_over_reason?: string
 }
 
+// 流式提交选择的事件回调（对应后端 /api/game/act/stream）
+export interface SubmitChoiceStreamHandlers {
+  onStory?: (delta: string) => void
+  onChoice?: (choice: ApiChoice) => void
+  onChoices?: (choices: ApiChoice[]) => void
+  onPlayerState?: (playerState: Record<string, number>) => void
+}
+
 // 创建 axios 实例
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -168,6 +176,83 @@ export const gameApi = {
     }
   },
 
+  /**
+   * 流式提交玩家选择（对应后端 /api/game/act/stream，Server-Sent Events）
+   *
+   * 剧情文本逐字回调，最终返回完整的 SubmitChoiceResponse
+   */
+  async submitChoiceStream(
+    sessionId: string,
+    choiceId: string,
+    handlers: SubmitChoiceStreamHandlers = {},
+  ): Promise<SubmitChoiceResponse> {
+    let response: Response
+    try {
+      response = await fetch(`${API_BASE_URL}/api/game/act/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
+        },
+        body: JSON.stringify({ session_id: sessionId, choice_id: choiceId }),
+      })
+    }
+    catch {
+      throw new ApiError('网络连接失败，请检查后端服务是否启动')
+    }
+
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => undefined)
+      throw new ApiError(data?.detail || '提交选择失败', response.status, data)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done)
+        break
+      buffer += decoder.decode(value, { stream: true })
+
+      // SSE 以空行分隔事件
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary !== -1) {
+        const frame = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        boundary = buffer.indexOf('\n\n')
+
+        let event = 'message'
+        let data = ''
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event:'))
+            event = line.slice(6).trim()
+          else if (line.startsWith('data:'))
+            data += line.slice(5).trim()
+        }
+        if (!data)
+          continue
+
+        const payload = JSON.parse(data)
+        if (event === 'story')
+          handlers.onStory?.(payload.delta)
+        else if (event === 'choice')
+          handlers.onChoice?.(payload.choice)
+        else if (event === 'choices')
+          handlers.onChoices?.(payload.choices)
+        else if (event === 'player_state')
+          handlers.onPlayerState?.(payload.player_state)
+        else if (event === 'error')
+          throw new ApiError(payload.detail || '提交选择失败')
+        else if (event === 'done')
+          return payload as SubmitChoiceResponse
+      }
+    }
+
+    throw new ApiError('流式响应意外结束')
+  },
+
   /**
    * 获取当前状态
    */